@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     AIService, AIRequest, SentimentAnalysis, TextGeneration, 
-    DataAnalysis, AIModel, AIUsage
+    DataAnalysis, AIModel, AIUsage, Dataset
 )
 
 
@@ -16,9 +16,9 @@ class AIServiceAdmin(admin.ModelAdmin):
 @admin.register(AIRequest)
 class AIRequestAdmin(admin.ModelAdmin):
     list_display = ['service', 'user', 'status', 'processing_time', 'created_at']
-    list_filter = ['service', 'status', 'created_at']
+    list_filter = ['service', 'status', 'job_type', 'created_at']
     search_fields = ['service__name', 'user__username', 'input_data']
-    readonly_fields = ['created_at', 'completed_at', 'processing_time']
+    readonly_fields = ['created_at', 'started_at', 'completed_at', 'processing_time']
     actions = ['mark_as_completed', 'mark_as_failed']
     
     def mark_as_completed(self, request, queryset):
@@ -33,9 +33,9 @@ class AIRequestAdmin(admin.ModelAdmin):
 @admin.register(SentimentAnalysis)
 class SentimentAnalysisAdmin(admin.ModelAdmin):
     list_display = ['sentiment', 'confidence', 'text_preview', 'created_at']
-    list_filter = ['sentiment', 'created_at']
+    list_filter = ['sentiment', 'scorer_version', 'created_at']
     search_fields = ['text']
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'text_hash', 'scorer_version']
     
     def text_preview(self, obj):
         return obj.text[:50] + '...' if len(obj.text) > 50 else obj.text
@@ -54,12 +54,20 @@ class TextGenerationAdmin(admin.ModelAdmin):
     prompt_preview.short_description = 'Prompt Preview'
 
 
+@admin.register(Dataset)
+class DatasetAdmin(admin.ModelAdmin):
+    list_display = ['name', 'source_format', 'row_count', 'column_count', 'user', 'last_used_at']
+    list_filter = ['source_format', 'created_at']
+    search_fields = ['name', 'content_hash']
+    readonly_fields = ['content_hash', 'created_at', 'last_used_at']
+
+
 @admin.register(DataAnalysis)
 class DataAnalysisAdmin(admin.ModelAdmin):
     list_display = ['name', 'analysis_type', 'created_at']
     list_filter = ['analysis_type', 'created_at']
     search_fields = ['name', 'insights']
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'cache_key']
 
 
 @admin.register(AIModel)
@@ -0,0 +1,275 @@
+"""
+Constant-memory anomaly detection over chunks of rows.
+
+AnomalyDetector scores every row of every chunk it is given and keeps
+only running statistics plus the highest-scoring flagged rows, so a scan
+of an export that never fits in memory holds one chunk at a time.
+
+- zscore: distance from the running mean in running standard deviations,
+  with moments merged per chunk.
+- ewma: distance from an exponentially weighted mean in exponentially
+  weighted standard deviations, each measured before the row is folded
+  in, so the baseline follows level shifts and slow drift.
+- isolation_forest: an IsolationForest fitted on a sample of rows (a
+  uniform sample when the data is in memory, otherwise the first rows of
+  the stream) scores every row.
+
+A row's score for zscore and ewma is its largest per-column score, and
+the column it came from is reported with it.
+"""
+import heapq
+
+from django.conf import settings
+
+from .lazy import lazy_import
+from . import charts as charts_lib
+from . import sketches
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+sp_signal = lazy_import('scipy.signal')
+sk_ensemble = lazy_import('sklearn.ensemble')
+
+
+AI_ANALYSIS_CONFIG = getattr(settings, 'AI_ANALYSIS_CONFIG', {})
+
+METHODS = ('zscore', 'ewma', 'isolation_forest')
+
+
+class AnomalyDetector:
+    """Score DataFrame chunks for anomalies, keeping at most max_flagged flagged rows."""
+
+    def __init__(self, method='zscore', threshold=None, alpha=None, min_periods=None, max_flagged=None,
+                 sample_size=None, contamination=None, numeric_cols=None, random_state=42):
+        if method not in METHODS:
+            raise ValueError(f"Unknown anomaly method '{method}'; use one of {', '.join(METHODS)}")
+        self.method = method
+        self.threshold = float(threshold or AI_ANALYSIS_CONFIG.get('anomaly_threshold', 3.0))
+        self.alpha = float(alpha or AI_ANALYSIS_CONFIG.get('anomaly_ewma_alpha', 0.05))
+        if not 0 < self.alpha < 1:
+            raise ValueError("EWMA alpha must be between 0 and 1")
+        self.min_periods = int(min_periods or AI_ANALYSIS_CONFIG.get('anomaly_min_periods', 30))
+        self.max_flagged = int(max_flagged or AI_ANALYSIS_CONFIG.get('anomaly_max_flagged', 1000))
+        self.sample_size = int(sample_size or AI_ANALYSIS_CONFIG.get('anomaly_sample_size', 10000))
+        self.contamination = contamination or AI_ANALYSIS_CONFIG.get('anomaly_contamination', 0.01)
+        self.random_state = random_state
+        self.numeric_cols = list(numeric_cols) if numeric_cols is not None else None
+        self.rows = 0
+        self.flagged = 0
+        self.column_flags = None
+        # Min-heap of (score, row, column, value); the weakest kept anomaly is on top
+        self._top = []
+        self.forest = None
+        self._pending = []
+        self._pending_rows = 0
+
+    def _init_columns(self, chunk):
+        if self.numeric_cols is None:
+            self.numeric_cols = list(chunk.select_dtypes(include=[np.number]).columns)
+        if not self.numeric_cols:
+            raise ValueError("Anomaly detection needs at least one numeric column")
+        k = len(self.numeric_cols)
+        self.column_flags = np.zeros(k, dtype=np.int64)
+        if self.method == 'zscore':
+            self.moments = sketches.Moments(k)
+        elif self.method == 'ewma':
+            self.seen = np.zeros(k)
+            self.ewm_mean = np.full(k, np.nan)
+            self.ewm_var = np.zeros(k)
+
+    def _values(self, chunk):
+        # Columns missing from a chunk and non-numeric values count as missing
+        return pd.DataFrame({
+            col: pd.to_numeric(chunk[col], errors='coerce') if col in chunk else np.nan
+            for col in self.numeric_cols
+        }, index=chunk.index).to_numpy(dtype=float)
+
+    def fit(self, sample):
+        """Fit the isolation forest on a DataFrame sample before any chunk is scored."""
+        if self.method != 'isolation_forest':
+            return
+        if self.column_flags is None:
+            self._init_columns(sample)
+        self._fit_forest(self._values(sample))
+
+    def _fit_forest(self, values):
+        self.fill = np.nan_to_num(np.nanmean(np.where(np.isfinite(values), values, np.nan), axis=0))
+        self.forest = sk_ensemble.IsolationForest(
+            contamination=self.contamination, random_state=self.random_state,
+            n_jobs=AI_ANALYSIS_CONFIG.get('n_jobs', -1)
+        ).fit(self._impute(values))
+
+    def _impute(self, values):
+        return np.where(np.isfinite(values), values, self.fill)
+
+    def update(self, chunk):
+        """
+        Score one DataFrame chunk.
+
+        Returns the scores of the rows scored now, in row order; without a
+        fitted forest, isolation_forest holds rows back until sample_size
+        rows have arrived (or finish() is called) and returns nothing.
+        """
+        if self.column_flags is None:
+            self._init_columns(chunk)
+        values = self._values(chunk)
+        if self.method == 'isolation_forest' and self.forest is None:
+            self._pending.append(values)
+            self._pending_rows += len(values)
+            if self._pending_rows < self.sample_size:
+                return np.empty(0)
+            return self._flush_pending()
+        return self._score(values)
+
+    def finish(self):
+        """Score rows still held back for fitting; returns their scores."""
+        if self._pending:
+            return self._flush_pending()
+        return np.empty(0)
+
+    def _flush_pending(self):
+        values = np.concatenate(self._pending)
+        self._pending = []
+        self._pending_rows = 0
+        self._fit_forest(values)
+        return self._score(values)
+
+    def _score(self, values):
+        if self.method == 'zscore':
+            scores = self._zscores(values)
+        elif self.method == 'ewma':
+            scores = self._ewma_scores(values)
+        else:
+            scores = None
+
+        if scores is None:
+            imputed = self._impute(values)
+            row_scores = -self.forest.score_samples(imputed)
+            flagged = self.forest.predict(imputed) == -1
+            columns = np.full(len(values), -1)
+        else:
+            columns = np.argmax(scores, axis=1) if scores.shape[1] else np.zeros(len(values), dtype=int)
+            row_scores = scores[np.arange(len(values)), columns] if len(values) else np.empty(0)
+            flagged = row_scores > self.threshold
+            self.column_flags += (scores > self.threshold).sum(axis=0)
+
+        self._keep(np.flatnonzero(flagged), row_scores, columns, values)
+        self.flagged += int(flagged.sum())
+        self.rows += len(values)
+        return row_scores
+
+    def _zscores(self, values):
+        # The chunk is folded in first, so the first chunk is judged too
+        self.moments.update(values)
+        std = self.moments.std()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = np.abs(values - self.moments.mean) / std
+        ready = (self.moments.n >= self.min_periods) & (std > 0)
+        return np.where(np.isfinite(z) & ready, z, 0.0)
+
+    def _ewma_scores(self, values):
+        a = self.alpha
+        valid = np.isfinite(values)
+        # First value of each column seeds its mean
+        unseeded = np.isnan(self.ewm_mean) & valid.any(axis=0)
+        if unseeded.any():
+            first = np.argmax(valid, axis=0)
+            self.ewm_mean[unseeded] = values[first, np.arange(values.shape[1])][unseeded]
+        mean0 = np.nan_to_num(self.ewm_mean)
+        # Missing values repeat the previous value, which leaves the baseline nearly unchanged
+        filled = pd.DataFrame(values).ffill().to_numpy()
+        filled = np.where(np.isfinite(filled), filled, mean0)
+
+        # m[t] = a * x[t] + (1 - a) * m[t - 1], run as a linear filter
+        means = sp_signal.lfilter([a], [1, -(1 - a)], filled, axis=0, zi=((1 - a) * mean0)[None, :])[0]
+        before = np.vstack([mean0[None, :], means[:-1]])
+        deviations = (filled - before) ** 2
+        variances = sp_signal.lfilter(
+            [(1 - a) * a], [1, -(1 - a)], deviations, axis=0, zi=((1 - a) * self.ewm_var)[None, :]
+        )[0]
+        var_before = np.vstack([self.ewm_var[None, :], variances[:-1]])
+
+        positions = self.seen + np.cumsum(valid, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = np.sqrt(deviations / var_before)
+        ready = valid & (positions > self.min_periods) & (var_before > 0)
+
+        if len(values):
+            self.ewm_mean = np.where(np.isnan(self.ewm_mean) & ~valid.any(axis=0), np.nan, means[-1])
+            self.ewm_var = variances[-1]
+        self.seen += valid.sum(axis=0)
+        return np.where(ready & np.isfinite(z), z, 0.0)
+
+    def _keep(self, rows, scores, columns, values):
+        """Merge flagged rows into the bounded set of highest-scoring anomalies."""
+        if not len(rows):
+            return
+        if len(rows) > self.max_flagged:
+            rows = rows[np.argpartition(scores[rows], -self.max_flagged)[-self.max_flagged:]]
+        for row in rows:
+            column = int(columns[row])
+            entry = (
+                float(scores[row]),
+                self.rows + int(row),
+                self.numeric_cols[column] if column >= 0 else None,
+                float(values[row, column]) if column >= 0 and np.isfinite(values[row, column]) else None,
+            )
+            if len(self._top) < self.max_flagged:
+                heapq.heappush(self._top, entry)
+            elif entry[0] > self._top[0][0]:
+                heapq.heapreplace(self._top, entry)
+
+    def anomalies(self):
+        """Kept anomalies, highest score first."""
+        return [
+            {'row': row, 'score': round(score, 6), 'column': column, 'value': value}
+            for score, row, column, value in sorted(self._top, key=lambda entry: (-entry[0], entry[1]))
+        ]
+
+    def results(self):
+        results = {
+            'method': self.method,
+            'rows': self.rows,
+            'flagged_count': self.flagged,
+            'flagged_rate': self.flagged / self.rows if self.rows else 0.0,
+            'anomalies': self.anomalies(),
+            'truncated': self.flagged > len(self._top),
+            'columns': [str(col) for col in self.numeric_cols or []],
+        }
+        if self.method == 'isolation_forest':
+            results['contamination'] = self.contamination
+            results['sample_size'] = self.sample_size
+        else:
+            results['threshold'] = self.threshold
+            results['column_flags'] = {
+                str(col): int(count) for col, count in zip(self.numeric_cols, self.column_flags)
+            }
+            if self.method == 'ewma':
+                results['alpha'] = self.alpha
+        return results
+
+
+def sample_rows(n_rows, sample_size, random_state=42):
+    """Sorted positions of a uniform sample of at most sample_size of n_rows rows."""
+    if n_rows <= sample_size:
+        return np.arange(n_rows)
+    rng = np.random.default_rng(random_state)
+    return np.sort(rng.choice(n_rows, size=sample_size, replace=False))
+
+
+def charts(detector, scores, total=None):
+    """Score distribution and flagged-row charts; scores may be a sample of all row scores."""
+    specs = []
+    chart = charts_lib.histogram_spec(scores, 'Anomaly score distribution')
+    if chart:
+        if total is not None:
+            chart['data']['sampled_from'] = int(total)
+        specs.append(chart)
+    anomalies = detector.anomalies()
+    if anomalies:
+        specs.append(charts_lib.scatter_spec(
+            [entry['row'] for entry in anomalies], [entry['score'] for entry in anomalies], 'Flagged rows',
+            groups=[entry['column'] for entry in anomalies] if detector.method != 'isolation_forest' else None,
+            x_label='row', y_label='score'
+        ))
+    return specs
@@ -0,0 +1,86 @@
+"""
+Retention of the files analyses leave in the artifact directory.
+
+A correlation analysis run with parameters.spill writes its full matrix
+to a .npy file named by the DataAnalysis row that records it, and only
+that row's user may download it. The file is kept for
+AI_ANALYSIS_CONFIG['matrix_file_ttl'] seconds. prune() deletes expired
+matrices, and matrix files no row refers to (from analyses that failed
+after spilling) once they are as old.
+
+Stored datasets are pickled once per content hash and shared by every
+Dataset row with that hash. prune() also deletes pickles no row refers
+to any more, once they are older than dataset_orphan_grace seconds, so
+an upload that has written its pickle but not yet its row keeps it.
+
+The prune_ai_artifacts command runs prune() and is meant for cron.
+"""
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import DataAnalysis, Dataset
+from . import correlation
+from . import datasets
+
+
+AI_ANALYSIS_CONFIG = getattr(settings, 'AI_ANALYSIS_CONFIG', {})
+
+
+def matrix_ttl():
+    return AI_ANALYSIS_CONFIG.get('matrix_file_ttl', 86400)
+
+
+def matrix_expiry(now=None):
+    return (now or timezone.now()) + timedelta(seconds=matrix_ttl())
+
+
+def matrix_path(name):
+    return correlation.spill_path_for(name)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def prune_matrices(now=None):
+    """Delete expired and unreferenced matrix files; returns how many were removed."""
+    now = now or timezone.now()
+    removed = 0
+    expired = DataAnalysis.objects.filter(matrix_expires_at__lte=now).exclude(matrix_file='')
+    for analysis in expired.only('pk', 'matrix_file'):
+        removed += _remove(matrix_path(analysis.matrix_file))
+    expired.update(matrix_file='', matrix_expires_at=None)
+
+    directory = correlation.spill_dir()
+    referenced = set(DataAnalysis.objects.exclude(matrix_file='').values_list('matrix_file', flat=True))
+    cutoff = time.time() - matrix_ttl()
+    for entry in os.scandir(directory):
+        # Young files may belong to an analysis that is still running
+        if entry.name.endswith('.npy') and entry.name not in referenced and entry.stat().st_mtime < cutoff:
+            removed += _remove(entry.path)
+    return removed
+
+
+def prune_datasets():
+    """Delete pickles of datasets whose rows are all gone; returns how many were removed."""
+    referenced = set(Dataset.objects.values_list('content_hash', flat=True).distinct())
+    cutoff = time.time() - AI_ANALYSIS_CONFIG.get('dataset_orphan_grace', 3600)
+    removed = 0
+    for entry in os.scandir(datasets.dataset_dir()):
+        content_hash, extension = os.path.splitext(entry.name)
+        if extension == '.pkl' and content_hash not in referenced and entry.stat().st_mtime < cutoff:
+            removed += _remove(entry.path)
+    return removed
+
+
+def prune(now=None):
+    """Apply every retention rule; returns the number of files removed by kind."""
+    return {'matrices': prune_matrices(now), 'datasets': prune_datasets()}
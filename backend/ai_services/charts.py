@@ -0,0 +1,153 @@
+"""
+Compact chart specifications for data analysis results.
+
+Instead of serialized Plotly figures, which embed every data point plus
+the full template, charts are reduced server-side to the few numbers a
+browser needs to redraw them: pre-binned histograms, downsampled line
+series and plain matrices. ``chartToPlotly`` in static/js/main.js turns
+a spec back into a Plotly figure.
+"""
+from .lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+MAX_HISTOGRAM_BINS = 50
+MAX_LINE_POINTS = 500
+MAX_SCATTER_POINTS = 1000
+
+
+def _round(values, digits=6):
+    """Round an array to plain Python floats for JSON."""
+    return np.round(np.asarray(values, dtype=float), digits).tolist()
+
+
+def histogram_spec(values, title, max_bins=MAX_HISTOGRAM_BINS):
+    """Pre-binned histogram of a numeric series, or None if it has no finite values."""
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return None
+
+    edges = np.histogram_bin_edges(values, bins='auto')
+    if len(edges) - 1 > max_bins:
+        edges = np.histogram_bin_edges(values, bins=max_bins)
+    counts, edges = np.histogram(values, bins=edges)
+
+    return {
+        'type': 'histogram',
+        'title': title,
+        'data': {
+            'bin_edges': _round(edges),
+            'counts': counts.tolist(),
+            'total': int(len(values)),
+        },
+    }
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the indices of at most threshold points that preserve the
+    visual shape of the series.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    a = 0
+
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = y[avg_start:avg_end].mean()
+
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        xs = x[range_start:range_end]
+        ys = y[range_start:range_end]
+
+        areas = np.abs((x[a] - avg_x) * (ys - y[a]) - (x[a] - xs) * (avg_y - y[a]))
+        a = range_start + int(np.argmax(areas))
+        indices[i + 1] = a
+
+    indices[-1] = n - 1
+    return indices
+
+
+def line_spec(y, title, x=None, max_points=MAX_LINE_POINTS, x_label=None):
+    """
+    Line series downsampled with LTTB, or None if it has no finite values.
+
+    A datetime64 x is sent as ISO 8601 strings, which Plotly reads as a
+    date axis.
+    """
+    y = np.asarray(y, dtype=float)
+    dates = x is not None and np.issubdtype(np.asarray(x).dtype, np.datetime64)
+    if x is None:
+        x = np.arange(len(y), dtype=float)
+    elif dates:
+        times = np.asarray(x, dtype='datetime64[ns]')
+        x = np.where(np.isnat(times), np.nan, times.astype('int64').astype(float))
+    else:
+        x = np.asarray(x, dtype=float)
+    mask = np.isfinite(y) & np.isfinite(x)
+    x, y = x[mask], y[mask]
+    if not len(y):
+        return None
+
+    keep = lttb(x, y, max_points)
+    data = {
+        'x': _round(x[keep]),
+        'y': _round(y[keep]),
+        'total': int(len(y)),
+    }
+    if dates:
+        data['x'] = np.datetime_as_string(times[mask][keep], unit='s').tolist()
+    if x_label:
+        data['x_label'] = str(x_label)
+    return {'type': 'line', 'title': title, 'data': data}
+
+
+def heatmap_spec(matrix, labels, title):
+    """Square matrix heatmap with shared row and column labels."""
+    z = np.asarray(matrix, dtype=float)
+    z = np.where(np.isfinite(z), np.round(z, 4), np.nan)
+    return {
+        'type': 'heatmap',
+        'title': title,
+        'data': {
+            'labels': [str(label) for label in labels],
+            'z': [[None if np.isnan(v) else float(v) for v in row] for row in z],
+        },
+    }
+
+
+def scatter_spec(x, y, title, groups=None, x_label='x', y_label='y',
+                 max_points=MAX_SCATTER_POINTS, random_state=42):
+    """Scatter plot, uniformly sampled down to max_points."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    total = len(x)
+
+    keep = np.arange(total)
+    if total > max_points:
+        rng = np.random.default_rng(random_state)
+        keep = np.sort(rng.choice(total, size=max_points, replace=False))
+
+    data = {
+        'x': _round(x[keep], 4),
+        'y': _round(y[keep], 4),
+        'x_label': str(x_label),
+        'y_label': str(y_label),
+        'total': int(total),
+    }
+    if groups is not None:
+        data['groups'] = np.asarray(groups)[keep].tolist()
+
+    return {'type': 'scatter', 'title': title, 'data': data}
@@ -0,0 +1,170 @@
+"""
+Clustering pipeline shared by the clustering analysis and its charts.
+
+The data is normalized once. k is chosen by scoring candidate values in
+parallel on a sample, and large inputs switch to MiniBatchKMeans. The
+fitted labels and a 2-D PCA projection of a chart-sized sample are
+returned together so the chart step never refits anything; both the
+normalized matrix and the projection can be supplied from a dataset
+session so repeated runs skip them. A fitted model can be kept as a
+ClusterModel and applied to new rows without refitting.
+"""
+from django.conf import settings
+
+from .lazy import lazy_import
+from .charts import MAX_SCATTER_POINTS
+
+np = lazy_import('numpy')
+joblib = lazy_import('joblib')
+sk_cluster = lazy_import('sklearn.cluster')
+sk_decomposition = lazy_import('sklearn.decomposition')
+sk_metrics = lazy_import('sklearn.metrics')
+
+
+AI_ANALYSIS_CONFIG = getattr(settings, 'AI_ANALYSIS_CONFIG', {})
+
+
+def normalize(values):
+    """Z-score columns, treating constant columns as unit variance and NaN as the mean."""
+    values = np.asarray(values, dtype=float)
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0, ddof=1) if len(values) > 1 else np.ones(values.shape[1])
+    std = np.where((std > 0) & np.isfinite(std), std, 1.0)
+    normalized = (values - mean) / std
+    return np.nan_to_num(normalized, nan=0.0), mean, std
+
+
+class ClusterModel:
+    """A fitted clustering estimator with the column normalization it was fitted under."""
+
+    def __init__(self, columns, mean, std, estimator):
+        self.columns = [str(col) for col in columns]
+        self.mean = np.asarray(mean, dtype=float)
+        self.std = np.asarray(std, dtype=float)
+        self.estimator = estimator
+
+    def normalize(self, values):
+        normalized = (np.asarray(values, dtype=float) - self.mean) / self.std
+        return np.nan_to_num(normalized, nan=0.0)
+
+
+def _make_model(k, n_rows, random_state):
+    if n_rows > AI_ANALYSIS_CONFIG.get('minibatch_threshold', 10000):
+        return sk_cluster.MiniBatchKMeans(
+            n_clusters=k, random_state=random_state, n_init=3,
+            batch_size=AI_ANALYSIS_CONFIG.get('minibatch_size', 4096)
+        )
+    return sk_cluster.KMeans(n_clusters=k, random_state=random_state, n_init=10)
+
+
+def _score_candidate(sample, k, random_state):
+    labels = _make_model(k, len(sample), random_state).fit_predict(sample)
+    if len(set(labels)) < 2:
+        return k, -1.0
+    return k, float(sk_metrics.silhouette_score(sample, labels))
+
+
+def choose_k(normalized, max_clusters=None, random_state=42):
+    """Pick k by silhouette score on a sample, scoring candidates in parallel."""
+    n_rows = len(normalized)
+    max_clusters = max_clusters or AI_ANALYSIS_CONFIG.get('max_clusters', 8)
+    candidates = list(range(2, min(max_clusters, n_rows - 1) + 1))
+    if not candidates:
+        return min(2, n_rows), {}
+
+    sample = normalized
+    sample_size = AI_ANALYSIS_CONFIG.get('clustering_sample_size', 5000)
+    if n_rows > sample_size:
+        rng = np.random.default_rng(random_state)
+        sample = normalized[rng.choice(n_rows, size=sample_size, replace=False)]
+
+    # scikit-learn releases the GIL in its hot loops, so threads parallelize
+    # without copying the sample into worker processes.
+    scores = dict(joblib.Parallel(n_jobs=AI_ANALYSIS_CONFIG.get('n_jobs', -1), prefer='threads')(
+        joblib.delayed(_score_candidate)(sample, k, random_state) for k in candidates
+    ))
+    best = max(scores, key=scores.get)
+    return best, scores
+
+
+def project(normalized, random_state=42):
+    """
+    2-D projection of a chart-sized sample of normalized rows.
+
+    Returns (chart_rows, chart_points, explained_variance); explained
+    variance is None when the data already has two columns or fewer.
+    """
+    n_rows, n_cols = normalized.shape
+    chart_rows = np.arange(n_rows)
+    if n_rows > MAX_SCATTER_POINTS:
+        rng = np.random.default_rng(random_state)
+        chart_rows = np.sort(rng.choice(n_rows, size=MAX_SCATTER_POINTS, replace=False))
+
+    if n_cols > 2:
+        pca = sk_decomposition.PCA(n_components=2, random_state=random_state)
+        # The basis is fitted on the chart sample; it only drives the plot
+        return chart_rows, pca.fit_transform(normalized[chart_rows]), pca.explained_variance_ratio_.tolist()
+    return chart_rows, normalized[chart_rows], None
+
+
+def run_clustering(values, n_clusters=None, max_clusters=None, random_state=42,
+                   normalized=None, projection=None):
+    """
+    Cluster a numeric matrix.
+
+    Returns a dict with the fitted model summary and estimator ('model'), 'labels' for every
+    row, and 'chart_points' / 'chart_labels' holding a 2-D projection of
+    at most MAX_SCATTER_POINTS rows for plotting. A precomputed normalized
+    matrix and project() result can be passed in to skip those steps.
+    """
+    if normalized is None:
+        normalized, _, _ = normalize(values)
+    n_rows = len(normalized)
+
+    scores = {}
+    if n_clusters:
+        k = max(1, min(int(n_clusters), n_rows))
+    else:
+        k, scores = choose_k(normalized, max_clusters, random_state)
+
+    model = _make_model(k, n_rows, random_state)
+    labels = model.fit_predict(normalized)
+
+    chart_rows, chart_points, explained = projection or project(normalized, random_state)
+
+    return {
+        'n_clusters': int(k),
+        'algorithm': type(model).__name__,
+        'cluster_centers': model.cluster_centers_.tolist(),
+        'cluster_sizes': np.bincount(labels, minlength=k).tolist(),
+        'inertia': float(model.inertia_),
+        'k_scores': {str(key): round(score, 4) for key, score in sorted(scores.items())},
+        'labels': labels,
+        'chart_points': chart_points,
+        'chart_labels': labels[chart_rows],
+        'explained_variance': explained,
+        'model': model,
+    }
+
+
+def apply_model(cluster_model, values, random_state=42):
+    """Label rows with a fitted ClusterModel; returns the same fields as run_clustering."""
+    normalized = cluster_model.normalize(values)
+    model = cluster_model.estimator
+    labels = model.predict(normalized)
+    k = len(model.cluster_centers_)
+    chart_rows, chart_points, explained = project(normalized, random_state)
+    return {
+        'n_clusters': int(k),
+        'algorithm': type(model).__name__,
+        'cluster_centers': np.asarray(model.cluster_centers_).tolist(),
+        'cluster_sizes': np.bincount(labels, minlength=k).tolist(),
+        # score() is the negative inertia of these rows
+        'inertia': float(-model.score(normalized)),
+        'k_scores': {},
+        'labels': labels,
+        'chart_points': chart_points,
+        'chart_labels': labels[chart_rows],
+        'explained_variance': explained,
+        'model': model,
+    }
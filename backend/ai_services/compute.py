@@ -0,0 +1,277 @@
+"""
+Process-pool execution for CPU-heavy analysis stages.
+
+Clustering, PCA projection and correlation hold the GIL for long
+stretches, so running them in the request thread stalls every other
+request served by the same process. run() sends such a stage to a small
+pool of worker processes instead, and the calling thread waits without
+holding the GIL.
+
+Large numpy arrays cross the process boundary through shared memory:
+the parent copies each input once into a segment the worker maps, and
+large arrays in the result come back the same way, so nothing is
+pickled twice. Each worker process is a single-worker executor that a
+task checks out for itself, so a task that misses its deadline or runs
+its worker out of memory is stopped by terminating that one worker;
+tasks of other requests keep running. Workers run under an
+address-space limit. Small inputs, and platforms where the pool cannot
+start, run inline.
+"""
+import atexit
+import errno
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+from django.conf import settings
+
+from .lazy import lazy_import
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+np = lazy_import('numpy')
+
+
+logger = logging.getLogger(__name__)
+
+AI_ANALYSIS_CONFIG = getattr(settings, 'AI_ANALYSIS_CONFIG', {})
+
+# Idle single-worker executors, None for a slot whose worker is not started
+_idle = None
+# Every started executor, idle or running a task
+_executors = set()
+_lock = threading.Lock()
+
+
+class _SharedArray:
+    """Picklable reference to an ndarray stored in a shared memory segment."""
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    @classmethod
+    def create(cls, array):
+        array = np.ascontiguousarray(array)
+        segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+        return segment, cls(segment.name, array.shape, array.dtype.str)
+
+    def attach(self):
+        segment = shared_memory.SharedMemory(name=self.name)
+        return segment, np.ndarray(self.shape, dtype=np.dtype(self.dtype), buffer=segment.buf)
+
+
+def _shared_threshold():
+    return AI_ANALYSIS_CONFIG.get('compute_shared_bytes', 1 << 20)
+
+
+def _export(value, segments):
+    """Replace large arrays in value (top level, or inside tuples, lists and dicts) with shared references."""
+    if isinstance(value, np.ndarray) and value.dtype != object and value.nbytes >= _shared_threshold():
+        segment, reference = _SharedArray.create(value)
+        segments.append(segment)
+        return reference
+    if isinstance(value, (tuple, list)):
+        return type(value)(_export(item, segments) for item in value)
+    if isinstance(value, dict):
+        return {key: _export(item, segments) for key, item in value.items()}
+    return value
+
+
+def _import(value, segments, copy=False):
+    """Resolve shared references in value; copy=True detaches the arrays from their segments."""
+    if isinstance(value, _SharedArray):
+        segment, array = value.attach()
+        segments.append(segment)
+        return array.copy() if copy else array
+    if isinstance(value, (tuple, list)):
+        return type(value)(_import(item, segments, copy) for item in value)
+    if isinstance(value, dict):
+        return {key: _import(item, segments, copy) for key, item in value.items()}
+    return value
+
+
+def _release(segments, unlink):
+    for segment in segments:
+        try:
+            segment.close()
+        except BufferError:
+            # An array still maps it; the mapping goes away with the array
+            pass
+        if unlink:
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                # SharedMemory unlinks a segment it fails to map
+                pass
+
+
+def _init_worker(memory_limit_mb):
+    # One BLAS thread per worker; the pool size is the parallelism
+    for variable in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ[variable] = '1'
+    if memory_limit_mb and resource is not None:
+        limit = int(memory_limit_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _run_task(func, args, kwargs):
+    """Worker side: map shared inputs, run func and share large outputs."""
+    inputs = []
+    try:
+        args = _import(args, inputs)
+        kwargs = _import(kwargs, inputs)
+        outputs = []
+        result = _export(func(*args, **kwargs), outputs)
+        # The parent unlinks the output segments once it has copied them.
+        # Workers share the parent's resource tracker, so the segments stay
+        # tracked, and are cleaned up, even if the parent dies first.
+        _release(outputs, unlink=False)
+        return result
+    finally:
+        args = kwargs = None
+        _release(inputs, unlink=False)
+
+
+def _idle_slots():
+    global _idle
+    with _lock:
+        if _idle is None:
+            # LIFO, so the most recently used (warm) worker is reused first
+            _idle = queue.LifoQueue()
+            for _ in range(AI_ANALYSIS_CONFIG.get('compute_workers', 2)):
+                _idle.put(None)
+        return _idle
+
+
+def _start_executor():
+    context = multiprocessing.get_context(AI_ANALYSIS_CONFIG.get('compute_start_method', 'spawn'))
+    executor = ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(AI_ANALYSIS_CONFIG.get('compute_memory_limit_mb', 2048),)
+    )
+    with _lock:
+        _executors.add(executor)
+    return executor
+
+
+def _kill(executor):
+    """Terminate an executor's worker; the only way to stop the task it is running."""
+    with _lock:
+        _executors.discard(executor)
+    for process in list((getattr(executor, '_processes', None) or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown():
+    global _idle
+    with _lock:
+        executors = list(_executors)
+        _executors.clear()
+        _idle = None
+    for executor in executors:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def terminate():
+    """Kill every worker and the tasks they are running, e.g. when this process is being stopped."""
+    global _idle
+    with _lock:
+        executors = list(_executors)
+        _idle = None
+    for executor in executors:
+        _kill(executor)
+
+
+atexit.register(shutdown)
+
+
+def _array_bytes(values):
+    if isinstance(values, np.ndarray):
+        return values.nbytes
+    if isinstance(values, (tuple, list)):
+        return sum(_array_bytes(item) for item in values)
+    if isinstance(values, dict):
+        return sum(_array_bytes(item) for item in values.values())
+    return 0
+
+
+def run(func, *args, timeout=None, **kwargs):
+    """
+    Call func(*args, **kwargs) in the analysis process pool and return its result.
+
+    func must be a module-level function. Inputs with fewer than
+    compute_inline_bytes of array data, or any input when compute_workers
+    is 0, run inline in the calling thread. Raises TimeoutError when the
+    task misses its deadline (compute_timeout seconds by default) and
+    MemoryError when the worker exceeds its memory limit.
+    """
+    workers = AI_ANALYSIS_CONFIG.get('compute_workers', 2)
+    if not workers or _array_bytes((args, kwargs)) < AI_ANALYSIS_CONFIG.get('compute_inline_bytes', 4 << 20):
+        return func(*args, **kwargs)
+
+    timeout = timeout or AI_ANALYSIS_CONFIG.get('compute_timeout', 120)
+    deadline = time.monotonic() + timeout
+    idle = _idle_slots()
+    try:
+        executor = idle.get(timeout=timeout)
+    except queue.Empty:
+        raise TimeoutError(f"{func.__name__} waited {timeout:g}s for an analysis worker")
+
+    try:
+        if executor is not None and getattr(executor, '_broken', False):
+            # The worker died while idle
+            _kill(executor)
+            executor = None
+        inputs = []
+        try:
+            shared_args = _export(args, inputs)
+            shared_kwargs = _export(kwargs, inputs)
+            executor = executor or _start_executor()
+            future = executor.submit(_run_task, func, shared_args, shared_kwargs)
+        except (OSError, ImportError, NotImplementedError) as e:
+            # No usable shared memory or process support (e.g. some serverless hosts)
+            _release(inputs, unlink=True)
+            logger.warning("Analysis pool unavailable, running %s inline: %s", func.__name__, e)
+            return func(*args, **kwargs)
+
+        # The worker runs nothing but this task, so a timeout or a dead
+        # worker concerns this task alone
+        try:
+            result = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            _kill(executor)
+            executor = None
+            raise TimeoutError(f"{func.__name__} exceeded its {timeout:g}s deadline")
+        except BrokenProcessPool:
+            _kill(executor)
+            executor = None
+            raise MemoryError(f"Analysis worker running {func.__name__} died; it most likely ran out of memory")
+        except OSError as e:
+            if e.errno != errno.ENOMEM:
+                raise
+            raise MemoryError(f"{func.__name__} exceeded the analysis worker memory limit") from e
+        finally:
+            _release(inputs, unlink=True)
+    finally:
+        idle.put(executor)
+
+    outputs = []
+    try:
+        return _import(result, outputs, copy=True)
+    finally:
+        _release(outputs, unlink=True)
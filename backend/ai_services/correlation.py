@@ -0,0 +1,179 @@
+"""
+Blocked, vectorized correlation for wide datasets.
+
+The correlation matrix is computed one column block pair at a time with
+matrix products, so peak memory is a few blocks rather than the whole
+k x k matrix. Strong pairs are extracted from each block as it is
+produced. Missing values are handled pairwise, like DataFrame.corr(), by
+carrying a presence mask through the same products. The full matrix is
+kept in memory only when it is small, or spilled to a memory-mapped .npy
+file on request.
+"""
+import os
+
+from django.conf import settings
+
+from .lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+AI_ANALYSIS_CONFIG = getattr(settings, 'AI_ANALYSIS_CONFIG', {})
+
+METHODS = ('pearson', 'spearman', 'kendall')
+
+
+class _PearsonBlocks:
+    """Computes Pearson correlation for column blocks of a matrix."""
+
+    def __init__(self, values):
+        X = np.asarray(values, dtype=float)
+        mask = np.isfinite(X)
+        # Centering first keeps the sums below well conditioned
+        X = X - np.nanmean(np.where(mask, X, np.nan), axis=0)
+        X[~mask] = 0.0
+        self.X = X
+        self.complete = bool(mask.all())
+        if self.complete:
+            norms = np.sqrt((X ** 2).sum(axis=0))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self.Z = X / np.where(norms > 0, norms, np.nan)
+        else:
+            self.M = mask.astype(float)
+            self.X2 = X ** 2
+
+    def block(self, rows, cols):
+        if self.complete:
+            r = self.Z[:, rows].T @ self.Z[:, cols]
+        else:
+            X, M, X2 = self.X, self.M, self.X2
+            n = M[:, rows].T @ M[:, cols]
+            sx = X[:, rows].T @ M[:, cols]
+            sy = M[:, rows].T @ X[:, cols]
+            sxx = X2[:, rows].T @ M[:, cols]
+            syy = M[:, rows].T @ X2[:, cols]
+            sxy = X[:, rows].T @ X[:, cols]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cov = sxy - sx * sy / n
+                var = (sxx - sx ** 2 / n) * (syy - sy ** 2 / n)
+                r = cov / np.sqrt(np.where(var > 0, var, np.nan))
+            r[n < 2] = np.nan
+        return np.clip(r, -1.0, 1.0)
+
+
+def correlate(values, labels, method='pearson', threshold=0.7, top_k=None,
+              block_size=None, keep_matrix=True, spill_path=None):
+    """
+    Correlate the columns of a numeric matrix.
+
+    Returns (matrix, pairs). matrix is an ndarray, a memmap when
+    spill_path is given, or None when keep_matrix is False. pairs lists
+    the column pairs with |r| > threshold, strongest first, capped at
+    top_k.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown correlation method '{method}'; use one of {', '.join(METHODS)}")
+
+    values = np.asarray(values, dtype=float)
+    k = values.shape[1]
+    top_k = top_k or AI_ANALYSIS_CONFIG.get('max_correlation_pairs', 1000)
+
+    if method == 'kendall':
+        return _kendall(values, labels, threshold, top_k, keep_matrix, spill_path)
+
+    if method == 'spearman':
+        # Average ranks per column, NaN left in place for pairwise handling
+        values = pd.DataFrame(values).rank().to_numpy()
+
+    matrix = None
+    if spill_path:
+        matrix = np.lib.format.open_memmap(spill_path, mode='w+', dtype=np.float32, shape=(k, k))
+    elif keep_matrix:
+        matrix = np.empty((k, k))
+
+    blocks = _PearsonBlocks(values)
+    block_size = block_size or AI_ANALYSIS_CONFIG.get('correlation_block_size', 512)
+    starts = range(0, k, block_size)
+    found = []
+
+    for i in starts:
+        rows = slice(i, min(i + block_size, k))
+        for j in starts:
+            if j < i:
+                continue
+            cols = slice(j, min(j + block_size, k))
+            r = blocks.block(rows, cols)
+            if i == j:
+                diagonal = np.arange(r.shape[0])
+                r[diagonal, diagonal] = np.where(np.isnan(r[diagonal, diagonal]), np.nan, 1.0)
+            if matrix is not None:
+                matrix[rows, cols] = r
+                matrix[cols, rows] = r.T
+            found.append(_strong_pairs(r, i, j, threshold, top_k))
+
+    if isinstance(matrix, np.memmap):
+        matrix.flush()
+    return matrix, _merge_pairs(found, labels, top_k)
+
+
+def high_correlations(corr_matrix, threshold=0.7, top_k=None):
+    """Vectorized strong pair extraction from a correlation DataFrame."""
+    top_k = top_k or AI_ANALYSIS_CONFIG.get('max_correlation_pairs', 1000)
+    found = _strong_pairs(corr_matrix.to_numpy(dtype=float), 0, 0, threshold, top_k)
+    return _merge_pairs([found], list(corr_matrix.columns), top_k)
+
+
+def _strong_pairs(r, row_offset, col_offset, threshold, top_k):
+    """Upper-triangle entries of a block with |r| > threshold, at most top_k."""
+    rows, cols = np.nonzero(np.abs(np.nan_to_num(r)) > threshold)
+    upper = cols + col_offset > rows + row_offset
+    rows, cols = rows[upper], cols[upper]
+    corr = r[rows, cols]
+    if len(corr) > top_k:
+        keep = np.argpartition(-np.abs(corr), top_k - 1)[:top_k]
+        rows, cols, corr = rows[keep], cols[keep], corr[keep]
+    return rows + row_offset, cols + col_offset, corr
+
+
+def _merge_pairs(found, labels, top_k):
+    if not found:
+        return []
+    rows = np.concatenate([f[0] for f in found])
+    cols = np.concatenate([f[1] for f in found])
+    corr = np.concatenate([f[2] for f in found])
+    order = np.argsort(-np.abs(corr), kind='stable')[:top_k]
+    return [
+        {'var1': labels[rows[n]], 'var2': labels[cols[n]], 'correlation': float(corr[n])}
+        for n in order
+    ]
+
+
+def _kendall(values, labels, threshold, top_k, keep_matrix, spill_path):
+    # Kendall's tau has no matrix-product form; pandas computes it pair by pair
+    max_columns = AI_ANALYSIS_CONFIG.get('max_kendall_columns', 200)
+    if values.shape[1] > max_columns:
+        raise ValueError(f"Kendall correlation supports at most {max_columns} columns")
+
+    r = pd.DataFrame(values).corr(method='kendall').to_numpy()
+    pairs = _merge_pairs([_strong_pairs(r, 0, 0, threshold, top_k)], labels, top_k)
+    if spill_path:
+        matrix = np.lib.format.open_memmap(spill_path, mode='w+', dtype=np.float32, shape=r.shape)
+        matrix[:] = r
+        matrix.flush()
+        return matrix, pairs
+    return (r if keep_matrix else None), pairs
+
+
+def spill_dir():
+    directory = os.path.join(
+        AI_ANALYSIS_CONFIG.get('artifact_dir') or os.path.join(settings.BASE_DIR, 'ai_artifacts'),
+        'correlation'
+    )
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def spill_path_for(name):
+    """Path for a spilled correlation matrix inside the analysis artifact directory."""
+    return os.path.join(spill_dir(), name)
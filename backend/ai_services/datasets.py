@@ -0,0 +1,210 @@
+"""
+Content-addressed dataset store and reusable analysis sessions.
+
+A dataset is uploaded once, either as JSON records or a CSV/NDJSON file,
+and identified by the SHA-256 of its content. The parsed DataFrame is
+pickled under the analysis artifact directory, so re-uploading the same
+content reuses the stored copy. Analyses run against a DatasetSession,
+which keeps the DataFrame and anything derived from it (numeric column
+selection, normalized matrix, PCA projection, prepared trend series) in
+memory. The sessions themselves are kept in an LRU cache, so running
+every analysis type on one dataset loads and parses it once.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import LRUCache
+from .lazy import lazy_import
+from .models import Dataset
+from . import ingest
+from . import streaming
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+AI_ANALYSIS_CONFIG = getattr(settings, 'AI_ANALYSIS_CONFIG', {})
+
+class DatasetTooLarge(ValueError):
+    """The dataset does not fit in the max_frame_mb limit."""
+
+
+_sessions = LRUCache(max_size=AI_ANALYSIS_CONFIG.get('dataset_cache_size', 8))
+
+
+class DatasetSession:
+    """A loaded DataFrame plus memoized artifacts derived from it."""
+
+    def __init__(self, df, content_hash=None):
+        self.df = df
+        self.content_hash = content_hash
+        self._artifacts = {}
+        self._lock = threading.Lock()
+
+    def artifact(self, key, builder):
+        """Return the artifact stored under key, building it on first use."""
+        with self._lock:
+            if key in self._artifacts:
+                return self._artifacts[key]
+        value = builder()
+        with self._lock:
+            return self._artifacts.setdefault(key, value)
+
+    @property
+    def numeric(self):
+        """The numeric columns as a DataFrame."""
+        return self.artifact('numeric', lambda: self.df.select_dtypes(include=[np.number]))
+
+    @property
+    def numeric_values(self):
+        """The numeric columns as a float matrix."""
+        return self.artifact('numeric_values', lambda: self.numeric.to_numpy(dtype=float))
+
+    def artifact_keys(self):
+        with self._lock:
+            return list(self._artifacts)
+
+
+def dataset_dir():
+    directory = os.path.join(
+        AI_ANALYSIS_CONFIG.get('artifact_dir') or os.path.join(settings.BASE_DIR, 'ai_artifacts'),
+        'datasets'
+    )
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def dataset_path(content_hash):
+    return os.path.join(dataset_dir(), f"{content_hash}.pkl")
+
+
+def max_upload_bytes():
+    return AI_ANALYSIS_CONFIG.get('max_upload_mb', 1024) * 1024 * 1024
+
+
+def max_frame_bytes():
+    return AI_ANALYSIS_CONFIG.get('max_frame_mb', 512) * 1024 * 1024
+
+
+def _read_file(fileobj, source_format):
+    """
+    Parse a CSV/NDJSON file into a compact DataFrame, chunk by chunk.
+
+    Each chunk is compacted as it is read, and reading stops with
+    DatasetTooLarge as soon as the chunks read so far exceed the
+    max_frame_mb limit, so an oversized file never sits in memory as
+    plain pandas dtypes.
+    """
+    max_bytes = max_frame_bytes()
+    chunks = []
+    total = 0
+    chunksize = AI_ANALYSIS_CONFIG.get('ingest_batch_rows', streaming.DEFAULT_CHUNK_SIZE)
+    for chunk in streaming.read_chunks(fileobj, source_format, chunksize):
+        ingest.optimize_dtypes(chunk)
+        total += ingest.frame_bytes(chunk)
+        if total > max_bytes:
+            raise DatasetTooLarge(f"Dataset is larger than the {max_bytes / 2 ** 20:.0f} MB limit")
+        chunks.append(chunk)
+    if not chunks:
+        raise ValueError("Uploaded file contains no rows")
+    df = ingest.concat_frames(chunks)
+    if ingest.frame_bytes(df) > max_bytes:
+        raise DatasetTooLarge(f"Dataset is larger than the {max_bytes / 2 ** 20:.0f} MB limit")
+    return df
+
+
+def canonical_json(data):
+    """JSON bytes for data with sorted keys, so key order does not change its hash."""
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def data_hash(data):
+    """Content hash of JSON records, equal to the content_hash a stored copy gets."""
+    if isinstance(data, dict):
+        data = [data]
+    return hashlib.sha256(canonical_json(data)).hexdigest()
+
+
+def store(data=None, fileobj=None, name='', user=None, file_format=None):
+    """
+    Store JSON records or a CSV/NDJSON file and return (dataset, created).
+
+    Identical content uploaded again by the same signed-in user returns
+    the existing Dataset; anonymous uploads always get a Dataset, and a
+    token, of their own. The stored DataFrame is shared by all uploads of
+    that content.
+    """
+    if fileobj is not None:
+        source_format = streaming.detect_format(getattr(fileobj, 'name', ''), file_format)
+        digest = hashlib.sha256()
+        size = 0
+        for block in iter(lambda: fileobj.read(1 << 20), b''):
+            digest.update(block if isinstance(block, bytes) else block.encode('utf-8'))
+            size += len(block)
+        content_hash = digest.hexdigest()
+        name = name or getattr(fileobj, 'name', '')
+    elif data is not None:
+        source_format = 'json'
+        if isinstance(data, dict):
+            data = [data]
+        payload = canonical_json(data)
+        content_hash = hashlib.sha256(payload).hexdigest()
+        size = len(payload)
+    else:
+        raise ValueError("Either data or a file is required")
+
+    existing = Dataset.objects.filter(content_hash=content_hash, user=user).first() if user is not None else None
+    if existing is not None and os.path.exists(dataset_path(content_hash)):
+        return existing, False
+
+    path = dataset_path(content_hash)
+    if os.path.exists(path):
+        df = pd.read_pickle(path)
+    else:
+        if fileobj is not None:
+            fileobj.seek(0)
+            df = _read_file(fileobj, source_format)
+        else:
+            # Stored datasets are never sampled; they must fit whole
+            df, _ = ingest.build_frame(data, oversize='reject')
+        # Write then rename, so readers never see a partial file
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        df.to_pickle(temporary)
+        os.replace(temporary, path)
+    _sessions.set(content_hash, DatasetSession(df, content_hash))
+
+    if existing is not None:
+        return existing, False
+    dataset = Dataset.objects.create(
+        content_hash=content_hash,
+        name=name,
+        user=user,
+        source_format=source_format,
+        row_count=len(df),
+        column_count=len(df.columns),
+        columns=[str(col) for col in df.columns],
+        size_bytes=size
+    )
+    return dataset, True
+
+
+def open_session(dataset):
+    """Return the DatasetSession for a Dataset, loading it at most once per process."""
+    session = _sessions.get(dataset.content_hash)
+    if session is None:
+        path = dataset_path(dataset.content_hash)
+        if not os.path.exists(path):
+            raise ValueError(f"Dataset {dataset.pk} is no longer stored; upload it again")
+        session = DatasetSession(pd.read_pickle(path), dataset.content_hash)
+        _sessions.set(dataset.content_hash, session)
+    Dataset.objects.filter(pk=dataset.pk).update(last_used_at=timezone.now())
+    return session
+
+
+def cache_stats():
+    return _sessions.stats()
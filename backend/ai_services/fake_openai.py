@@ -0,0 +1,70 @@
+"""
+Offline stand-in for the OpenAI ChatCompletion API.
+
+Enable it with OPENAI_BACKEND=fake to exercise text generation, including
+streaming, without network access or an API key. Responses are
+deterministic: the prompt is echoed back word by word.
+"""
+import time
+import uuid
+
+
+class _Obj(dict):
+    """Dict with attribute access, mimicking openai's OpenAIObject."""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def _reply_tokens(messages, max_tokens):
+    prompt = messages[-1]['content'] if messages else ''
+    words = f"You said: {prompt}".split()
+    tokens = [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+    return tokens[:max_tokens]
+
+
+class ChatCompletion:
+    """Drop-in replacement for ``openai.ChatCompletion``."""
+
+    # Delay between streamed chunks, in seconds
+    token_delay = 0.0
+
+    @classmethod
+    def create(cls, model, messages, max_tokens=100, temperature=0.7, stream=False, **kwargs):
+        tokens = _reply_tokens(messages, max_tokens)
+        completion_id = f"chatcmpl-fake-{uuid.uuid4().hex[:12]}"
+
+        if stream:
+            return cls._stream(completion_id, model, tokens)
+
+        return _Obj(
+            id=completion_id,
+            object='chat.completion',
+            model=model,
+            choices=[_Obj(
+                index=0,
+                message=_Obj(role='assistant', content=''.join(tokens)),
+                finish_reason='stop',
+            )],
+        )
+
+    @classmethod
+    def _stream(cls, completion_id, model, tokens):
+        yield cls._chunk(completion_id, model, _Obj(role='assistant'))
+        for token in tokens:
+            if cls.token_delay:
+                time.sleep(cls.token_delay)
+            yield cls._chunk(completion_id, model, _Obj(content=token))
+        yield cls._chunk(completion_id, model, _Obj(), finish_reason='stop')
+
+    @staticmethod
+    def _chunk(completion_id, model, delta, finish_reason=None):
+        return _Obj(
+            id=completion_id,
+            object='chat.completion.chunk',
+            model=model,
+            choices=[_Obj(index=0, delta=delta, finish_reason=finish_reason)],
+        )
@@ -0,0 +1,182 @@
+"""
+Compact, memory-bounded DataFrame construction for analysis input.
+
+pd.DataFrame(records) stores every number as int64 or float64 and every
+string as a Python object. build_frame() builds the frame in batches and
+gives each column the smallest dtype that holds its values exactly:
+integers are downcast, floats become float32 only when no value changes,
+numeric date strings (2024-01-31, 31/01/2024) become datetime64 and
+low-cardinality strings become categoricals. The size of the optimized frame is estimated from the first
+batch, so input that would exceed the per-request memory ceiling is
+rejected (or uniformly sampled, if asked) before it is built.
+"""
+from django.conf import settings
+
+from .lazy import lazy_import
+from . import trends
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+AI_ANALYSIS_CONFIG = getattr(settings, 'AI_ANALYSIS_CONFIG', {})
+
+OVERSIZE_POLICIES = ('reject', 'sample')
+
+
+def frame_bytes(df):
+    """Memory used by a DataFrame, including the Python strings it references."""
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+def downcast_numeric(df):
+    """Downcast numeric columns in place to the smallest exact dtype."""
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            if len(series) and series.min() >= 0:
+                df[col] = pd.to_numeric(series, downcast='unsigned')
+            else:
+                df[col] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series) and series.dtype != np.float32:
+            narrowed = series.astype(np.float32)
+            # Only lossless narrowing; analyses should not see rounded inputs
+            if ((narrowed.astype(series.dtype) == series) | series.isna()).all():
+                df[col] = narrowed
+    return df
+
+
+def optimize_text(df, max_category_ratio=None):
+    """Convert date strings to datetime64 and repetitive strings to categoricals, in place."""
+    if max_category_ratio is None:
+        max_category_ratio = AI_ANALYSIS_CONFIG.get('max_category_ratio', 0.5)
+    for col in df.columns:
+        series = df[col]
+        if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+            continue
+        parsed = trends.parse_dates(series)
+        if parsed is not None and parsed.notna().sum() == series.notna().sum():
+            df[col] = parsed
+            continue
+        values = series.dropna()
+        # Dicts and lists are unhashable and stay as objects
+        if len(values) and values.map(type).isin([str]).all():
+            if values.nunique() <= max_category_ratio * len(values):
+                df[col] = series.astype('category')
+    return df
+
+
+def optimize_dtypes(df, max_category_ratio=None):
+    """Compact every column of df in place; returns df."""
+    downcast_numeric(df)
+    optimize_text(df, max_category_ratio)
+    return df
+
+
+def concat_frames(frames):
+    """
+    Concatenate frames compacted by optimize_dtypes into one compact frame.
+
+    Categoricals shared by every frame are given a common set of
+    categories first, so concat keeps them; columns concat had to widen
+    (integers downcast differently, text optimized in some frames only)
+    are compacted again.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    for col in frames[0].columns:
+        if all(col in frame and isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames):
+            categories = frames[0][col].cat.categories
+            for frame in frames[1:]:
+                categories = categories.union(frame[col].cat.categories)
+            for frame in frames:
+                frame[col] = frame[col].cat.set_categories(categories)
+    return optimize_dtypes(pd.concat(frames, ignore_index=True))
+
+
+def build_frame(records, max_bytes=None, oversize=None, random_state=42):
+    """
+    Build a compact DataFrame from a list of JSON records.
+
+    Returns (df, report). report has the row counts, the bytes a plain
+    pd.DataFrame of the used rows would take (bytes_before) and the bytes
+    of the returned frame (bytes_after). When the estimated optimized size
+    exceeds max_bytes, or the built frame does, oversize='reject' raises
+    ValueError and 'sample' keeps a uniform sample of rows that fits,
+    noted in the report.
+    """
+    if max_bytes is None:
+        max_bytes = AI_ANALYSIS_CONFIG.get('max_frame_mb', 512) * 1024 * 1024
+    oversize = oversize or AI_ANALYSIS_CONFIG.get('oversize_policy', 'reject')
+    if oversize not in OVERSIZE_POLICIES:
+        raise ValueError(f"Unknown oversize policy '{oversize}'; use one of {', '.join(OVERSIZE_POLICIES)}")
+    if isinstance(records, dict):
+        records = [records]
+    records = list(records)
+    total_rows = len(records)
+    batch_rows = AI_ANALYSIS_CONFIG.get('ingest_batch_rows', 50000)
+
+    report = {'rows_received': total_rows, 'sampled': False}
+    first = pd.DataFrame(records[:batch_rows])
+    if total_rows > len(first) and max_bytes:
+        # Estimate the optimized size from the first batch before building the rest
+        per_row = frame_bytes(optimize_dtypes(first.copy())) / max(len(first), 1)
+        estimated = int(per_row * total_rows)
+        if estimated > max_bytes:
+            report['bytes_estimated'] = estimated
+            if oversize == 'reject':
+                raise ValueError(
+                    f"Input needs about {estimated / 2 ** 20:.0f} MB after optimization, "
+                    f"over the {max_bytes / 2 ** 20:.0f} MB limit per request; "
+                    f"send fewer rows or use parameters.oversize='sample'"
+                )
+            # Headroom for the estimate, which comes from the first batch only
+            keep = max(1, int(0.9 * max_bytes // per_row))
+            rng = np.random.default_rng(random_state)
+            rows = np.sort(rng.choice(total_rows, size=keep, replace=False))
+            records = [records[i] for i in rows]
+            first = pd.DataFrame(records[:batch_rows])
+            report['sampled'] = True
+
+    bytes_before = 0
+    batches = []
+    for start in range(0, len(records), batch_rows):
+        batch = first if start == 0 else pd.DataFrame(records[start:start + batch_rows])
+        bytes_before += frame_bytes(batch)
+        batches.append(downcast_numeric(batch))
+    del first
+
+    if not batches:
+        df = pd.DataFrame(records)
+    elif len(batches) == 1:
+        df = batches[0]
+    else:
+        # Batches may downcast differently; concat widens to a common dtype
+        df = pd.concat(batches, ignore_index=True)
+    optimize_text(df)
+
+    bytes_after = frame_bytes(df)
+    if max_bytes and bytes_after > max_bytes:
+        if oversize == 'reject':
+            raise ValueError(
+                f"Input needs {bytes_after / 2 ** 20:.0f} MB after optimization, "
+                f"over the {max_bytes / 2 ** 20:.0f} MB limit per request"
+            )
+        # The first batch underestimated the rest; sample the built frame down
+        report['bytes_estimated'] = bytes_after
+        rng = np.random.default_rng(random_state)
+        while bytes_after > max_bytes and len(df) > 1:
+            keep = max(1, int(0.9 * len(df) * max_bytes / bytes_after))
+            rows = np.sort(rng.choice(len(df), size=keep, replace=False))
+            df = df.iloc[rows].reset_index(drop=True)
+            bytes_after = frame_bytes(df)
+        report['sampled'] = True
+    report.update({
+        'rows_used': len(df),
+        'bytes_before': bytes_before,
+        'bytes_after': bytes_after,
+        'reduction': round(1 - bytes_after / bytes_before, 4) if bytes_before else 0.0,
+    })
+    return df, report
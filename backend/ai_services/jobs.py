@@ -0,0 +1,240 @@
+import json
+import logging
+import math
+import multiprocessing
+import signal
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from . import compute
+from .models import AIRequest, AIService
+from .usage import usage_aggregator
+
+
+logger = logging.getLogger(__name__)
+
+AI_JOB_CONFIG = getattr(settings, 'AI_JOB_CONFIG', {})
+DEFAULT_TIMEOUT = AI_JOB_CONFIG.get('default_timeout', 300)
+MAX_TIMEOUT = AI_JOB_CONFIG.get('max_timeout', 1800)
+POLL_INTERVAL = AI_JOB_CONFIG.get('poll_interval', 1.0)
+# Seconds a stopped job process gets to exit before it is killed
+STOP_GRACE = AI_JOB_CONFIG.get('stop_grace', 5.0)
+
+
+def _run_text_generation(job):
+    from .services import TextGenerationService
+    service = TextGenerationService()
+    service.attach_job(job)
+    return service.generate_text(job.input_data, user=job.user, **job.job_params)
+
+
+def _run_data_analysis(job):
+    from .services import DataAnalysisService
+    service = DataAnalysisService()
+    service.attach_job(job)
+    params = dict(job.job_params)
+    dataset_id = params.pop('dataset_id', None)
+    if dataset_id is not None:
+        return service.analyze_dataset(dataset_id, user=job.user, **params)
+    return service.analyze_data(json.loads(job.input_data), user=job.user, **params)
+
+
+# job_type -> (AIService name, runner)
+JOB_TYPES = {
+    'text_generation': ('Text Generation', _run_text_generation),
+    'data_analysis': ('Data Analysis', _run_data_analysis),
+}
+
+
+def clean_timeout(timeout):
+    """Seconds a job may run: DEFAULT_TIMEOUT when unset, at most MAX_TIMEOUT."""
+    if timeout is None or timeout == '':
+        return DEFAULT_TIMEOUT
+    if isinstance(timeout, bool):
+        raise ValueError("Timeout must be a number of seconds")
+    try:
+        timeout = float(timeout)
+    except (TypeError, ValueError):
+        raise ValueError("Timeout must be a number of seconds")
+    if not math.isfinite(timeout) or timeout <= 0:
+        raise ValueError("Timeout must be a positive number of seconds")
+    return min(timeout, MAX_TIMEOUT)
+
+
+def enqueue(job_type, input_data, user=None, params=None, timeout=None):
+    """Queue an AI request for a background worker and return its AIRequest."""
+    if job_type not in JOB_TYPES:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+    service_name, _ = JOB_TYPES[job_type]
+    return AIRequest.objects.create(
+        user=user,
+        service=AIService.objects.get(name=service_name),
+        input_data=input_data,
+        job_type=job_type,
+        job_params=params or {},
+        timeout=clean_timeout(timeout),
+        status='pending'
+    )
+
+
+def cancel(job):
+    """Cancel a pending or running job. Returns False if it already finished."""
+    updated = AIRequest.objects.filter(
+        pk=job.pk, status__in=['pending', 'processing']
+    ).update(status='cancelled', completed_at=timezone.now())
+    job.refresh_from_db()
+    return bool(updated)
+
+
+def claim_next():
+    """Claim the oldest pending job for this worker, or return None."""
+    with transaction.atomic():
+        pending = AIRequest.objects.filter(status='pending').exclude(job_type='').order_by('created_at')
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        job = pending.first()
+        if job is None:
+            return None
+        # The conditional update keeps the claim exclusive on backends
+        # without row locking, such as SQLite.
+        claimed = AIRequest.objects.filter(pk=job.pk, status='pending').update(
+            status='processing',
+            started_at=timezone.now()
+        )
+
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def expire(job, now=None):
+    """Fail a running job that has exceeded its timeout."""
+    now = now or timezone.now()
+    started_at = job.started_at or now
+    return AIRequest.objects.filter(pk=job.pk, status='processing').update(
+        status='failed',
+        error_message=f"Job exceeded its timeout of {job.timeout or DEFAULT_TIMEOUT:g}s",
+        processing_time=(now - started_at).total_seconds(),
+        completed_at=now
+    )
+
+
+def reap_expired():
+    """Fail running jobs whose deadline passed, e.g. after a worker crash."""
+    now = timezone.now()
+    reaped = 0
+    running = AIRequest.objects.filter(
+        status='processing', started_at__isnull=False
+    ).exclude(job_type='').only('pk', 'started_at', 'timeout')
+    for job in running:
+        if job.started_at + timedelta(seconds=job.timeout or DEFAULT_TIMEOUT) < now:
+            reaped += expire(job, now)
+    return reaped
+
+
+def _execute(job_pk):
+    job = AIRequest.objects.select_related('user').get(pk=job_pk)
+    _, runner = JOB_TYPES[job.job_type]
+    try:
+        runner(job)
+    except Exception as e:
+        logger.exception("AI job %s failed", job_pk)
+        # Errors raised before the service started tracking the request
+        # would otherwise leave the job stuck in processing.
+        AIRequest.objects.filter(pk=job_pk, status='processing').update(
+            status='failed',
+            error_message=str(e),
+            completed_at=timezone.now()
+        )
+
+
+def _stopped(signum, frame):
+    raise SystemExit(1)
+
+
+def _run_in_process(job_pk):
+    """Entry point of a job process."""
+    # terminate() sends SIGTERM; unwinding lets the job release its
+    # shared memory and stop its analysis workers on the way out
+    signal.signal(signal.SIGTERM, _stopped)
+    try:
+        _execute(job_pk)
+    finally:
+        # The process ends with os._exit, which skips atexit handlers
+        usage_aggregator.flush()
+        compute.terminate()
+        connections.close_all()
+
+
+def _run_in_thread(job_pk):
+    try:
+        _execute(job_pk)
+    finally:
+        connection.close()
+
+
+def _start(job):
+    """Start the job in a child process, or a thread where processes cannot be forked."""
+    if AI_JOB_CONFIG.get('isolation', 'process') == 'process':
+        try:
+            context = multiprocessing.get_context(AI_JOB_CONFIG.get('start_method', 'fork'))
+        except ValueError:
+            logger.warning("Cannot fork job processes here; AI jobs run in threads that cannot be stopped")
+        else:
+            # The child must not share this process's database connections
+            connections.close_all()
+            # Not a daemon: daemonic processes may not start analysis workers
+            worker = context.Process(target=_run_in_process, args=(job.pk,), name=f"ai-job-{job.pk}")
+            worker.start()
+            return worker
+
+    # A thread cannot be killed; its result is discarded because
+    # complete_request only finishes jobs still marked as processing.
+    worker = threading.Thread(target=_run_in_thread, args=(job.pk,), name=f"ai-job-{job.pk}", daemon=True)
+    worker.start()
+    return worker
+
+
+def _stop(worker):
+    if not isinstance(worker, multiprocessing.process.BaseProcess):
+        return
+    worker.terminate()
+    worker.join(STOP_GRACE)
+    if worker.is_alive():
+        worker.kill()
+        worker.join()
+
+
+def run_job(job, poll_interval=POLL_INTERVAL):
+    """Run a claimed job, enforcing its timeout and honouring cancellation."""
+    worker = _start(job)
+    deadline = time.monotonic() + (job.timeout or DEFAULT_TIMEOUT)
+
+    while True:
+        worker.join(poll_interval)
+        if not worker.is_alive():
+            break
+        if time.monotonic() >= deadline:
+            expire(job)
+            _stop(worker)
+            break
+        if AIRequest.objects.filter(pk=job.pk, status='cancelled').exists():
+            _stop(worker)
+            break
+
+    if getattr(worker, 'exitcode', 0):
+        # Killed from outside, e.g. by the kernel's OOM killer
+        AIRequest.objects.filter(pk=job.pk, status='processing').update(
+            status='failed',
+            error_message=f"Job process exited with code {worker.exitcode}",
+            completed_at=timezone.now()
+        )
+    job.refresh_from_db()
+    return job
@@ -0,0 +1,54 @@
+"""
+Deferred imports for heavy optional backends.
+
+numpy, pandas, scikit-learn, plotly, textblob and openai together add
+seconds to a cold start. Modules wrapped with lazy_import() are only
+imported the first time an attribute is used, so serving portfolio pages
+never pays for them.
+"""
+import importlib
+import time
+
+
+_import_times = {}
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_module', None)
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(self._name)
+            _import_times.setdefault(self._name, time.perf_counter() - start)
+            object.__setattr__(self, '_module', module)
+        return module
+
+    @property
+    def is_loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    """Return a proxy for module name that imports it on first use."""
+    return LazyModule(name)
+
+
+def import_times():
+    """Seconds spent importing each lazily loaded module in this process."""
+    return dict(_import_times)
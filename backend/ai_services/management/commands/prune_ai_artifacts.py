@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from ai_services import artifacts
+
+
+class Command(BaseCommand):
+    help = 'Delete expired and orphaned analysis artifacts'
+
+    def handle(self, *args, **options):
+        removed = artifacts.prune()
+        for kind, count in removed.items():
+            self.stdout.write(f'Removed {count} {kind} file(s)')
+        self.stdout.write(self.style.SUCCESS('Artifact pruning complete.'))
@@ -0,0 +1,79 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Modules the serverless entry point loads before it can serve a page
+ENTRY_POINTS = ['portfolio.urls', 'ai_services.views', 'ai_services.services']
+
+# Optional backends that ai_services loads lazily
+HEAVY_MODULES = [
+    'numpy', 'pandas', 'sklearn.cluster', 'sklearn.decomposition',
+    'textblob', 'openai', 'feedparser',
+]
+
+# Runs in a fresh interpreter so every measurement is a cold import
+PROBE = """
+import importlib, json, sys, time
+import django
+django.setup()
+heavy = json.loads(sys.argv[2])
+already = {name for name in heavy if name in sys.modules}
+start = time.perf_counter()
+try:
+    importlib.import_module(sys.argv[1])
+    error = None
+except Exception as e:
+    error = repr(e)
+elapsed = time.perf_counter() - start
+pulled = [name for name in heavy if name in sys.modules and name not in already]
+print(json.dumps({'seconds': elapsed, 'pulled_in': pulled, 'error': error}))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Report the cold-start import cost of the app entry points and heavy AI backends'
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*', help='Extra modules to measure')
+        parser.add_argument('--budget-ms', type=float, default=None,
+                            help='Fail if any entry point takes longer than this to import')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'portfolio.settings'))
+        over_budget = []
+
+        self.stdout.write(f"{'module':<28}{'import ms':>12}  heavy modules pulled in")
+        for name in ENTRY_POINTS + HEAVY_MODULES + options['modules']:
+            report = self._measure(name, env)
+            if report['error']:
+                self.stdout.write(self.style.WARNING(f"{name:<28}{'-':>12}  {report['error']}"))
+                continue
+
+            ms = report['seconds'] * 1000
+            pulled = [module for module in report['pulled_in'] if module != name]
+            line = f"{name:<28}{ms:>12.1f}  {', '.join(pulled) or '-'}"
+            if name in ENTRY_POINTS and options['budget_ms'] is not None and ms > options['budget_ms']:
+                over_budget.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        if over_budget:
+            raise CommandError(f"Import budget of {options['budget_ms']:g} ms exceeded by: {', '.join(over_budget)}")
+
+    def _measure(self, name, env):
+        completed = subprocess.run(
+            [sys.executable, '-c', PROBE, name, json.dumps(HEAVY_MODULES)],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode != 0:
+            return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'failed'}
+        return json.loads(completed.stdout.strip().splitlines()[-1])
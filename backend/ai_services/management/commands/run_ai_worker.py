@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from ai_services import jobs
+from ai_services.usage import usage_aggregator
+
+
+class Command(BaseCommand):
+    help = 'Process queued AI requests in the background'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Exit after this many jobs (0 = no limit)')
+        parser.add_argument('--poll-interval', type=float, default=jobs.POLL_INTERVAL,
+                            help='Seconds to wait between queue polls')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Starting AI worker...')
+        processed = 0
+        
+        try:
+            while not options['max_jobs'] or processed < options['max_jobs']:
+                close_old_connections()
+                reaped = jobs.reap_expired()
+                if reaped:
+                    self.stdout.write(self.style.WARNING(f'Failed {reaped} expired job(s)'))
+                
+                job = jobs.claim_next()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                
+                job = jobs.run_job(job, poll_interval=options['poll_interval'])
+                processed += 1
+                self.stdout.write(f'Job {job.pk} ({job.job_type}): {job.status}')
+        except KeyboardInterrupt:
+            pass
+        finally:
+            usage_aggregator.flush()
+        
+        self.stdout.write(self.style.SUCCESS(f'AI worker stopped after {processed} job(s).'))
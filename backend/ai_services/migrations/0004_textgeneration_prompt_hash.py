@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_services', '0003_airequest_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='textgeneration',
+            name='prompt_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='textgeneration',
+            index=models.Index(fields=['prompt_hash', 'created_at'], name='ai_services_prompt__e08838_idx'),
+        ),
+    ]
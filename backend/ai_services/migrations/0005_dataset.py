@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('ai_services', '0004_textgeneration_prompt_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Dataset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('name', models.CharField(blank=True, max_length=200)),
+                ('source_format', models.CharField(choices=[('json', 'JSON'), ('csv', 'CSV'), ('ndjson', 'NDJSON')], default='json', max_length=20)),
+                ('row_count', models.IntegerField(default=0)),
+                ('column_count', models.IntegerField(default=0)),
+                ('columns', models.JSONField(default=list)),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='dataanalysis',
+            name='dataset',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='analyses', to='ai_services.dataset'),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(fields=['content_hash'], name='ai_services_content_145957_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_services', '0005_dataset'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataanalysis',
+            name='cache_key',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='dataanalysis',
+            index=models.Index(fields=['cache_key', 'created_at'], name='ai_services_cache_k_e1bb64_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_services', '0006_dataanalysis_cache_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataanalysis',
+            name='analysis_type',
+            field=models.CharField(choices=[('descriptive', 'Descriptive Statistics'), ('correlation', 'Correlation Analysis'), ('trend', 'Trend Analysis'), ('prediction', 'Prediction Model'), ('clustering', 'Clustering Analysis'), ('anomaly', 'Anomaly Detection')], max_length=20),
+        ),
+    ]
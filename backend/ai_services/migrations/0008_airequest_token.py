@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:20
+
+import uuid
+
+from django.db import migrations, models
+
+
+def fill_tokens(apps, schema_editor):
+    AIRequest = apps.get_model('ai_services', 'AIRequest')
+    for request in AIRequest.objects.only('pk'):
+        AIRequest.objects.filter(pk=request.pk).update(token=uuid.uuid4())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_services', '0007_dataanalysis_anomaly'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airequest',
+            name='token',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='airequest',
+            name='token',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
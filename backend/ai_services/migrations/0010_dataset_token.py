@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:05
+
+import uuid
+
+from django.db import migrations, models
+
+
+def fill_tokens(apps, schema_editor):
+    Dataset = apps.get_model('ai_services', 'Dataset')
+    for dataset in Dataset.objects.only('pk'):
+        Dataset.objects.filter(pk=dataset.pk).update(token=uuid.uuid4())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_services', '0009_dataanalysis_matrix_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='token',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='dataset',
+            name='token',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+COUNTER_FIELDS = ('requests_count', 'successful_requests', 'failed_requests', 'total_processing_time')
+
+
+def merge_anonymous_duplicates(apps, schema_editor):
+    """Fold duplicate anonymous rows for a service and day into the oldest one."""
+    AIUsage = apps.get_model('ai_services', 'AIUsage')
+    duplicates = (
+        AIUsage.objects.filter(user__isnull=True)
+        .values('service_id', 'date')
+        .annotate(rows=models.Count('id'))
+        .filter(rows__gt=1)
+    )
+    for group in duplicates:
+        rows = list(AIUsage.objects.filter(
+            user__isnull=True, service_id=group['service_id'], date=group['date']
+        ).order_by('id'))
+        keep = rows[0]
+        for row in rows[1:]:
+            for field in COUNTER_FIELDS:
+                setattr(keep, field, getattr(keep, field) + getattr(row, field))
+        keep.save(update_fields=COUNTER_FIELDS)
+        AIUsage.objects.filter(pk__in=[row.pk for row in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_services', '0010_dataset_token'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_anonymous_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='aiusage',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('service', 'date'), name='unique_anonymous_usage_per_day'),
+        ),
+    ]
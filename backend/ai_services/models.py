@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -36,14 +38,24 @@ class AIRequest(models.Model):
         ('processing', 'Processing'),
         ('completed', 'Completed'),
         ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
     ], default='pending')
     error_message = models.TextField(blank=True)
     processing_time = models.FloatField(null=True, blank=True)  # in seconds
+    # Background job fields, only set for requests queued with jobs.enqueue()
+    job_type = models.CharField(max_length=50, blank=True)
+    job_params = models.JSONField(default=dict, blank=True)
+    timeout = models.FloatField(null=True, blank=True)  # in seconds
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)  # Identifies queued jobs in the polling API
     created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
 
     def __str__(self):
         return f"{self.service.name} - {self.status} ({self.created_at})"
@@ -58,9 +70,18 @@ class SentimentAnalysis(models.Model):
         ('neutral', 'Neutral'),
     ])
     confidence = models.FloatField()  # 0.0 to 1.0
+    polarity = models.FloatField(null=True, blank=True)
+    subjectivity = models.FloatField(null=True, blank=True)
     keywords = models.JSONField(default=list)  # List of important keywords
+    text_hash = models.CharField(max_length=64, blank=True)  # SHA-256 of normalized text + scorer version
+    scorer_version = models.CharField(max_length=20, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['text_hash', 'scorer_version']),
+        ]
+
     def __str__(self):
         return f"{self.sentiment} ({self.confidence:.2f}) - {self.text[:50]}..."
 
@@ -71,12 +92,46 @@ class TextGeneration(models.Model):
     generated_text = models.TextField()
     model_used = models.CharField(max_length=100)
     parameters = models.JSONField(default=dict)  # Generation parameters
+    prompt_hash = models.CharField(max_length=64, blank=True)  # Set for cacheable generations
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['prompt_hash', 'created_at']),
+        ]
+
     def __str__(self):
         return f"{self.model_used} - {self.prompt[:50]}..."
 
 
+class Dataset(models.Model):
+    """Uploaded dataset, stored once by content hash and analyzed by id."""
+    content_hash = models.CharField(max_length=64)  # SHA-256 of the uploaded content
+    name = models.CharField(max_length=200, blank=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    source_format = models.CharField(max_length=20, choices=[
+        ('json', 'JSON'),
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    ], default='json')
+    row_count = models.IntegerField(default=0)
+    column_count = models.IntegerField(default=0)
+    columns = models.JSONField(default=list)
+    size_bytes = models.BigIntegerField(default=0)
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)  # Identifies the dataset in the API
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['content_hash']),
+        ]
+
+    def __str__(self):
+        return f"{self.name or self.content_hash[:12]} ({self.row_count} rows)"
+
+
 class DataAnalysis(models.Model):
     """Model for data analysis results."""
     ANALYSIS_TYPES = [
@@ -85,16 +140,29 @@ class DataAnalysis(models.Model):
         ('trend', 'Trend Analysis'),
         ('prediction', 'Prediction Model'),
         ('clustering', 'Clustering Analysis'),
+        ('anomaly', 'Anomaly Detection'),
     ]
     
     name = models.CharField(max_length=200)
     analysis_type = models.CharField(max_length=20, choices=ANALYSIS_TYPES)
     input_data = models.JSONField()  # Input data structure
+    dataset = models.ForeignKey(Dataset, on_delete=models.SET_NULL, null=True, blank=True, related_name='analyses')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     results = models.JSONField()  # Analysis results
     visualizations = models.JSONField(default=list)  # Chart configurations
     insights = models.TextField(blank=True)
+    cache_key = models.CharField(max_length=64, blank=True)  # SHA-256 of data hash, type, parameters and version
+    # Spilled correlation matrix, a file in the artifact directory deleted once it expires
+    matrix_file = models.CharField(max_length=100, blank=True)
+    matrix_expires_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['cache_key', 'created_at']),
+            models.Index(fields=['matrix_expires_at']),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.get_analysis_type_display()})"
 
@@ -126,6 +194,12 @@ class AIUsage(models.Model):
 
     class Meta:
         unique_together = ['service', 'user', 'date']
+        constraints = [
+            # unique_together does not apply to rows without a user, since NULLs never compare equal
+            models.UniqueConstraint(
+                fields=['service', 'date'], condition=models.Q(user__isnull=True), name='unique_anonymous_usage_per_day'
+            ),
+        ]
         ordering = ['-date']
 
     def __str__(self):
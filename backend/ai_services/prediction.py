@@ -0,0 +1,272 @@
+"""
+Incrementally trained prediction models.
+
+A prediction analysis fits a linear model (SGDRegressor, or SGDClassifier
+for categorical targets) one chunk of rows at a time with partial_fit,
+with feature scaling updated the same way, so a model can be trained on
+an upload that never fits in memory and refreshed later as new rows
+arrive. Every chunk is scored before the model learns from it
+(progressive validation), which gives held-out metrics without setting
+rows aside. Trained models are stored through the model registry as
+AIModel rows, one row per version, so later requests apply or refresh
+them instead of retraining.
+"""
+from django.conf import settings
+
+from .lazy import lazy_import
+from . import registry
+from . import sketches
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+sk_linear = lazy_import('sklearn.linear_model')
+sk_preprocessing = lazy_import('sklearn.preprocessing')
+
+
+AI_ANALYSIS_CONFIG = getattr(settings, 'AI_ANALYSIS_CONFIG', {})
+
+MODEL_TYPE = 'prediction'
+TASKS = ('regression', 'classification')
+# Confusion matrices are only kept for this many classes or fewer
+MAX_CONFUSION_CLASSES = 20
+
+
+def infer_task(target):
+    """'regression' for a numeric target Series, 'classification' for text, categories or booleans."""
+    if pd.api.types.is_numeric_dtype(target) and not pd.api.types.is_bool_dtype(target):
+        return 'regression'
+    return 'classification'
+
+
+class Metrics:
+    """Running error metrics of predictions against known targets."""
+
+    def __init__(self, task, classes=None):
+        self.task = task
+        self.n = 0
+        if task == 'classification':
+            self.classes = np.asarray(classes)
+            self.correct = 0
+            k = len(self.classes)
+            self.confusion = np.zeros((k, k), dtype=np.int64) if k <= MAX_CONFUSION_CLASSES else None
+        else:
+            self.sse = 0.0
+            self.sae = 0.0
+            self.targets = sketches.Moments(1)
+
+    def update(self, y, predicted):
+        if not len(y):
+            return
+        self.n += len(y)
+        if self.task == 'classification':
+            self.correct += int((predicted == y).sum())
+            if self.confusion is not None:
+                np.add.at(self.confusion, (self._index(y), self._index(predicted)), 1)
+        else:
+            errors = predicted - y
+            self.sse += float(errors @ errors)
+            self.sae += float(np.abs(errors).sum())
+            self.targets.update(y[:, None])
+
+    def _index(self, labels):
+        return np.searchsorted(self.classes, labels)
+
+    def results(self):
+        if not self.n:
+            return {'rows': 0}
+        if self.task == 'classification':
+            results = {'rows': self.n, 'accuracy': self.correct / self.n}
+            if self.confusion is not None:
+                # Rows are actual classes, columns predicted ones
+                results['confusion_matrix'] = self.confusion.tolist()
+            return results
+        sst = float(self.targets.m2[0])
+        return {
+            'rows': self.n,
+            'rmse': float(np.sqrt(self.sse / self.n)),
+            'mae': self.sae / self.n,
+            'r_squared': 1 - self.sse / sst if sst > 0 else None,
+        }
+
+
+class IncrementalModel:
+    """
+    Linear model of one target column, trained chunk by chunk.
+
+    Features default to the numeric columns of the first chunk other than
+    the target. The task is classification for non-numeric or boolean
+    targets and regression otherwise. Classification needs every class up
+    front: pass classes, or the first chunk's classes are used and later
+    rows with other labels are skipped.
+    """
+
+    def __init__(self, target, features=None, task=None, classes=None, alpha=None, random_state=42):
+        if task is not None and task not in TASKS:
+            raise ValueError(f"Unknown prediction task '{task}'; use one of {', '.join(TASKS)}")
+        self.target = target
+        self.features = list(features) if features else None
+        self.task = task
+        self.classes = None if classes is None else np.unique(np.asarray(classes))
+        self.alpha = alpha or AI_ANALYSIS_CONFIG.get('prediction_alpha', 1e-4)
+        self.random_state = random_state
+        self.rows_trained = 0
+        self.chunks_trained = 0
+        self.skipped_rows = 0
+        self.estimator = None
+
+    def _setup(self, chunk):
+        if self.target not in chunk.columns:
+            raise ValueError(f"Target column '{self.target}' not found")
+        target = chunk[self.target]
+        if self.features is None:
+            numeric = chunk.select_dtypes(include=[np.number, 'bool']).columns
+            self.features = [col for col in numeric if col != self.target]
+        if not self.features:
+            raise ValueError("Prediction needs at least one numeric feature column")
+        if self.task is None:
+            self.task = infer_task(target)
+
+        self.scaler = sk_preprocessing.StandardScaler()
+        if self.task == 'classification':
+            if self.classes is None:
+                self.classes = np.unique(target.dropna().to_numpy())
+            if len(self.classes) < 2:
+                raise ValueError("Classification needs at least two target classes")
+            self.estimator = sk_linear.SGDClassifier(
+                loss='log_loss', alpha=self.alpha, random_state=self.random_state
+            )
+        else:
+            # The target is standardized with the first chunk's statistics
+            # so the default learning rate suits any target scale
+            values = pd.to_numeric(target, errors='coerce').to_numpy(dtype=float)
+            values = values[np.isfinite(values)]
+            self.y_mean = float(values.mean()) if len(values) else 0.0
+            y_scale = float(values.std()) if len(values) > 1 else 0.0
+            self.y_scale = y_scale if y_scale > 0 else 1.0
+            self.estimator = sk_linear.SGDRegressor(alpha=self.alpha, random_state=self.random_state)
+        self.validation = Metrics(self.task, self.classes)
+
+    def _feature_values(self, chunk):
+        # Missing feature columns and non-numeric values count as missing
+        return pd.DataFrame({
+            col: pd.to_numeric(chunk[col], errors='coerce') if col in chunk else np.nan
+            for col in self.features
+        }, index=chunk.index).to_numpy(dtype=float)
+
+    def _target_values(self, chunk):
+        """Known target values and the mask of rows they come from."""
+        if self.task == 'classification':
+            y = chunk[self.target].to_numpy()
+            valid = pd.notna(y) & np.isin(y, self.classes)
+        else:
+            y = pd.to_numeric(chunk[self.target], errors='coerce').to_numpy(dtype=float)
+            valid = np.isfinite(y)
+        return y[valid], valid
+
+    def _transform(self, values):
+        # Standardized missing values become 0, the running mean
+        return np.nan_to_num(self.scaler.transform(values), nan=0.0)
+
+    def _predict_scaled(self, scaled):
+        predicted = self.estimator.predict(scaled)
+        if self.task == 'regression':
+            predicted = predicted * self.y_scale + self.y_mean
+        return predicted
+
+    def partial_fit(self, chunk, repeat=False):
+        """
+        Train on one DataFrame chunk.
+
+        Rows are first scored by the model as it was before this chunk;
+        returns (targets, predictions) for those rows, or None when nothing
+        was scored. repeat marks a chunk trained on in an earlier pass,
+        which is neither scored nor counted again.
+        """
+        if self.estimator is None:
+            self._setup(chunk)
+        y, valid = self._target_values(chunk)
+        if not repeat:
+            self.skipped_rows += int((~valid).sum())
+        if not len(y):
+            return None
+        values = self._feature_values(chunk)[valid]
+
+        scored = None
+        if not repeat and self.rows_trained:
+            scored = (y, self._predict_scaled(self._transform(values)))
+            self.validation.update(*scored)
+
+        self.scaler.partial_fit(values)
+        scaled = self._transform(values)
+        if self.task == 'classification':
+            self.estimator.partial_fit(scaled, y, classes=self.classes)
+        else:
+            self.estimator.partial_fit(scaled, (y - self.y_mean) / self.y_scale)
+        if not repeat:
+            self.rows_trained += len(y)
+            self.chunks_trained += 1
+        return scored
+
+    def predict(self, chunk):
+        """Predictions for every row of a DataFrame chunk."""
+        if not self.rows_trained:
+            raise ValueError("Model has not been trained")
+        return self._predict_scaled(self._transform(self._feature_values(chunk)))
+
+    def evaluate(self, chunk, metrics):
+        """Predict a chunk and fold rows with a known target into metrics; returns the predictions."""
+        predicted = self.predict(chunk)
+        if self.target in chunk.columns:
+            y, valid = self._target_values(chunk)
+            metrics.update(y, predicted[valid])
+        return predicted
+
+    def coefficients(self):
+        """
+        Feature weights on standardized features.
+
+        Regression weights are in target units per standard deviation of
+        the feature; classification weights are log-odds per class.
+        """
+        if self.task == 'regression':
+            weights = self.estimator.coef_ * self.y_scale
+            return {str(col): float(w) for col, w in zip(self.features, weights)}
+        # Binary classifiers have one row of weights, for the second class
+        labels = self.classes[1:] if len(self.classes) == 2 else self.classes
+        return {
+            str(label): {str(col): float(w) for col, w in zip(self.features, row)}
+            for label, row in zip(labels, self.estimator.coef_)
+        }
+
+    def config(self):
+        """JSON description stored as the AIModel parameters."""
+        return {
+            'target': self.target,
+            'features': [str(col) for col in self.features],
+            'task': self.task,
+            'classes': None if self.classes is None else self.classes.tolist(),
+            'estimator': type(self.estimator).__name__,
+            'alpha': self.alpha,
+            'rows_trained': self.rows_trained,
+            'chunks_trained': self.chunks_trained,
+            'validation': self.validation.results(),
+        }
+
+
+def register(model, name=None):
+    """Store a trained model and register it as the next version of name; returns the AIModel."""
+    return registry.save(
+        model,
+        name or f"{model.target} {model.task}",
+        MODEL_TYPE,
+        parameters=model.config(),
+        description=(
+            f"{type(model.estimator).__name__} predicting {model.target} from "
+            f"{len(model.features)} features, trained on {model.rows_trained} rows"
+        )
+    )
+
+
+def load(model_id, writable=False):
+    """Return (AIModel, IncrementalModel) for a registered prediction model; see registry.load."""
+    return registry.load(model_id, model_type=MODEL_TYPE, writable=writable)
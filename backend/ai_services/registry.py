@@ -0,0 +1,116 @@
+"""
+Fitted model registry backed by the AIModel table.
+
+save() writes a fitted estimator to the artifact directory with joblib,
+uncompressed so its numpy arrays can be memory-mapped, and registers it
+as the next version of an AIModel name. load() returns the estimator for
+an AIModel id from a process-wide LRU bounded by total bytes; a miss
+maps the file read-only instead of copying the arrays into memory, so
+processes serving the same model share its pages. Cached entries carry
+the version they were loaded at: saving or deleting the AIModel row
+evicts them, and a row whose version no longer matches (changed by
+another process) is reloaded. Inference with a known model is one
+primary-key query, a cache lookup and predict.
+"""
+import os
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .cache import LRUCache
+from .lazy import lazy_import
+from .models import AIModel
+
+joblib = lazy_import('joblib')
+
+
+AI_ANALYSIS_CONFIG = getattr(settings, 'AI_ANALYSIS_CONFIG', {})
+
+_models = LRUCache(
+    max_size=AI_ANALYSIS_CONFIG.get('model_cache_size', 64),
+    max_bytes=AI_ANALYSIS_CONFIG.get('model_cache_mb', 256) * 1024 * 1024
+)
+
+
+def model_dir():
+    directory = os.path.join(
+        AI_ANALYSIS_CONFIG.get('artifact_dir') or os.path.join(settings.BASE_DIR, 'ai_artifacts'),
+        'models'
+    )
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def model_path(ai_model):
+    return os.path.join(model_dir(), f"{ai_model.pk}.joblib")
+
+
+def next_version(name, model_type):
+    versions = AIModel.objects.filter(name=name, model_type=model_type).values_list('version', flat=True)
+    return str(max((int(v) for v in versions if v.isdigit()), default=0) + 1)
+
+
+def save(estimator, name, model_type, parameters=None, description=''):
+    """Store a fitted estimator as the next version of name; returns the AIModel."""
+    with transaction.atomic():
+        ai_model = AIModel.objects.create(
+            name=name,
+            model_type=model_type,
+            version=next_version(name, model_type),
+            description=description,
+            parameters=parameters or {}
+        )
+        # A failed write rolls the registration back
+        path = model_path(ai_model)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(estimator, temporary)
+        os.replace(temporary, path)
+    return ai_model
+
+
+def load(model_id, model_type=None, writable=False):
+    """
+    Return (AIModel, estimator) for an active registered model.
+
+    The estimator is shared with other requests and its arrays may be
+    read-only memory maps; pass writable=True for a private copy to
+    train further, which bypasses the cache.
+    """
+    models = AIModel.objects.filter(pk=model_id, is_active=True)
+    if model_type is not None:
+        models = models.filter(model_type=model_type)
+    ai_model = models.first()
+    if ai_model is None:
+        raise ValueError(f"Model {model_id} not found")
+
+    if not writable:
+        cached = _models.get(ai_model.pk)
+        if cached is not None and cached[0] == ai_model.version:
+            return ai_model, cached[1]
+
+    path = model_path(ai_model)
+    if not os.path.exists(path):
+        raise ValueError(f"Model {model_id} is no longer stored; train it again")
+    if writable:
+        return ai_model, joblib.load(path)
+    estimator = joblib.load(path, mmap_mode='r')
+    # Mapped arrays are shared pages, but still count toward the bound
+    _models.set(ai_model.pk, (ai_model.version, estimator), size=os.path.getsize(path))
+    return ai_model, estimator
+
+
+def invalidate(model_id):
+    _models.delete(model_id)
+
+
+def cache_stats():
+    return _models.stats()
+
+
+def _evict(sender, instance, **kwargs):
+    invalidate(instance.pk)
+
+
+post_save.connect(_evict, sender=AIModel, dispatch_uid='ai_services.registry.evict_saved')
+post_delete.connect(_evict, sender=AIModel, dispatch_uid='ai_services.registry.evict_deleted')
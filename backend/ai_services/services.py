@@ -1,22 +1,53 @@
 import time
 import json
-import numpy as np
-import pandas as pd
-from textblob import TextBlob
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import openai
+import threading
+import os
+import uuid
+from datetime import timedelta
 from django.conf import settings
 from django.utils import timezone
 from .models import (
     AIService, AIRequest, SentimentAnalysis, TextGeneration, 
-    DataAnalysis, AIModel, AIUsage
+    DataAnalysis, AIModel, AIUsage, Dataset
+)
+from .cache import LRUCache, content_hash, normalize_text
+from .usage import usage_aggregator
+from .lazy import lazy_import
+from . import charts as charts_lib
+from . import streaming
+from . import clustering
+from . import correlation
+from . import trends
+from . import sketches
+from . import datasets
+from . import compute
+from . import ingest
+from . import prediction
+from . import registry
+from . import anomaly
+from . import artifacts
+
+# Heavy backends are imported on first use to keep cold starts fast
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+textblob = lazy_import('textblob')
+openai = lazy_import('openai')
+
+
+AI_CACHE_CONFIG = getattr(settings, 'AI_CACHE_CONFIG', {})
+AI_ANALYSIS_CONFIG = getattr(settings, 'AI_ANALYSIS_CONFIG', {})
+
+MAX_HEATMAP_COLUMNS = 50
+
+# Process-wide tier of the sentiment result cache; the database is the second tier
+_sentiment_cache = LRUCache(max_size=AI_CACHE_CONFIG.get('sentiment_cache_size', 1024))
+_sentiment_db_stats = {'hits': 0, 'misses': 0}
+_sentiment_db_stats_lock = threading.Lock()
+
+# Deterministic prompt cache; stored TextGeneration rows are the persistent tier
+_prompt_cache = LRUCache(
+    max_size=AI_CACHE_CONFIG.get('prompt_cache_size', 256),
+    ttl=AI_CACHE_CONFIG.get('prompt_cache_ttl', 86400)
 )
 
 
@@ -26,15 +57,23 @@ class BaseAIService:
     def __init__(self, service_name):
         self.service = AIService.objects.get(name=service_name)
         self.start_time = None
+        self.job = None
+    
+    def attach_job(self, job):
+        """Run the next request against a queued AIRequest instead of a new row."""
+        self.job = job
     
     def start_request(self, user=None, input_data=""):
         """Start tracking an AI request."""
-        self.request = AIRequest.objects.create(
-            user=user,
-            service=self.service,
-            input_data=input_data,
-            status='processing'
-        )
+        if self.job is not None:
+            self.request = self.job
+        else:
+            self.request = AIRequest.objects.create(
+                user=user,
+                service=self.service,
+                input_data=input_data,
+                status='processing'
+            )
         self.start_time = time.time()
         return self.request
     
@@ -52,7 +91,21 @@ class BaseAIService:
         else:
             self.request.status = 'completed'
         
-        self.request.save()
+        if self.job is not None:
+            # A queued job may have been cancelled or timed out meanwhile;
+            # only a job still marked as processing may be completed.
+            updated = AIRequest.objects.filter(pk=self.request.pk, status='processing').update(
+                output_data=self.request.output_data,
+                error_message=self.request.error_message,
+                processing_time=self.request.processing_time,
+                completed_at=self.request.completed_at,
+                status=self.request.status
+            )
+            self.job = None
+            if not updated:
+                return self.request
+        else:
+            self.request.save()
         
         # Update usage statistics
         self._update_usage_stats()
@@ -61,34 +114,33 @@ class BaseAIService:
     
     def _update_usage_stats(self):
         """Update usage statistics."""
-        today = timezone.now().date()
-        usage, created = AIUsage.objects.get_or_create(
-            service=self.service,
-            user=self.request.user,
-            date=today,
-            defaults={
-                'requests_count': 0,
-                'successful_requests': 0,
-                'failed_requests': 0,
-                'total_processing_time': 0.0
-            }
+        succeeded = self.request.status == 'completed'
+        self._record_usage(
+            self.request.user,
+            successful=1 if succeeded else 0,
+            failed=0 if succeeded else 1,
+            processing_time=self.request.processing_time or 0.0
+        )
+    
+    def _record_usage(self, user, successful=0, failed=0, processing_time=0.0):
+        """Add request counts to the usage statistics for today."""
+        usage_aggregator.record(
+            self.service.pk,
+            user.pk if user else None,
+            timezone.now().date(),
+            successful=successful,
+            failed=failed,
+            processing_time=processing_time
         )
-        
-        usage.requests_count += 1
-        if self.request.status == 'completed':
-            usage.successful_requests += 1
-        else:
-            usage.failed_requests += 1
-        
-        if self.request.processing_time:
-            usage.total_processing_time += self.request.processing_time
-        
-        usage.save()
 
 
 class SentimentAnalysisService(BaseAIService):
     """Service for sentiment analysis."""
     
+    # Bump whenever scoring changes so cached results are not reused
+    scorer_version = 'textblob-1'
+    max_batch_size = 1000
+    
     def __init__(self):
         super().__init__('Sentiment Analysis')
     
@@ -97,42 +149,23 @@ class SentimentAnalysisService(BaseAIService):
         self.start_request(user, text)
         
         try:
-            # Use TextBlob for sentiment analysis
-            blob = TextBlob(text)
-            polarity = blob.sentiment.polarity
-            subjectivity = blob.sentiment.subjectivity
+            key = self.cache_key(text)
+            result = self._lookup_cached([key]).get(key)
             
-            # Determine sentiment
-            if polarity > 0.1:
-                sentiment = 'positive'
-            elif polarity < -0.1:
-                sentiment = 'negative'
-            else:
-                sentiment = 'neutral'
-            
-            # Calculate confidence based on subjectivity
-            confidence = abs(polarity) * (1 - subjectivity)
-            
-            # Extract keywords (simple approach)
-            words = text.lower().split()
-            keywords = [word for word in words if len(word) > 3][:10]
-            
-            # Save result
-            analysis = SentimentAnalysis.objects.create(
-                text=text,
-                sentiment=sentiment,
-                confidence=confidence,
-                keywords=keywords
-            )
-            
-            result = {
-                'sentiment': sentiment,
-                'confidence': round(confidence, 3),
-                'polarity': round(polarity, 3),
-                'subjectivity': round(subjectivity, 3),
-                'keywords': keywords,
-                'analysis_id': analysis.id
-            }
+            if result is None:
+                scores = self._score_text(text)
+                
+                # Save result
+                analysis = SentimentAnalysis.objects.create(
+                    text=text,
+                    text_hash=key,
+                    scorer_version=self.scorer_version,
+                    **self._score_fields(scores)
+                )
+                
+                result = self._format_result(scores, analysis.id)
+                _sentiment_cache.set(key, result)
+                result = dict(result, cached=False)
             
             self.complete_request(json.dumps(result))
             return result
@@ -140,108 +173,602 @@ class SentimentAnalysisService(BaseAIService):
         except Exception as e:
             self.complete_request("", str(e))
             raise
+    
+    def analyze_batch(self, texts, user=None):
+        """Analyze sentiment of many texts, persisting all rows in bulk."""
+        if len(texts) > self.max_batch_size:
+            raise ValueError(f"Batch size exceeds limit of {self.max_batch_size} texts")
+        
+        batch_start = time.time()
+        keys = [self.cache_key(text) for text in texts]
+        cached = self._lookup_cached(set(keys))
+        
+        # Score each distinct uncached text once
+        scored = {}
+        for text, key in zip(texts, keys):
+            if key in cached or key in scored:
+                continue
+            text_start = time.time()
+            scored[key] = (text, self._score_text(text), time.time() - text_start)
+        
+        analyses = SentimentAnalysis.objects.bulk_create([
+            SentimentAnalysis(
+                text=text,
+                text_hash=key,
+                scorer_version=self.scorer_version,
+                **self._score_fields(scores)
+            )
+            for key, (text, scores, _) in scored.items()
+        ])
+        
+        for (key, (_, scores, _)), analysis in zip(scored.items(), analyses):
+            result = self._format_result(scores, analysis.id)
+            _sentiment_cache.set(key, result)
+            cached[key] = dict(result, cached=False)
+        
+        # Only the first occurrence of a freshly scored text counts as uncached
+        results = []
+        timings = []
+        counted = set()
+        for key in keys:
+            if key in scored and key not in counted:
+                counted.add(key)
+                results.append(cached[key])
+                timings.append(scored[key][2])
+            else:
+                results.append(dict(cached[key], cached=True))
+                timings.append(0.0)
+        
+        completed_at = timezone.now()
+        AIRequest.objects.bulk_create([
+            AIRequest(
+                user=user,
+                service=self.service,
+                input_data=text,
+                output_data=json.dumps(result),
+                status='completed',
+                processing_time=elapsed,
+                completed_at=completed_at
+            )
+            for text, result, elapsed in zip(texts, results, timings)
+        ])
+        
+        self._record_usage(
+            user,
+            successful=len(results),
+            processing_time=sum(timings)
+        )
+        
+        return {
+            'count': len(results),
+            'scored': len(scored),
+            'results': results,
+            'processing_time': round(time.time() - batch_start, 3)
+        }
+    
+    @classmethod
+    def cache_key(cls, text):
+        """Content-addressed cache key for text under the current scorer."""
+        return content_hash(cls.scorer_version, normalize_text(text))
+    
+    @classmethod
+    def cache_stats(cls):
+        """Hit and miss counters for the in-process and database cache tiers."""
+        with _sentiment_db_stats_lock:
+            database = dict(_sentiment_db_stats)
+        return {
+            'scorer_version': cls.scorer_version,
+            'memory': _sentiment_cache.stats(),
+            'database': database,
+        }
+    
+    def _lookup_cached(self, keys):
+        """Return cached results for keys, checking memory then the database."""
+        found = {}
+        missing = []
+        for key in keys:
+            result = _sentiment_cache.get(key)
+            if result is None:
+                missing.append(key)
+            else:
+                found[key] = dict(result, cached=True)
+        
+        if missing:
+            rows = SentimentAnalysis.objects.filter(
+                text_hash__in=missing,
+                scorer_version=self.scorer_version,
+                polarity__isnull=False
+            ).order_by('id')
+            for analysis in rows:
+                if analysis.text_hash in found:
+                    continue
+                result = self._format_result({
+                    'sentiment': analysis.sentiment,
+                    'confidence': analysis.confidence,
+                    'polarity': analysis.polarity,
+                    'subjectivity': analysis.subjectivity,
+                    'keywords': analysis.keywords,
+                }, analysis.id)
+                _sentiment_cache.set(analysis.text_hash, result)
+                found[analysis.text_hash] = dict(result, cached=True)
+            
+            db_hits = sum(1 for key in missing if key in found)
+            with _sentiment_db_stats_lock:
+                _sentiment_db_stats['hits'] += db_hits
+                _sentiment_db_stats['misses'] += len(missing) - db_hits
+        
+        return found
+    
+    def _score_fields(self, scores):
+        """Model field values for a scored text."""
+        return {
+            'sentiment': scores['sentiment'],
+            'confidence': scores['confidence'],
+            'polarity': scores['polarity'],
+            'subjectivity': scores['subjectivity'],
+            'keywords': scores['keywords'],
+        }
+    
+    def _score_text(self, text):
+        """Score a single text with TextBlob."""
+        # Use TextBlob for sentiment analysis
+        blob = textblob.TextBlob(text)
+        polarity = blob.sentiment.polarity
+        subjectivity = blob.sentiment.subjectivity
+        
+        # Determine sentiment
+        if polarity > 0.1:
+            sentiment = 'positive'
+        elif polarity < -0.1:
+            sentiment = 'negative'
+        else:
+            sentiment = 'neutral'
+        
+        # Calculate confidence based on subjectivity
+        confidence = abs(polarity) * (1 - subjectivity)
+        
+        # Extract keywords (simple approach)
+        words = text.lower().split()
+        keywords = [word for word in words if len(word) > 3][:10]
+        
+        return {
+            'sentiment': sentiment,
+            'confidence': confidence,
+            'polarity': polarity,
+            'subjectivity': subjectivity,
+            'keywords': keywords
+        }
+    
+    def _format_result(self, scores, analysis_id):
+        """Build the API response for a scored text."""
+        return {
+            'sentiment': scores['sentiment'],
+            'confidence': round(scores['confidence'], 3),
+            'polarity': round(scores['polarity'], 3),
+            'subjectivity': round(scores['subjectivity'], 3),
+            'keywords': scores['keywords'],
+            'analysis_id': analysis_id
+        }
 
 
 class TextGenerationService(BaseAIService):
     """Service for text generation using OpenAI."""
     
+    system_prompt = "You are a helpful assistant."
+    
     def __init__(self):
         super().__init__('Text Generation')
-        if settings.OPENAI_API_KEY:
-            openai.api_key = settings.OPENAI_API_KEY
+        self.backend = settings.AI_MODEL_CONFIG.get('backend', 'openai')
+        if self.backend == 'fake':
+            from . import fake_openai
+            self.completions = fake_openai.ChatCompletion
+        else:
+            self.completions = openai.ChatCompletion
+            if settings.OPENAI_API_KEY:
+                openai.api_key = settings.OPENAI_API_KEY
     
-    def generate_text(self, prompt, user=None, max_tokens=100, temperature=0.7):
-        """Generate text using OpenAI API."""
+    def generate_text(self, prompt, user=None, max_tokens=100, temperature=0.7, use_cache=None):
+        """
+        Generate text using OpenAI API.
+        
+        Identical requests are answered from the prompt cache when
+        temperature is 0, or whenever use_cache is True.
+        """
         self.start_request(user, prompt)
         
         try:
-            if not settings.OPENAI_API_KEY:
-                raise ValueError("OpenAI API key not configured")
+            key = self._cache_key(prompt, max_tokens, temperature, use_cache)
+            result = self._lookup_cached(key) if key else None
             
-            response = openai.ChatCompletion.create(
-                model=settings.AI_MODEL_CONFIG['default_model'],
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
+            if result is None:
+                response = self._create_completion(prompt, max_tokens, temperature)
+                
+                generated_text = response.choices[0].message.content
+                
+                result = self._save_generation(prompt, generated_text, max_tokens, temperature, key)
+            
+            self.complete_request(json.dumps(result))
+            return result
             
-            generated_text = response.choices[0].message.content
+        except Exception as e:
+            self.complete_request("", str(e))
+            raise
+    
+    def stream_text(self, prompt, user=None, max_tokens=100, temperature=0.7, use_cache=None):
+        """
+        Generate text, yielding (event, data) pairs as tokens arrive.
+        
+        Emits a 'token' event per chunk of text and a final 'done' event
+        with the persisted result, or 'error' if generation fails. A cached
+        result is sent as a single token.
+        """
+        self.start_request(user, prompt)
+        
+        chunks = []
+        time_to_first_token = None
+        try:
+            key = self._cache_key(prompt, max_tokens, temperature, use_cache)
+            cached = self._lookup_cached(key) if key else None
+            stream = [] if cached else self._create_completion(prompt, max_tokens, temperature, stream=True)
             
-            # Save result
-            generation = TextGeneration.objects.create(
-                prompt=prompt,
-                generated_text=generated_text,
-                model_used=settings.AI_MODEL_CONFIG['default_model'],
-                parameters={
-                    'max_tokens': max_tokens,
-                    'temperature': temperature
-                }
-            )
+            if cached:
+                chunks.append(cached['generated_text'])
+                time_to_first_token = time.time() - self.start_time
+                yield 'token', {'text': cached['generated_text']}
             
-            result = {
-                'generated_text': generated_text,
-                'model_used': settings.AI_MODEL_CONFIG['default_model'],
-                'parameters': {
-                    'max_tokens': max_tokens,
-                    'temperature': temperature
-                },
-                'generation_id': generation.id
-            }
+            for chunk in stream:
+                content = chunk.choices[0].delta.get('content')
+                if not content:
+                    continue
+                if time_to_first_token is None:
+                    time_to_first_token = time.time() - self.start_time
+                chunks.append(content)
+                yield 'token', {'text': content}
+            
+            result = cached or self._save_generation(prompt, ''.join(chunks), max_tokens, temperature, key)
+            result['time_to_first_token'] = (
+                round(time_to_first_token, 3) if time_to_first_token is not None else None
+            )
             
             self.complete_request(json.dumps(result))
-            return result
+            yield 'done', result
             
+        except GeneratorExit:
+            # Client went away mid-stream
+            self.complete_request(json.dumps({'generated_text': ''.join(chunks)}), "Stream closed by client")
+            raise
         except Exception as e:
             self.complete_request("", str(e))
-            raise
+            yield 'error', {'error': str(e)}
+    
+    @classmethod
+    def cache_stats(cls):
+        """Hit and miss counters for the prompt cache."""
+        return _prompt_cache.stats()
+    
+    def _cache_key(self, prompt, max_tokens, temperature, use_cache):
+        """Prompt cache key, or None if this request must not be cached."""
+        if use_cache is None:
+            use_cache = float(temperature) == 0
+        if not use_cache:
+            return None
+        return content_hash(
+            settings.AI_MODEL_CONFIG['default_model'],
+            self.system_prompt,
+            prompt,
+            int(max_tokens),
+            float(temperature)
+        )
+    
+    def _lookup_cached(self, key):
+        """Return a cached result for key from memory or a recent TextGeneration row."""
+        result = _prompt_cache.get(key)
+        
+        if result is None:
+            ttl = _prompt_cache.ttl
+            generations = TextGeneration.objects.filter(prompt_hash=key)
+            if ttl:
+                generations = generations.filter(created_at__gte=timezone.now() - timedelta(seconds=ttl))
+            generation = generations.order_by('-created_at').first()
+            if generation is None:
+                return None
+            result = self._format_result(generation)
+            _prompt_cache.set(key, result)
+        
+        return dict(result, cached=True)
+    
+    def _create_completion(self, prompt, max_tokens, temperature, stream=False):
+        """Call the chat completion backend."""
+        if self.backend != 'fake' and not settings.OPENAI_API_KEY:
+            raise ValueError("OpenAI API key not configured")
+        
+        return self.completions.create(
+            model=settings.AI_MODEL_CONFIG['default_model'],
+            messages=[
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=stream
+        )
+    
+    def _save_generation(self, prompt, generated_text, max_tokens, temperature, cache_key=None):
+        """Persist a generation and build the API response."""
+        # Save result
+        generation = TextGeneration.objects.create(
+            prompt=prompt,
+            generated_text=generated_text,
+            model_used=settings.AI_MODEL_CONFIG['default_model'],
+            parameters={
+                'max_tokens': max_tokens,
+                'temperature': temperature
+            },
+            prompt_hash=cache_key or ''
+        )
+        
+        result = self._format_result(generation)
+        if cache_key:
+            _prompt_cache.set(cache_key, result)
+        return dict(result, cached=False)
+    
+    def _format_result(self, generation):
+        """Build the API response for a stored generation."""
+        return {
+            'generated_text': generation.generated_text,
+            'model_used': generation.model_used,
+            'parameters': generation.parameters,
+            'generation_id': generation.id
+        }
 
 
 class DataAnalysisService(BaseAIService):
     """Service for data analysis."""
+    # Bump when analysis code changes its output, so memoized results are recomputed
+    analysis_version = 'analysis-2'
     
     def __init__(self):
         super().__init__('Data Analysis')
+        self._session = None
+        self._clustering_results = None
+        self._trend_data = None
+        self._prediction = None
+        self._anomaly = None
     
-    def analyze_data(self, data, analysis_type='descriptive', user=None):
-        """Analyze data and generate insights."""
+    def analyze_data(self, data, analysis_type='descriptive', user=None, parameters=None, use_cache=True):
+        """
+        Analyze data and generate insights.
+        
+        parameters tunes individual analyses, e.g. n_clusters or
+        max_clusters for clustering. An identical earlier analysis of the
+        same data is returned from the database unless use_cache is False
+        or the request trains a model.
+        """
+        key = self.cache_key(datasets.data_hash(data), analysis_type, parameters)
+        cached = self._lookup_cached(key) if use_cache and self._memoizable(analysis_type, parameters) else None
+        if cached is not None:
+            return self._cached_result(cached, key, user)
+        
         self.start_request(user, json.dumps(data))
         
         try:
-            # Convert data to pandas DataFrame
-            if isinstance(data, list):
-                df = pd.DataFrame(data)
-            elif isinstance(data, dict):
-                df = pd.DataFrame([data])
-            else:
-                df = pd.DataFrame(data)
+            # Compact dtypes, within the per-request memory ceiling
+            df, memory = ingest.build_frame(data, oversize=(parameters or {}).get('oversize'))
+            
+            result = self._run_analysis(
+                datasets.DatasetSession(df), analysis_type, parameters, data, cache_key=key, memory=memory
+            )
+            self.complete_request(json.dumps(result))
+            return result
+            
+        except Exception as e:
+            self.complete_request("", str(e))
+            raise
+    
+    def analyze_dataset(self, dataset, analysis_type='descriptive', user=None, parameters=None, use_cache=True):
+        """
+        Analyze a stored Dataset by id or instance.
+        
+        The dataset is loaded once per process and derived artifacts are
+        shared with every other analysis of it, so only a reference to
+        the dataset is recorded with the request and the result.
+        """
+        if not isinstance(dataset, Dataset):
+            dataset = Dataset.objects.get(pk=dataset)
+        key = self.cache_key(dataset.content_hash, analysis_type, parameters)
+        cached = self._lookup_cached(key) if use_cache and self._memoizable(analysis_type, parameters) else None
+        if cached is not None:
+            result = self._cached_result(cached, key, user)
+            result['dataset_id'] = str(dataset.token)
+            return result
+        
+        source = {'dataset_id': dataset.pk, 'content_hash': dataset.content_hash}
+        self.start_request(user, json.dumps(source))
+        
+        try:
+            session = datasets.open_session(dataset)
+            result = self._run_analysis(session, analysis_type, parameters, source, dataset=dataset, cache_key=key)
+            result['dataset_id'] = str(dataset.token)
+            self.complete_request(json.dumps(result))
+            return result
             
-            results = {}
-            visualizations = []
+        except Exception as e:
+            self.complete_request("", str(e))
+            raise
+    
+    @classmethod
+    def cache_key(cls, data_hash, analysis_type, parameters=None):
+        """Memoization key for an analysis of data with the given content hash."""
+        return content_hash(
+            cls.analysis_version,
+            data_hash,
+            analysis_type,
+            json.dumps(parameters or {}, sort_keys=True, default=str)
+        )
+    
+    @staticmethod
+    def trains_model(analysis_type, parameters=None):
+        """True for requests that train and register a model; they are never served from the memo."""
+        parameters = parameters or {}
+        if analysis_type == 'prediction':
+            return parameters.get('model_id') is None or bool(parameters.get('refresh'))
+        if analysis_type == 'clustering':
+            return parameters.get('model_id') is None and bool(parameters.get('model_name'))
+        return False
+    
+    def _memoizable(self, analysis_type, parameters):
+        # A stored result cannot stand in for a trained model or a spilled matrix file
+        return not self.trains_model(analysis_type, parameters) and not (parameters or {}).get('spill')
+    
+    def _lookup_cached(self, key):
+        return DataAnalysis.objects.filter(cache_key=key).order_by('-created_at').first()
+    
+    def _cached_result(self, analysis, key, user):
+        """Serve a memoized analysis, logging a request that only references it."""
+        reference = {'analysis_id': analysis.id, 'cache_key': key}
+        self.start_request(user, json.dumps(reference))
+        result = {
+            'analysis_type': analysis.analysis_type,
+            'results': analysis.results,
+            'visualizations': analysis.visualizations,
+            # insights are stored as text; rebuilding them from results is cheap
+            'insights': self._generate_insights(analysis.results, analysis.analysis_type),
+            'analysis_id': analysis.id,
+            'cached': True
+        }
+        # Queued jobs are polled for their output, so they keep the full result
+        self.complete_request(json.dumps(result if self.job is not None else dict(reference, cached=True)))
+        return result
+    
+    def _run_analysis(self, session, analysis_type, parameters, input_data, dataset=None, cache_key='',
+                      memory=None):
+        """
+        Run one analysis on a DatasetSession and save it as a DataAnalysis.
+        
+        memory is the ingestion report, returned with the results.
+        """
+        parameters = parameters or {}
+        self._session = session
+        self._clustering_results = None
+        self._correlation_matrix = None
+        self._correlation_pairs = None
+        self._trend_data = None
+        self._prediction = None
+        self._anomaly = None
+        df = session.df
+        
+        results = {}
+        visualizations = []
+        
+        if analysis_type == 'descriptive':
+            results = self._descriptive_analysis(df, parameters)
+            visualizations = self._create_descriptive_charts(df)
+        elif analysis_type == 'correlation':
+            results = self._correlation_analysis(df, parameters)
+            visualizations = self._create_correlation_charts(df)
+        elif analysis_type == 'trend':
+            results = self._trend_analysis(df, parameters)
+            visualizations = self._create_trend_charts(df)
+        elif analysis_type == 'clustering':
+            results = self._clustering_analysis(df, parameters)
+            visualizations = self._create_clustering_charts(df)
+        elif analysis_type == 'prediction':
+            results = self._prediction_analysis(df, parameters)
+            visualizations = self._create_prediction_charts(df)
+        elif analysis_type == 'anomaly':
+            results = self._anomaly_analysis(df, parameters)
+            visualizations = self._create_anomaly_charts(df)
+        
+        if memory is not None:
+            results['memory'] = memory
+        matrix_expires_at = artifacts.matrix_expiry() if results.get('matrix_file') else None
+        if matrix_expires_at is not None:
+            results['matrix_expires_at'] = matrix_expires_at.isoformat()
+        
+        # Generate insights
+        insights = self._generate_insights(results, analysis_type)
+        
+        # Save result
+        analysis = DataAnalysis.objects.create(
+            name=f"{analysis_type.title()} Analysis",
+            analysis_type=analysis_type,
+            input_data=input_data,
+            dataset=dataset,
+            user_id=self.request.user_id,
+            results=results,
+            visualizations=visualizations,
+            insights=insights,
+            cache_key=cache_key,
+            matrix_file=results.get('matrix_file', ''),
+            matrix_expires_at=matrix_expires_at
+        )
+        
+        return {
+            'analysis_type': analysis_type,
+            'results': results,
+            'visualizations': visualizations,
+            'insights': insights,
+            'analysis_id': analysis.id,
+            'cached': False
+        }
+    
+    def _session_for(self, df):
+        """The DatasetSession wrapping df, so derived artifacts are computed once."""
+        if self._session is None or self._session.df is not df:
+            self._session = datasets.DatasetSession(df)
+        return self._session
+    
+    def analyze_file(self, fileobj, analysis_type='descriptive', user=None, file_format=None,
+                     chunksize=streaming.DEFAULT_CHUNK_SIZE, parameters=None):
+        """
+        Analyze an uploaded CSV or NDJSON file chunk by chunk in bounded memory.
+        
+        Prediction trains on each chunk in turn, so the model is fit in a
+        single pass over the file. Trends honour parameters.time_column
+        but not freq or window.
+        """
+        parameters = parameters or {}
+        name = getattr(fileobj, 'name', '')
+        source = {
+            'source': 'upload',
+            'filename': name,
+            'size': getattr(fileobj, 'size', None),
+        }
+        self.start_request(user, json.dumps(source))
+        
+        try:
+            source['format'] = streaming.detect_format(name, file_format)
+            model = previous = None
+            if analysis_type == 'prediction':
+                model, previous = self._prediction_model(parameters)
+                if previous is not None and not parameters.get('refresh'):
+                    raise ValueError("Uploads train models; pass refresh to train an existing model further")
+            detector = self._anomaly_detector(parameters) if analysis_type == 'anomaly' else None
+            if analysis_type == 'trend' and (parameters.get('freq') or parameters.get('window')):
+                raise ValueError("freq and window need the whole series; store the file as a dataset and analyze that")
+            analyzer = streaming.StreamingAnalyzer(
+                analysis_type, model=model, detector=detector, time_column=parameters.get('time_column')
+            )
+            for chunk in streaming.read_chunks(fileobj, source['format'], chunksize):
+                analyzer.update(chunk)
             
-            if analysis_type == 'descriptive':
-                results = self._descriptive_analysis(df)
-                visualizations = self._create_descriptive_charts(df)
-            elif analysis_type == 'correlation':
-                results = self._correlation_analysis(df)
-                visualizations = self._create_correlation_charts(df)
-            elif analysis_type == 'trend':
-                results = self._trend_analysis(df)
-                visualizations = self._create_trend_charts(df)
-            elif analysis_type == 'clustering':
-                results = self._clustering_analysis(df)
-                visualizations = self._create_clustering_charts(df)
+            results = analyzer.results()
+            visualizations = analyzer.visualizations()
+            if analysis_type == 'correlation' and 'correlation_matrix' in results:
+                results['high_correlations'] = self._find_high_correlations(analyzer.correlation)
+            if analysis_type == 'prediction':
+                results.update(self._prediction_results(
+                    model, self._register_model(model, parameters, previous), previous, model.validation
+                ))
             
-            # Generate insights
             insights = self._generate_insights(results, analysis_type)
             
-            # Save result
+            # Only a description of the upload is stored, never the rows
             analysis = DataAnalysis.objects.create(
                 name=f"{analysis_type.title()} Analysis",
                 analysis_type=analysis_type,
-                input_data=data,
+                input_data=source,
+                user_id=self.request.user_id,
                 results=results,
                 visualizations=visualizations,
                 insights=insights
@@ -252,7 +779,8 @@ class DataAnalysisService(BaseAIService):
                 'results': results,
                 'visualizations': visualizations,
                 'insights': insights,
-                'analysis_id': analysis.id
+                'analysis_id': analysis.id,
+                'cached': False
             }
             
             self.complete_request(json.dumps(result))
@@ -262,12 +790,39 @@ class DataAnalysisService(BaseAIService):
             self.complete_request("", str(e))
             raise
     
-    def _descriptive_analysis(self, df):
-        """Perform descriptive statistical analysis."""
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
+    def _descriptive_analysis(self, df, parameters=None):
+        """
+        Perform descriptive statistical analysis.
+        
+        parameters.mode picks 'exact' pandas statistics or 'sketch', a
+        single pass with approximate quantiles and distinct counts; by
+        default large frames use the sketch.
+        """
+        parameters = parameters or {}
+        mode = parameters.get('mode')
+        if mode is None:
+            mode = 'sketch' if len(df) > AI_ANALYSIS_CONFIG.get('sketch_threshold_rows', 100000) else 'exact'
+        if mode not in ('exact', 'sketch'):
+            raise ValueError(f"Unknown descriptive mode '{mode}'; use exact or sketch")
+        
+        if mode == 'sketch':
+            sketch = sketches.DescriptiveSketch()
+            sketch.update(df)
+            results = sketch.results()
+            results.update({
+                'missing_values': df.isnull().sum().to_dict(),
+                'data_types': df.dtypes.astype(str).to_dict(),
+                'shape': df.shape,
+                'columns': list(df.columns)
+            })
+            return results
+        
+        numeric_cols = self._session_for(df).numeric.columns
+        # Parsed date columns would put Timestamps into the JSON summary
+        described = df.select_dtypes(exclude=['datetime', 'datetimetz'])
         
         results = {
-            'summary': df.describe().to_dict(),
+            'summary': (described if len(described.columns) else df.astype(str)).describe().to_dict(),
             'missing_values': df.isnull().sum().to_dict(),
             'data_types': df.dtypes.astype(str).to_dict(),
             'shape': df.shape,
@@ -285,162 +840,449 @@ class DataAnalysisService(BaseAIService):
         
         return results
     
-    def _correlation_analysis(self, df):
-        """Perform correlation analysis."""
-        numeric_df = df.select_dtypes(include=[np.number])
+    def _correlation_analysis(self, df, parameters=None):
+        """
+        Perform correlation analysis.
+        
+        parameters may set method (pearson, spearman or kendall), threshold
+        and top_k for the strong pairs, and spill to write the full matrix
+        to a memory-mapped file, downloadable by the requesting user until
+        it expires.
+        """
+        parameters = parameters or {}
+        session = self._session_for(df)
+        numeric_df = session.numeric
         
         if numeric_df.shape[1] < 2:
             return {'error': 'Need at least 2 numeric columns for correlation analysis'}
         
-        correlation_matrix = numeric_df.corr()
+        labels = list(numeric_df.columns)
+        method = parameters.get('method', 'pearson')
+        # Wide tables return only the strong pairs; the matrix would be huge
+        keep_matrix = len(labels) <= AI_ANALYSIS_CONFIG.get('max_result_matrix_columns', 100)
+        spill_path = None
+        if parameters.get('spill'):
+            spill_path = correlation.spill_path_for(f"correlation-{uuid.uuid4().hex}.npy")
         
-        return {
-            'correlation_matrix': correlation_matrix.to_dict(),
-            'high_correlations': self._find_high_correlations(correlation_matrix)
+        # CPU-bound stages run in the analysis process pool for large inputs
+        matrix, high_correlations = compute.run(
+            correlation.correlate,
+            session.numeric_values,
+            labels,
+            method=method,
+            threshold=parameters.get('threshold', 0.7),
+            top_k=parameters.get('top_k'),
+            keep_matrix=keep_matrix,
+            spill_path=spill_path
+        )
+        self._correlation_pairs = high_correlations
+        
+        results = {
+            'method': method,
+            'high_correlations': high_correlations
         }
+        if keep_matrix:
+            self._correlation_matrix = pd.DataFrame(np.asarray(matrix), index=labels, columns=labels)
+            results['correlation_matrix'] = self._correlation_matrix.to_dict()
+        else:
+            results['matrix_truncated'] = True
+        if spill_path:
+            results['matrix_file'] = os.path.basename(spill_path)
+        
+        return results
     
-    def _trend_analysis(self, df):
-        """Perform trend analysis."""
-        # Simple trend analysis - can be enhanced
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        
-        trends = {}
-        for col in numeric_cols:
-            values = df[col].dropna()
-            if len(values) > 1:
-                # Calculate simple linear trend
-                x = np.arange(len(values))
-                slope = np.polyfit(x, values, 1)[0]
-                trends[col] = {
-                    'slope': slope,
-                    'trend': 'increasing' if slope > 0 else 'decreasing' if slope < 0 else 'stable',
-                    'change_rate': slope / values.mean() if values.mean() != 0 else 0
-                }
-        
-        return {'trends': trends}
-    
-    def _clustering_analysis(self, df):
-        """Perform clustering analysis."""
-        numeric_df = df.select_dtypes(include=[np.number])
+    def _trend_analysis(self, df, parameters=None):
+        """
+        Perform trend analysis.
+        
+        A datetime column (parameters.time_column, or detected) orders the
+        rows and makes slopes per day. parameters may also set freq to
+        resample on it (e.g. 'D', 'W', 'MS') with agg, and window for
+        rolling slopes over that many rows or periods.
+        """
+        parameters = parameters or {}
+        time_column = parameters.get('time_column')
+        freq = parameters.get('freq')
+        agg = parameters.get('agg', 'mean')
+        prepared = self._session_for(df).artifact(
+            ('trend', time_column, freq, agg),
+            lambda: trends.prepare(df, time_column=time_column, freq=freq, agg=agg)
+        )
+        # Copied so per-run additions never leak into the shared artifact
+        self._trend_data = dict(prepared)
+        data = self._trend_data
+        fitted = trends.fit(data['values'], data['x'])
+        
+        trend_results = {}
+        for i, col in enumerate(data['columns']):
+            slope = fitted['slope'][i]
+            if not np.isfinite(slope):
+                continue
+            mean = fitted['mean'][i]
+            trend_results[col] = {
+                'slope': float(slope),
+                'trend': trends.direction(slope),
+                'change_rate': float(slope / mean) if mean != 0 else 0,
+                'intercept': float(fitted['intercept'][i]),
+                'r_squared': float(fitted['r_squared'][i]),
+                'points': int(fitted['n'][i])
+            }
+        
+        results = {
+            'trends': trend_results,
+            'x_unit': data['x_unit'],
+            'time_column': data['time_column'],
+            'periods': len(data['values'])
+        }
+        if data['time_column'] is not None and len(data['times']):
+            results['start'] = str(np.datetime_as_string(data['times'][0], unit='s'))
+            results['end'] = str(np.datetime_as_string(data['times'][-1], unit='s'))
+            if parameters.get('freq'):
+                results['frequency'] = parameters['freq']
+        
+        window = parameters.get('window')
+        if window:
+            data['rolling'] = trends.rolling_slopes(data['values'], data['x'], window)
+            rolling = {}
+            for i, col in enumerate(data['columns']):
+                column = data['rolling'][:, i]
+                column = column[np.isfinite(column)]
+                if len(column):
+                    rolling[col] = {
+                        'latest': float(column[-1]),
+                        'min': float(column.min()),
+                        'max': float(column.max())
+                    }
+            results['rolling_slopes'] = {'window': int(window), 'columns': rolling}
+        
+        return results
+    
+    def _clustering_analysis(self, df, parameters=None):
+        """
+        Perform clustering analysis.
+        
+        With parameters.model_name the fitted model is registered as an
+        AIModel; parameters.model_id labels the rows with a registered
+        model instead of fitting a new one.
+        """
+        parameters = parameters or {}
+        if parameters.get('model_id') is not None:
+            return self._apply_clustering_model(df, parameters['model_id'])
+        numeric_df = self._session_for(df).numeric
         
         if numeric_df.shape[1] < 2:
             return {'error': 'Need at least 2 numeric columns for clustering'}
         
-        # Normalize data
-        normalized_data = (numeric_df - numeric_df.mean()) / numeric_df.std()
+        # Normalization, k selection and the chart projection happen once here
+        self._clustering_results = self._run_clustering(
+            df,
+            n_clusters=parameters.get('n_clusters'),
+            max_clusters=parameters.get('max_clusters')
+        )
         
-        # Perform K-means clustering
-        kmeans = KMeans(n_clusters=min(3, len(normalized_data)), random_state=42)
-        clusters = kmeans.fit_predict(normalized_data)
+        results = self._clustering_summary(self._clustering_results)
+        if parameters.get('model_name'):
+            session = self._session_for(df)
+            _, mean, std = session.artifact('normalization', lambda: clustering.normalize(session.numeric_values))
+            ai_model = registry.save(
+                clustering.ClusterModel(numeric_df.columns, mean, std, self._clustering_results['model']),
+                parameters['model_name'],
+                'clustering',
+                parameters={'columns': [str(col) for col in numeric_df.columns], 'n_clusters': results['n_clusters']},
+                description=f"{results['algorithm']} with {results['n_clusters']} clusters on {len(numeric_df.columns)} columns"
+            )
+            results.update({'model_id': ai_model.pk, 'model_name': ai_model.name, 'version': ai_model.version})
+        return results
+    
+    def _apply_clustering_model(self, df, model_id):
+        """Label rows with a registered clustering model; no refit."""
+        ai_model, cluster_model = registry.load(model_id, model_type='clustering')
+        missing = [col for col in cluster_model.columns if col not in df.columns]
+        if missing:
+            raise ValueError(f"Data lacks columns the model was fitted on: {', '.join(missing)}")
+        values = df[cluster_model.columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        self._clustering_results = compute.run(clustering.apply_model, cluster_model, values)
+        results = self._clustering_summary(self._clustering_results)
+        results.update({'model_id': ai_model.pk, 'model_name': ai_model.name, 'version': ai_model.version})
+        return results
+    
+    def _clustering_summary(self, fitted):
+        results = {
+            key: fitted[key]
+            for key in ('n_clusters', 'algorithm', 'cluster_centers', 'cluster_sizes', 'inertia', 'k_scores')
+        }
+        labels = fitted['labels']
+        if len(labels) <= AI_ANALYSIS_CONFIG.get('max_result_labels', 10000):
+            results['cluster_labels'] = labels.tolist()
+        else:
+            # Per-row labels for huge inputs would dwarf the rest of the result
+            results['labels_truncated'] = True
         
-        return {
-            'n_clusters': kmeans.n_clusters,
-            'cluster_centers': kmeans.cluster_centers_.tolist(),
-            'cluster_labels': clusters.tolist(),
-            'inertia': kmeans.inertia_
+        return results
+    
+    def _run_clustering(self, df, **kwargs):
+        """Cluster with the normalized matrix and projection shared through the session."""
+        session = self._session_for(df)
+        normalized = session.artifact(
+            'normalization', lambda: clustering.normalize(session.numeric_values)
+        )[0]
+        projection = session.artifact('projection', lambda: compute.run(clustering.project, normalized))
+        return compute.run(
+            clustering.run_clustering,
+            session.numeric_values, normalized=normalized, projection=projection, **kwargs
+        )
+    
+    def _anomaly_analysis(self, df, parameters=None):
+        """
+        Flag anomalous rows, scanning the data chunk by chunk.
+        
+        parameters.method is zscore (default), ewma or isolation_forest;
+        columns limits the scan to some numeric columns, and threshold,
+        alpha, min_periods, max_flagged, sample_size and contamination
+        tune it. Rows are reported by position.
+        """
+        parameters = parameters or {}
+        detector = self._anomaly_detector(parameters)
+        if detector.method == 'isolation_forest':
+            # In memory the forest can be fitted on a uniform sample
+            detector.fit(df.iloc[anomaly.sample_rows(len(df), detector.sample_size)])
+        
+        chunk_rows = int(parameters.get('chunk_rows') or streaming.DEFAULT_CHUNK_SIZE)
+        scores = [detector.update(df.iloc[start:start + chunk_rows]) for start in range(0, len(df), chunk_rows)]
+        scores.append(detector.finish())
+        self._anomaly = {'detector': detector, 'scores': np.concatenate(scores)}
+        return detector.results()
+    
+    def _anomaly_detector(self, parameters):
+        return anomaly.AnomalyDetector(
+            method=parameters.get('method', 'zscore'),
+            threshold=parameters.get('threshold'),
+            alpha=parameters.get('alpha'),
+            min_periods=parameters.get('min_periods'),
+            max_flagged=parameters.get('max_flagged'),
+            sample_size=parameters.get('sample_size'),
+            contamination=parameters.get('contamination'),
+            numeric_cols=parameters.get('columns')
+        )
+    
+    def _prediction_analysis(self, df, parameters=None):
+        """
+        Train, apply or refresh an incrementally trained prediction model.
+        
+        parameters.target names the column to predict; features, task
+        (regression or classification) and alpha are optional. A new model
+        makes epochs passes over chunk_rows-row chunks and is registered
+        as an AIModel. With model_id the registered model is applied to
+        the data instead, or with refresh trained further on it and
+        registered as its next version.
+        """
+        parameters = parameters or {}
+        # At least ten chunks, so progressive validation scores most rows
+        chunk_rows = int(parameters.get('chunk_rows') or min(
+            AI_ANALYSIS_CONFIG.get('prediction_chunk_rows', 10000), max(-(-len(df) // 10), 1)
+        ))
+        chunks = [df.iloc[start:start + chunk_rows] for start in range(0, len(df), chunk_rows)]
+        
+        classes = None
+        target = parameters.get('target')
+        if parameters.get('model_id') is None and target in df.columns:
+            if (parameters.get('task') or prediction.infer_task(df[target])) == 'classification':
+                # All classes are known up front when the data is in memory
+                classes = df[target].dropna().unique()
+        model, previous = self._prediction_model(parameters, classes=classes)
+        
+        ai_model = previous
+        if previous is None or parameters.get('refresh'):
+            epochs = int(parameters.get('epochs') or AI_ANALYSIS_CONFIG.get('prediction_epochs', 5))
+            for epoch in range(max(epochs, 1)):
+                for chunk in chunks:
+                    model.partial_fit(chunk, repeat=epoch > 0)
+            ai_model = self._register_model(model, parameters, previous)
+            metrics = model.validation
+        else:
+            metrics = prediction.Metrics(model.task, model.classes)
+        
+        # Scoring against an existing model counts every row as held out
+        evaluation = prediction.Metrics(model.task, model.classes)
+        predicted = np.concatenate([model.evaluate(chunk, evaluation) for chunk in chunks]) if chunks else np.empty(0)
+        if ai_model is previous:
+            metrics = evaluation
+        
+        self._prediction = {
+            'model': model,
+            'metrics': metrics,
+            'predicted': predicted,
+            'actual': df[model.target].to_numpy() if model.target in df.columns else None
         }
+        results = self._prediction_results(model, ai_model, previous, metrics)
+        if len(predicted) <= AI_ANALYSIS_CONFIG.get('max_result_labels', 10000):
+            results['predictions'] = predicted.tolist()
+        else:
+            results['predictions_truncated'] = True
+        return results
+    
+    def _prediction_model(self, parameters, classes=None):
+        """The model a prediction request works on, and the AIModel it was loaded from (or None)."""
+        model_id = parameters.get('model_id')
+        if model_id is not None:
+            # Refreshing trains the model, so it needs a private, writable copy
+            previous, model = prediction.load(model_id, writable=bool(parameters.get('refresh')))
+            if parameters.get('refresh'):
+                # A refresh reports how the stored version scores the new rows
+                model.validation = prediction.Metrics(model.task, model.classes)
+            return model, previous
+        if not parameters.get('target'):
+            raise ValueError("Prediction needs parameters.target, or model_id of a trained model")
+        return prediction.IncrementalModel(
+            parameters['target'],
+            features=parameters.get('features'),
+            task=parameters.get('task'),
+            classes=parameters.get('classes', classes),
+            alpha=parameters.get('alpha')
+        ), None
+    
+    def _register_model(self, model, parameters, previous=None):
+        if not model.rows_trained:
+            raise ValueError(f"No rows with a known '{model.target}' value to train on")
+        name = previous.name if previous is not None else parameters.get('model_name')
+        return prediction.register(model, name=name)
+    
+    def _prediction_results(self, model, ai_model, previous, metrics):
+        results = {
+            'model_id': ai_model.pk,
+            'model_name': ai_model.name,
+            'version': ai_model.version,
+            'trained': ai_model is not previous,
+            'task': model.task,
+            'target': model.target,
+            'features': [str(col) for col in model.features],
+            'estimator': type(model.estimator).__name__,
+            'rows_trained': model.rows_trained,
+            'skipped_rows': model.skipped_rows,
+            'metrics': metrics.results(),
+            'coefficients': model.coefficients()
+        }
+        if previous is not None:
+            results['previous_version'] = previous.version
+        if model.task == 'classification':
+            results['classes'] = model.classes.tolist()
+        return results
     
     def _find_high_correlations(self, corr_matrix, threshold=0.7):
         """Find high correlations in correlation matrix."""
-        high_corr = []
-        for i in range(len(corr_matrix.columns)):
-            for j in range(i+1, len(corr_matrix.columns)):
-                corr_value = corr_matrix.iloc[i, j]
-                if abs(corr_value) > threshold:
-                    high_corr.append({
-                        'var1': corr_matrix.columns[i],
-                        'var2': corr_matrix.columns[j],
-                        'correlation': corr_value
-                    })
-        return high_corr
+        return correlation.high_correlations(corr_matrix, threshold)
     
     def _create_descriptive_charts(self, df):
         """Create descriptive analysis charts."""
         charts = []
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
+        numeric_cols = self._session_for(df).numeric.columns
         
         for col in numeric_cols[:5]:  # Limit to 5 charts
             # Histogram
-            fig = px.histogram(df, x=col, title=f'Distribution of {col}')
-            charts.append({
-                'type': 'histogram',
-                'data': fig.to_dict(),
-                'title': f'Distribution of {col}'
-            })
+            chart = charts_lib.histogram_spec(df[col], f'Distribution of {col}')
+            if chart:
+                charts.append(chart)
         
         return charts
     
     def _create_correlation_charts(self, df):
         """Create correlation analysis charts."""
-        numeric_df = df.select_dtypes(include=[np.number])
+        numeric_df = self._session_for(df).numeric
         
         if numeric_df.shape[1] < 2:
             return []
         
-        # Correlation heatmap
-        corr_matrix = numeric_df.corr()
-        fig = px.imshow(
-            corr_matrix,
-            title='Correlation Heatmap',
-            color_continuous_scale='RdBu'
-        )
-        
-        return [{
-            'type': 'heatmap',
-            'data': fig.to_dict(),
-            'title': 'Correlation Heatmap'
-        }]
+        # Correlation heatmap, reusing the matrix from _correlation_analysis
+        corr_matrix = getattr(self, '_correlation_matrix', None)
+        if corr_matrix is None:
+            # Wide tables: plot only the columns involved in the strongest pairs
+            columns = []
+            for pair in getattr(self, '_correlation_pairs', None) or []:
+                for col in (pair['var1'], pair['var2']):
+                    if col not in columns:
+                        columns.append(col)
+            columns = columns[:MAX_HEATMAP_COLUMNS] or list(numeric_df.columns[:MAX_HEATMAP_COLUMNS])
+            corr_matrix = numeric_df[columns].corr()
+        return [charts_lib.heatmap_spec(corr_matrix.values, corr_matrix.columns, 'Correlation Heatmap')]
     
     def _create_trend_charts(self, df):
         """Create trend analysis charts."""
+        # Reuse the ordered (and possibly resampled) series from _trend_analysis
+        if getattr(self, '_trend_data', None) is None:
+            session = self._session_for(df)
+            self._trend_data = dict(session.artifact(
+                ('trend', None, None, 'mean'), lambda: trends.prepare(df)
+            ))
+        data = self._trend_data
+        x = data['times']
+        x_label = data['time_column']
+        
         charts = []
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        
-        for col in numeric_cols[:3]:  # Limit to 3 charts
-            fig = px.line(df, y=col, title=f'Trend of {col}')
-            charts.append({
-                'type': 'line',
-                'data': fig.to_dict(),
-                'title': f'Trend of {col}'
-            })
+        for i, col in enumerate(data['columns'][:3]):  # Limit to 3 charts
+            chart = charts_lib.line_spec(data['values'][:, i], f'Trend of {col}', x=x, x_label=x_label)
+            if chart:
+                charts.append(chart)
+        
+        if 'rolling' in data:
+            for i, col in enumerate(data['columns'][:3]):
+                chart = charts_lib.line_spec(
+                    data['rolling'][:, i], f'Rolling slope of {col}', x=x, x_label=x_label
+                )
+                if chart:
+                    charts.append(chart)
         
         return charts
     
     def _create_clustering_charts(self, df):
         """Create clustering analysis charts."""
-        numeric_df = df.select_dtypes(include=[np.number])
+        numeric_df = self._session_for(df).numeric
         
         if numeric_df.shape[1] < 2:
             return []
         
-        # Use PCA for visualization if more than 2 dimensions
-        if numeric_df.shape[1] > 2:
-            pca = PCA(n_components=2)
-            pca_data = pca.fit_transform(numeric_df)
+        # Reuse the fitted labels and projection from _clustering_analysis
+        if getattr(self, '_clustering_results', None) is None:
+            self._clustering_results = self._run_clustering(df)
+        fitted = self._clustering_results
+        
+        # PCA projection if more than 2 dimensions
+        if fitted['explained_variance'] is not None:
             x_col, y_col = 'PC1', 'PC2'
-            plot_data = pd.DataFrame(pca_data, columns=[x_col, y_col])
         else:
-            plot_data = numeric_df
             x_col, y_col = numeric_df.columns[0], numeric_df.columns[1]
         
-        # Add cluster labels if available
-        if hasattr(self, '_clustering_results'):
-            plot_data['cluster'] = self._clustering_results['cluster_labels']
-            fig = px.scatter(
-                plot_data, x=x_col, y=y_col, color='cluster',
-                title='Clustering Results'
-            )
-        else:
-            fig = px.scatter(
-                plot_data, x=x_col, y=y_col,
-                title='Data Points'
-            )
+        points = fitted['chart_points']
+        return [charts_lib.scatter_spec(
+            points[:, 0], points[:, 1], 'Clustering Results',
+            groups=fitted['chart_labels'], x_label=x_col, y_label=y_col
+        )]
+    
+    def _create_anomaly_charts(self, df):
+        """Create anomaly detection charts."""
+        fitted = getattr(self, '_anomaly', None)
+        if fitted is None:
+            return []
+        return anomaly.charts(fitted['detector'], fitted['scores'])
+    
+    def _create_prediction_charts(self, df):
+        """Create prediction analysis charts."""
+        fitted = getattr(self, '_prediction', None)
+        if fitted is None or fitted['actual'] is None:
+            return []
+        model = fitted['model']
         
-        return [{
-            'type': 'scatter',
-            'data': fig.to_dict(),
-            'title': 'Clustering Results'
-        }]
+        if model.task == 'regression':
+            actual = pd.to_numeric(pd.Series(fitted['actual']), errors='coerce').to_numpy(dtype=float)
+            known = np.isfinite(actual)
+            return [charts_lib.scatter_spec(
+                actual[known], fitted['predicted'][known], f'Predicted vs actual {model.target}',
+                x_label='actual', y_label='predicted'
+            )]
+        
+        confusion = fitted['metrics'].results().get('confusion_matrix')
+        if confusion is None:
+            return []
+        return [charts_lib.heatmap_spec(np.asarray(confusion, dtype=float), model.classes, 'Confusion Matrix')]
     
     def _generate_insights(self, results, analysis_type):
         """Generate insights from analysis results."""
@@ -449,7 +1291,8 @@ class DataAnalysisService(BaseAIService):
         if analysis_type == 'descriptive':
             if 'numeric_summary' in results:
                 for col, stats in results['numeric_summary']['mean'].items():
-                    insights.append(f"Average {col}: {stats:.2f}")
+                    if stats is not None:
+                        insights.append(f"Average {col}: {stats:.2f}")
         
         elif analysis_type == 'correlation':
             if 'high_correlations' in results:
@@ -461,10 +1304,11 @@ class DataAnalysisService(BaseAIService):
         
         elif analysis_type == 'trend':
             if 'trends' in results:
+                unit = results.get('x_unit', 'row')
                 for col, trend in results['trends'].items():
                     insights.append(
                         f"{col} shows a {trend['trend']} trend "
-                        f"(slope: {trend['slope']:.3f})"
+                        f"(slope: {trend['slope']:.3f} per {unit})"
                     )
         
         elif analysis_type == 'clustering':
@@ -472,6 +1316,39 @@ class DataAnalysisService(BaseAIService):
                 insights.append(f"Data grouped into {results['n_clusters']} clusters")
                 insights.append(f"Clustering quality (inertia): {results['inertia']:.2f}")
         
+        elif analysis_type == 'anomaly':
+            if 'flagged_count' in results:
+                insights.append(
+                    f"{results['flagged_count']} of {results['rows']} rows flagged as anomalous "
+                    f"({results['flagged_rate']:.2%}, {results['method']})"
+                )
+                if results['anomalies']:
+                    top = results['anomalies'][0]
+                    where = f" in {top['column']}" if top['column'] is not None else ''
+                    insights.append(f"Most anomalous: row {top['row']}{where} (score {top['score']:.2f})")
+                flags = results.get('column_flags') or {}
+                if any(flags.values()):
+                    column = max(flags, key=flags.get)
+                    insights.append(f"{column} has the most flagged values ({flags[column]})")
+        
+        elif analysis_type == 'prediction':
+            if 'model_id' in results:
+                verb = 'Trained' if results['trained'] else 'Applied'
+                insights.append(
+                    f"{verb} {results['model_name']} v{results['version']} "
+                    f"({results['estimator']}, {results['rows_trained']} rows)"
+                )
+                metrics = results['metrics']
+                if metrics.get('r_squared') is not None:
+                    insights.append(
+                        f"R-squared on unseen rows: {metrics['r_squared']:.3f} (RMSE {metrics['rmse']:.3f})"
+                    )
+                elif metrics.get('accuracy') is not None:
+                    insights.append(f"Accuracy on unseen rows: {metrics['accuracy']:.1%}")
+                if results['task'] == 'regression' and results['coefficients']:
+                    strongest = max(results['coefficients'].items(), key=lambda item: abs(item[1]))
+                    insights.append(f"Strongest predictor of {results['target']}: {strongest[0]}")
+        
         return insights
 
 
@@ -491,6 +1368,9 @@ class AIServiceManager:
         """Get usage statistics for AI services."""
         from datetime import timedelta
         
+        # Include counts still buffered in this process
+        usage_aggregator.flush()
+        
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days)
         
@@ -0,0 +1,326 @@
+"""
+Mergeable single-pass summaries for descriptive statistics.
+
+Each summary is updated in one pass over chunks of rows, uses memory that
+does not grow with the row count, and can be merged with another summary
+of the same columns built on a different chunk or process (the objects
+pickle cleanly). Moments are exact; quantiles come from a KLL sketch and
+distinct counts from HyperLogLog, both with reported error bounds.
+"""
+import math
+
+from django.conf import settings
+
+from .lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+AI_ANALYSIS_CONFIG = getattr(settings, 'AI_ANALYSIS_CONFIG', {})
+
+QUANTILES = (0.25, 0.5, 0.75)
+# Two-sided normal quantile for the reported quantile error bound
+CONFIDENCE = 0.99
+CONFIDENCE_Z = 2.576
+UPDATE_BLOCK_ROWS = 65536
+
+
+class Moments:
+    """Count, mean, M2, min and max per column, merged with Chan et al.'s update."""
+
+    def __init__(self, k):
+        self.n = np.zeros(k)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+
+    def update(self, values):
+        valid = np.isfinite(values)
+        n_b = valid.sum(axis=0)
+        sums = np.where(valid, values, 0.0).sum(axis=0)
+        mean_b = np.divide(sums, n_b, out=np.zeros_like(sums), where=n_b > 0)
+        m2_b = (np.where(valid, values - mean_b, 0.0) ** 2).sum(axis=0)
+        self._combine(n_b, mean_b, m2_b)
+        self.min = np.fmin(self.min, np.where(valid, values, np.inf).min(axis=0, initial=np.inf))
+        self.max = np.fmax(self.max, np.where(valid, values, -np.inf).max(axis=0, initial=-np.inf))
+
+    def merge(self, other):
+        self._combine(other.n, other.mean, other.m2)
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+
+    def _combine(self, n_b, mean_b, m2_b):
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        safe_n = np.where(n > 0, n, 1)
+        self.m2 = self.m2 + m2_b + delta ** 2 * self.n * n_b / safe_n
+        self.mean = self.mean + delta * n_b / safe_n
+        self.n = n
+
+    def std(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.n > 1, np.sqrt(self.m2 / (self.n - 1)), np.nan)
+
+
+class QuantileSketch:
+    """
+    KLL quantile sketch of a numeric stream.
+
+    Level h holds items of weight 2**h. A full level is sorted and every
+    other item, from a random offset, is promoted to the next level. Each
+    such compaction moves the rank of any value by at most 2**h with zero
+    mean, so the variance of the rank error is tracked exactly and
+    reported by rank_error().
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.variance = 0.0
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(8, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        self.n += len(values)
+        if len(values) > self.k:
+            # A large batch jumps straight to the level where it fits in k
+            # items with one sort and a strided pick; ranks move by less
+            # than the step
+            height = int(math.ceil(math.log2(len(values) / self.k)))
+            step = 2 ** height
+            values = np.sort(values)[int(self.rng.integers(step))::step]
+            self.variance += 4 ** height
+            self._add(height, values)
+        else:
+            self._add(0, values)
+        self._compress()
+
+    def merge(self, other):
+        self.n += other.n
+        self.variance += other.variance
+        for level, items in enumerate(other.levels):
+            self._add(level, items)
+        self._compress()
+
+    def _add(self, level, items):
+        while len(self.levels) <= level:
+            self.levels.append(np.empty(0))
+        self.levels[level] = np.concatenate([self.levels[level], items])
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                # An odd item out stays behind so no weight is lost
+                stay = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[:len(items) - len(stay)]
+                promoted = pairs[int(self.rng.integers(2))::2]
+                self.levels[level] = stay
+                self._add(level + 1, promoted)
+                self.variance += 4 ** level
+            level += 1
+
+    def quantiles(self, qs):
+        """Approximate values at the given quantiles (NaN when empty)."""
+        qs = np.asarray(qs, dtype=float)
+        if not self.n:
+            return np.full(len(qs), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** h) for h, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, qs * cumulative[-1], side='left')
+        return items[np.minimum(positions, len(items) - 1)]
+
+    def rank_error(self):
+        """Normalised rank error that holds with probability CONFIDENCE."""
+        if not self.n:
+            return 0.0
+        return min(1.0, CONFIDENCE_Z * math.sqrt(self.variance) / self.n)
+
+    def size(self):
+        return sum(len(items) for items in self.levels)
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter over 64-bit hashes, with 2**precision registers."""
+
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    def update_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        # frexp is exact here: rest has at most 60 significant bits, but only
+        # its highest set bit matters and doubles keep that
+        _, exponent = np.frexp(rest.astype(float))
+        rank = np.where(rest == 0, 64 - p + 1, 64 - p - exponent + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def update(self, series):
+        """Add the non-missing values of a pandas Series."""
+        series = series.dropna()
+        if len(series):
+            self.update_hashes(pd.util.hash_pandas_object(series, index=False).to_numpy())
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int((self.registers == 0).sum())
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def relative_error(self):
+        """Standard error of count() relative to the true cardinality."""
+        return 1.04 / math.sqrt(len(self.registers))
+
+
+class DescriptiveSketch:
+    """
+    Single-pass descriptive statistics over DataFrame chunks.
+
+    Numeric columns are fixed by the first chunk; later values that do not
+    parse as numbers count as missing. Every column gets a distinct count.
+    """
+
+    def __init__(self, numeric_cols=None, k=None, precision=None, seed=42):
+        self.k = k or AI_ANALYSIS_CONFIG.get('quantile_sketch_k', 200)
+        self.precision = precision or AI_ANALYSIS_CONFIG.get('hll_precision', 12)
+        self.seed = seed
+        self.numeric_cols = None
+        self.distinct = {}
+        if numeric_cols is not None:
+            self._init_numeric(list(numeric_cols))
+
+    def update(self, chunk):
+        """Fold a DataFrame chunk in; returns its numeric columns as a float matrix."""
+        if self.numeric_cols is None:
+            self._init_numeric(list(chunk.select_dtypes(include=[np.number]).columns))
+        numeric = pd.DataFrame({
+            col: pd.to_numeric(chunk[col], errors='coerce') if col in chunk else np.nan
+            for col in self.numeric_cols
+        }, index=chunk.index).to_numpy(dtype=float)
+        self.update_numeric(numeric)
+        self.update_distinct(chunk)
+        return numeric
+
+    def _init_numeric(self, columns):
+        self.numeric_cols = columns
+        self.moments = Moments(len(columns))
+        self.quantile_sketches = [QuantileSketch(self.k, seed=self.seed + i) for i in range(len(columns))]
+
+    def update_numeric(self, values):
+        """Fold a rows x numeric-columns float matrix in."""
+        if self.numeric_cols is None:
+            self._init_numeric(list(range(values.shape[1])))
+        # Blocks bound the size of each sort inside the quantile sketches
+        for start in range(0, len(values), UPDATE_BLOCK_ROWS):
+            block = values[start:start + UPDATE_BLOCK_ROWS]
+            self.moments.update(block)
+            for i, sketch in enumerate(self.quantile_sketches):
+                sketch.update(block[:, i])
+
+    def update_distinct(self, chunk):
+        for col in chunk.columns:
+            if col not in self.distinct:
+                self.distinct[col] = HyperLogLog(self.precision)
+            self.distinct[col].update(chunk[col])
+
+    def merge(self, other):
+        """Merge a sketch built over other rows of the same columns."""
+        if other.numeric_cols is not None:
+            if self.numeric_cols is None:
+                self._init_numeric(list(other.numeric_cols))
+            if list(other.numeric_cols) != list(self.numeric_cols):
+                raise ValueError("Cannot merge sketches over different numeric columns")
+            self.moments.merge(other.moments)
+            for mine, theirs in zip(self.quantile_sketches, other.quantile_sketches):
+                mine.merge(theirs)
+        for col, hll in other.distinct.items():
+            if col in self.distinct:
+                self.distinct[col].merge(hll)
+            else:
+                self.distinct[col] = hll
+
+    def summary(self):
+        """Per numeric column count, mean, std, min, quartiles and max, None where empty."""
+        cols = self.numeric_cols or []
+        if not cols:
+            return {}
+        moments = self.moments
+        has_values = moments.n > 0
+        quartiles = np.array([sketch.quantiles(QUANTILES) for sketch in self.quantile_sketches])
+        stats = {
+            'count': moments.n,
+            'mean': np.where(has_values, moments.mean, np.nan),
+            'std': moments.std(),
+            'min': np.where(has_values, moments.min, np.nan),
+            '25%': quartiles[:, 0],
+            '50%': quartiles[:, 1],
+            '75%': quartiles[:, 2],
+            'max': np.where(has_values, moments.max, np.nan),
+        }
+        return {name: dict(zip(cols, _clean(values))) for name, values in stats.items()}
+
+    def results(self):
+        """Summary fields shaped like the exact descriptive analysis, plus sketch extras."""
+        stats = self.summary()
+        results = {
+            'summary': {col: {name: values[col] for name, values in stats.items()} for col in self.numeric_cols or []},
+            'distinct_counts': self.distinct_counts(),
+            'error_bounds': self.error_bounds(),
+            'approximate': True,
+        }
+        if stats:
+            results['numeric_summary'] = {
+                'mean': stats['mean'],
+                'median': stats['50%'],
+                'std': stats['std'],
+                'min': stats['min'],
+                'max': stats['max'],
+            }
+        return results
+
+    def distinct_counts(self):
+        return {col: hll.count() for col, hll in self.distinct.items()}
+
+    def error_bounds(self):
+        rank_errors = [sketch.rank_error() for sketch in getattr(self, 'quantile_sketches', [])]
+        return {
+            'quantile_rank_error': max(rank_errors, default=0.0),
+            'quantile_confidence': CONFIDENCE,
+            'distinct_relative_error': HyperLogLog(self.precision).relative_error(),
+            'moments': 'exact',
+        }
+
+
+def _clean(values):
+    """Convert an array to a JSON-safe list with NaN as None."""
+    return [None if not np.isfinite(v) else float(v) for v in values]
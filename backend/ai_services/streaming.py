@@ -0,0 +1,424 @@
+"""
+Chunked ingestion and incremental statistics for large dataset uploads.
+
+Uploaded CSV or NDJSON files are read in fixed-size chunks and folded into
+running aggregates, so memory stays bounded by the chunk size and the
+number of columns rather than the number of rows. Moments and co-moments
+are merged per chunk with Chan et al.'s parallel update, which is
+numerically stable for large row counts.
+"""
+import os
+
+from .lazy import lazy_import
+from . import anomaly
+from . import charts as charts_lib
+from . import sketches
+from . import trends
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+DEFAULT_CHUNK_SIZE = 50000
+STREAMING_ANALYSIS_TYPES = ('descriptive', 'correlation', 'trend', 'prediction', 'anomaly')
+SUPPORTED_FORMATS = ('csv', 'ndjson')
+
+# Bounded per-column samples kept for charts
+HISTOGRAM_SAMPLE_SIZE = 10000
+LINE_BUFFER_SIZE = 2000
+
+
+def detect_format(filename, declared=None):
+    """Return 'csv' or 'ndjson' from an explicit format or the file extension."""
+    if declared:
+        declared = declared.lower()
+        if declared in ('json', 'jsonl'):
+            declared = 'ndjson'
+        if declared not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported file format: {declared}")
+        return declared
+
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    if extension in ('.csv', '.txt', ''):
+        return 'csv'
+    raise ValueError(f"Cannot infer file format from {filename!r}; pass format=csv or format=ndjson")
+
+
+def read_chunks(fileobj, file_format, chunksize=DEFAULT_CHUNK_SIZE):
+    """Yield DataFrame chunks from a CSV or NDJSON file object."""
+    if file_format == 'ndjson':
+        reader = pd.read_json(fileobj, lines=True, chunksize=chunksize)
+    else:
+        reader = pd.read_csv(fileobj, chunksize=chunksize)
+
+    with reader:
+        for chunk in reader:
+            yield chunk
+
+
+class _Reservoir:
+    """Uniform sample of a fixed size over a stream (Algorithm R, vectorised per chunk)."""
+
+    def __init__(self, size, rng):
+        self.size = size
+        self.rng = rng
+        self.values = np.empty(0)
+        self.seen = 0
+
+    def update(self, values):
+        values = values[np.isfinite(values)]
+        free = self.size - len(self.values)
+        if free > 0:
+            self.values = np.concatenate([self.values, values[:free]])
+            self.seen += min(free, len(values))
+            values = values[free:]
+        if not len(values):
+            return
+        positions = self.seen + np.arange(1, len(values) + 1)
+        slots = (self.rng.random(len(values)) * positions).astype(np.int64)
+        keep = slots < self.size
+        # Later replacements of the same slot win, as in the sequential algorithm
+        self.values[slots[keep]] = values[keep]
+        self.seen += len(values)
+
+
+class _Decimator:
+    """
+    Keep every stride-th point of a series, doubling the stride when full.
+
+    x defaults to each value's position in the series.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.stride = 1
+        self.positions = []
+        self.x = []
+        self.y = []
+        self.position = 0
+
+    def update(self, values, x=None):
+        positions = self.position + np.arange(len(values))
+        self.position += len(values)
+        mask = np.isfinite(values) & (positions % self.stride == 0)
+        self.positions.extend(positions[mask].tolist())
+        self.x.extend((positions if x is None else x)[mask].tolist())
+        self.y.extend(values[mask].tolist())
+        while len(self.positions) > self.size:
+            self.stride *= 2
+            kept = [i for i, position in enumerate(self.positions) if position % self.stride == 0]
+            self.positions = [self.positions[i] for i in kept]
+            self.x = [self.x[i] for i in kept]
+            self.y = [self.y[i] for i in kept]
+
+
+class StreamingAnalyzer:
+    """
+    Fold DataFrame chunks into descriptive, correlation or trend statistics.
+
+    For prediction, each chunk trains model (a prediction.IncrementalModel)
+    after it has been scored; for anomaly, detector (an
+    anomaly.AnomalyDetector, default z-scores) scores each chunk.
+
+    Trends are fitted against time_column, or the datetime column
+    detected in the first chunk, in days, as the in-memory analysis
+    does; without one, against each value's position in its column.
+    Each row is one observation: repeated timestamps are not aggregated,
+    and resampling and rolling windows need the whole series in memory.
+    """
+
+    def __init__(self, analysis_type, random_state=42, model=None, detector=None, time_column=None):
+        if analysis_type not in STREAMING_ANALYSIS_TYPES:
+            raise ValueError(
+                f"Analysis type '{analysis_type}' is not supported for streamed uploads; "
+                f"use one of {', '.join(STREAMING_ANALYSIS_TYPES)}"
+            )
+        if analysis_type == 'prediction' and model is None:
+            raise ValueError("Streamed prediction needs a model to train")
+        self.analysis_type = analysis_type
+        self.model = model
+        self.scored = None
+        self.detector = detector
+        self.time_column = time_column
+        self.rng = np.random.default_rng(random_state)
+        self.rows = 0
+        self.chunks = 0
+        self.columns = []
+        self.data_types = {}
+        self.missing = {}
+        self.numeric_cols = None
+
+    def update(self, chunk):
+        """Fold one DataFrame chunk into the running statistics."""
+        if self.numeric_cols is None:
+            self._init_columns(chunk)
+
+        for col in chunk.columns:
+            if col not in self.missing:
+                self.columns.append(col)
+                self.data_types[col] = str(chunk[col].dtype)
+                self.missing[col] = self.rows
+        for col in self.columns:
+            self.missing[col] += int(chunk[col].isnull().sum()) if col in chunk else len(chunk)
+
+        # Columns numeric in the first chunk stay numeric; stray values become NaN
+        numeric = pd.DataFrame({
+            col: pd.to_numeric(chunk[col], errors='coerce') if col in chunk else np.nan
+            for col in self.numeric_cols
+        }, index=chunk.index).to_numpy(dtype=float)
+
+        if self.analysis_type == 'descriptive':
+            self._update_descriptive(numeric, chunk)
+        elif self.analysis_type == 'correlation':
+            self._update_correlation(numeric)
+        elif self.analysis_type == 'trend':
+            self._update_trend(numeric, self._days(chunk))
+        elif self.analysis_type == 'anomaly':
+            self.scores.update(self.detector.update(chunk))
+        elif self.analysis_type == 'prediction':
+            scored = self.model.partial_fit(chunk)
+            if scored is not None:
+                # The latest scored rows, for the predicted vs actual chart
+                self.scored = tuple(values[-charts_lib.MAX_SCATTER_POINTS:] for values in scored)
+
+        self.rows += len(chunk)
+        self.chunks += 1
+
+    def _init_columns(self, chunk):
+        self.numeric_cols = list(chunk.select_dtypes(include=[np.number]).columns)
+        if self.analysis_type == 'trend':
+            self.time_column, _ = trends.detect_time_column(chunk, self.time_column)
+            if self.time_column in self.numeric_cols:
+                self.numeric_cols.remove(self.time_column)
+        k = len(self.numeric_cols)
+        if self.analysis_type == 'descriptive':
+            self.sketch = sketches.DescriptiveSketch(numeric_cols=self.numeric_cols)
+            self.samples = [_Reservoir(HISTOGRAM_SAMPLE_SIZE, self.rng) for _ in range(k)]
+        elif self.analysis_type == 'correlation':
+            self.corr_n = 0
+            self.corr_mean = np.zeros(k)
+            self.comoment = np.zeros((k, k))
+        elif self.analysis_type == 'anomaly':
+            if self.detector is None:
+                self.detector = anomaly.AnomalyDetector()
+            self.scores = _Reservoir(HISTOGRAM_SAMPLE_SIZE, self.rng)
+        elif self.analysis_type == 'trend':
+            self.n = np.zeros(k)
+            self.mean = np.zeros(k)
+            self.mean_x = np.zeros(k)
+            self.cxx = np.zeros(k)
+            self.cxy = np.zeros(k)
+            self.cyy = np.zeros(k)
+            # Days are counted from the first timestamp read; results move
+            # the intercept to the earliest one, as the in-memory fit has it
+            self.origin = None
+            self.first_time = None
+            self.last_time = None
+            self.periods = 0
+            self.series = [_Decimator(LINE_BUFFER_SIZE) for _ in range(k)]
+
+    def _update_descriptive(self, values, chunk):
+        self.sketch.update_numeric(values)
+        self.sketch.update_distinct(chunk)
+        for i, sample in enumerate(self.samples):
+            sample.update(values[:, i])
+
+    def _update_correlation(self, values):
+        # Complete cases only, so the co-moment matrix stays consistent
+        values = values[~np.isnan(values).any(axis=1)]
+        n_b = len(values)
+        if not n_b:
+            return
+        mean_b = values.mean(axis=0)
+        centered = values - mean_b
+        comoment_b = centered.T @ centered
+
+        n = self.corr_n + n_b
+        delta = mean_b - self.corr_mean
+        self.comoment += comoment_b + np.outer(delta, delta) * self.corr_n * n_b / n
+        self.corr_mean += delta * n_b / n
+        self.corr_n = n
+
+    def _days(self, chunk):
+        """Days since the origin of each row's timestamp (NaN where missing), or None without a time column."""
+        if self.analysis_type != 'trend' or self.time_column is None:
+            return None
+        if self.time_column not in chunk:
+            return np.full(len(chunk), np.nan)
+        _, times = trends.detect_time_column(chunk, self.time_column)
+        times = times.to_numpy(dtype='datetime64[ns]')
+        present = ~np.isnat(times)
+        if not present.any():
+            return np.full(len(chunk), np.nan)
+
+        first, last = times[present].min(), times[present].max()
+        if self.origin is None:
+            self.origin = self.first_time = first
+            self.last_time = last
+        self.first_time = min(self.first_time, first)
+        self.last_time = max(self.last_time, last)
+        self.periods += int(present.sum())
+        elapsed = (times - self.origin).astype('int64') / trends.NANOSECONDS_PER_DAY
+        return np.where(present, elapsed, np.nan)
+
+    def _update_trend(self, values, days=None):
+        n_a = self.n
+        if days is None:
+            valid = ~np.isnan(values)
+            # x is the position of each non-null value within its column, continuing across chunks
+            x = np.cumsum(valid, axis=0) - 1 + n_a
+            self.periods += len(values)
+        else:
+            valid = ~np.isnan(values) & np.isfinite(days)[:, None]
+            x = np.broadcast_to(np.nan_to_num(days)[:, None], values.shape)
+        n_b = valid.sum(axis=0)
+
+        sum_x = np.where(valid, x, 0.0).sum(axis=0)
+        sum_y = np.where(valid, values, 0.0).sum(axis=0)
+        mean_xb = np.divide(sum_x, n_b, out=np.zeros_like(sum_x), where=n_b > 0)
+        mean_yb = np.divide(sum_y, n_b, out=np.zeros_like(sum_y), where=n_b > 0)
+        dx = np.where(valid, x - mean_xb, 0.0)
+        dy = np.where(valid, values - mean_yb, 0.0)
+
+        n = n_a + n_b
+        safe_n = np.where(n > 0, n, 1)
+        delta_x = mean_xb - self.mean_x
+        delta_y = mean_yb - self.mean
+        weight = n_a * n_b / safe_n
+        self.cxx = self.cxx + (dx ** 2).sum(axis=0) + delta_x ** 2 * weight
+        self.cxy = self.cxy + (dx * dy).sum(axis=0) + delta_x * delta_y * weight
+        self.cyy = self.cyy + (dy ** 2).sum(axis=0) + delta_y ** 2 * weight
+        self.mean_x = self.mean_x + delta_x * n_b / safe_n
+        self.mean = self.mean + delta_y * n_b / safe_n
+        self.n = n
+
+        for i, series in enumerate(self.series):
+            column = valid[:, i]
+            series.update(values[column, i], None if days is None else days[column])
+
+    def results(self):
+        """Return results in the same shape as the in-memory analyses."""
+        if self.numeric_cols is None:
+            raise ValueError("Uploaded file contains no rows")
+
+        base = {'rows': self.rows, 'chunks': self.chunks, 'streamed': True}
+
+        if self.analysis_type == 'descriptive':
+            return dict(base, **self._descriptive_results())
+        if self.analysis_type == 'correlation':
+            return dict(base, **self._correlation_results())
+        if self.analysis_type == 'prediction':
+            # The caller registers the model and adds its details
+            return base
+        if self.analysis_type == 'anomaly':
+            # Rows held back to fit an isolation forest are scored now
+            self.scores.update(self.detector.finish())
+            return dict(base, **self.detector.results())
+        return dict(base, **self._trend_results())
+
+    def _descriptive_results(self):
+        results = self.sketch.results()
+        results.update({
+            'missing_values': dict(self.missing),
+            'data_types': dict(self.data_types),
+            'shape': [self.rows, len(self.columns)],
+            'columns': list(self.columns),
+        })
+        return results
+
+    def _correlation_results(self):
+        cols = self.numeric_cols
+        if len(cols) < 2:
+            return {'error': 'Need at least 2 numeric columns for correlation analysis'}
+        if self.corr_n < 2:
+            return {'error': 'Need at least 2 complete rows for correlation analysis'}
+
+        scale = np.sqrt(np.diag(self.comoment))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.comoment / np.outer(scale, scale)
+        self.correlation = pd.DataFrame(corr, index=cols, columns=cols)
+        return {
+            'correlation_matrix': {
+                col: dict(zip(cols, _clean(corr[:, j]))) for j, col in enumerate(cols)
+            },
+            'rows_used': int(self.corr_n),
+        }
+
+    def _trend_results(self):
+        # x of the earliest timestamp; positions start at 0
+        start = 0.0
+        if self.origin is not None:
+            start = (self.first_time - self.origin).astype('int64') / trends.NANOSECONDS_PER_DAY
+        results = {}
+        for i, col in enumerate(self.numeric_cols):
+            if self.n[i] > 1 and self.cxx[i] > 0:
+                slope = float(self.cxy[i] / self.cxx[i])
+                mean = float(self.mean[i])
+                cyy = self.cyy[i]
+                results[col] = {
+                    'slope': slope,
+                    'trend': trends.direction(slope),
+                    'change_rate': slope / mean if mean != 0 else 0,
+                    'intercept': mean - slope * float(self.mean_x[i] - start),
+                    'r_squared': float(self.cxy[i] ** 2 / (self.cxx[i] * cyy)) if cyy > 0 else 1.0,
+                    'points': int(self.n[i])
+                }
+        summary = {
+            'trends': results,
+            'x_unit': 'row' if self.time_column is None else 'day',
+            'time_column': self.time_column,
+            'periods': self.periods
+        }
+        if self.origin is not None:
+            summary['start'] = str(np.datetime_as_string(self.first_time, unit='s'))
+            summary['end'] = str(np.datetime_as_string(self.last_time, unit='s'))
+        return summary
+
+    def visualizations(self):
+        """Compact chart specs built from the bounded per-column samples."""
+        charts = []
+        if self.analysis_type == 'descriptive':
+            for col, sample in list(zip(self.numeric_cols, self.samples))[:5]:
+                chart = charts_lib.histogram_spec(sample.values, f'Distribution of {col}')
+                if chart:
+                    chart['data']['sampled_from'] = int(sample.seen)
+                    charts.append(chart)
+        elif self.analysis_type == 'correlation' and hasattr(self, 'correlation'):
+            charts.append(charts_lib.heatmap_spec(
+                self.correlation.values, self.correlation.columns, 'Correlation Heatmap'
+            ))
+        elif self.analysis_type == 'trend':
+            for col, series in list(zip(self.numeric_cols, self.series))[:3]:
+                x, y = np.asarray(series.x, dtype=float), np.asarray(series.y, dtype=float)
+                if self.origin is not None:
+                    # Rows need not be in time order; the chart draws them in order
+                    order = np.argsort(x, kind='stable')
+                    x = self.origin + (x[order] * trends.NANOSECONDS_PER_DAY).astype('timedelta64[ns]')
+                    y = y[order]
+                chart = charts_lib.line_spec(y, f'Trend of {col}', x=x, x_label=self.time_column)
+                if chart:
+                    chart['data']['total'] = int(series.position)
+                    charts.append(chart)
+        elif self.analysis_type == 'anomaly':
+            charts.extend(anomaly.charts(self.detector, self.scores.values, total=self.scores.seen))
+        elif self.analysis_type == 'prediction':
+            model = self.model
+            if model.task == 'regression' and self.scored is not None:
+                actual, predicted = self.scored
+                charts.append(charts_lib.scatter_spec(
+                    actual, predicted, f'Predicted vs actual {model.target}',
+                    x_label='actual', y_label='predicted'
+                ))
+            confusion = model.validation.results().get('confusion_matrix')
+            if confusion is not None:
+                charts.append(charts_lib.heatmap_spec(
+                    np.asarray(confusion, dtype=float), model.classes, 'Confusion Matrix'
+                ))
+        return charts
+
+
+def _clean(values):
+    """Convert an array to a JSON-safe list with NaN as None."""
+    return [None if not np.isfinite(v) else float(v) for v in values]
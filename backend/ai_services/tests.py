@@ -0,0 +1,522 @@
+import io
+import json
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import datasets, ingest, jobs
+from .models import AIRequest, AIService, AIUsage, DataAnalysis, Dataset, TextGeneration
+from .services import DataAnalysisService
+from .usage import UsageAggregator, usage_aggregator
+
+
+def parse_events(body):
+    """(event, data) pairs of a server-sent event stream."""
+    events = []
+    for message in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in message.splitlines())
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class WriteThroughUsageMixin:
+    """Writes usage on every record, so no counts outlive the test that made them."""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(usage_aggregator, 'flush_interval', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+@override_settings(AI_MODEL_CONFIG=dict(settings.AI_MODEL_CONFIG, backend='fake'))
+class TextGenerationStreamTests(WriteThroughUsageMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        AIService.objects.create(name='Text Generation', service_type='text_gen', description='Text generation')
+
+    def stream(self, **body):
+        response = self.client.post(
+            reverse('ai_services:text_generation_stream_api'), json.dumps(body), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return parse_events(b''.join(response.streaming_content).decode())
+
+    def test_streams_tokens_then_done(self):
+        events = self.stream(prompt='hello streaming world', temperature=0.7)
+
+        names = [name for name, _ in events]
+        self.assertEqual(names, ['token'] * 5 + ['done'])
+        text = ''.join(data['text'] for name, data in events if name == 'token')
+        self.assertEqual(text, 'You said: hello streaming world')
+        done = events[-1][1]
+        self.assertEqual(done['generated_text'], text)
+        self.assertIsNotNone(done['time_to_first_token'])
+        self.assertTrue(TextGeneration.objects.filter(generated_text=text).exists())
+        self.assertEqual(AIRequest.objects.get().status, 'completed')
+
+    def test_cached_prompt_is_one_token(self):
+        self.stream(prompt='cache me', temperature=0)
+
+        events = self.stream(prompt='cache me', temperature=0)
+
+        self.assertEqual([name for name, _ in events], ['token', 'done'])
+        self.assertEqual(events[0][1]['text'], 'You said: cache me')
+
+    def test_missing_prompt_is_rejected(self):
+        response = self.client.post(
+            reverse('ai_services:text_generation_stream_api'), '{}', content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_script_posts_to_the_stream_route(self):
+        script = Path(settings.BASE_DIR, 'static', 'js', 'main.js').read_text()
+
+        self.assertIn(f"fetch('{reverse('ai_services:text_generation_stream_api')}'", script)
+
+
+def csv_upload(rows, name='data.csv'):
+    lines = ['id,value,city'] + [f"{i},{i * 0.5},{('Pune', 'Delhi', 'Goa')[i % 3]}" for i in range(rows)]
+    return SimpleUploadedFile(name, '\n'.join(lines).encode(), content_type='text/csv')
+
+
+class ArtifactDirMixin:
+    """Points the dataset store at a temporary directory, read in small chunks."""
+
+    analysis_config = {}
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        patcher = mock.patch.dict(datasets.AI_ANALYSIS_CONFIG, {
+            'artifact_dir': directory,
+            'ingest_batch_rows': 100,
+            **self.analysis_config,
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(datasets._sessions.clear)
+
+
+class DatasetUploadTests(ArtifactDirMixin, TestCase):
+
+    def upload(self, upload):
+        return self.client.post(reverse('ai_services:dataset_upload_api'), {'file': upload})
+
+    def test_file_is_stored_compact(self):
+        response = self.upload(csv_upload(250))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['rows'], 250)
+        df = datasets.open_session(Dataset.objects.get()).df
+        self.assertEqual(len(df), 250)
+        self.assertEqual(str(df['city'].dtype), 'category')
+        self.assertEqual(str(df['id'].dtype), 'uint8')
+
+    def test_oversized_frame_stops_reading_early(self):
+        with mock.patch.dict(datasets.AI_ANALYSIS_CONFIG, {'max_frame_mb': 2000 / 2 ** 20}), \
+                mock.patch.object(ingest, 'optimize_dtypes', wraps=ingest.optimize_dtypes) as optimize:
+            response = self.upload(csv_upload(1000))
+
+        self.assertEqual(response.status_code, 413)
+        self.assertLess(optimize.call_count, 10)
+        self.assertFalse(Dataset.objects.exists())
+
+
+class JobServicesMixin:
+
+    def setUp(self):
+        super().setUp()
+        self.service = AIService.objects.create(name='Text Generation', service_type='text_gen', description='')
+        AIService.objects.create(name='Data Analysis', service_type='data_analysis', description='')
+
+
+class JobQueueTests(JobServicesMixin, TestCase):
+
+    def test_claimed_job_is_not_claimed_again(self):
+        job = jobs.enqueue('text_generation', 'hello')
+
+        claimed = jobs.claim_next()
+
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, 'processing')
+        self.assertIsNotNone(claimed.started_at)
+        self.assertIsNone(jobs.claim_next())
+
+    def test_plain_requests_are_not_claimed(self):
+        AIRequest.objects.create(service=self.service, input_data='hello')
+
+        self.assertIsNone(jobs.claim_next())
+
+    def test_clean_timeout(self):
+        for timeout in (0, -1, float('nan'), 'nan', float('inf'), True, False, 'soon', [5]):
+            with self.subTest(timeout=timeout), self.assertRaises(ValueError):
+                jobs.clean_timeout(timeout)
+
+        self.assertEqual(jobs.clean_timeout(None), jobs.DEFAULT_TIMEOUT)
+        self.assertEqual(jobs.clean_timeout(''), jobs.DEFAULT_TIMEOUT)
+        self.assertEqual(jobs.clean_timeout('2.5'), 2.5)
+        self.assertEqual(jobs.clean_timeout(jobs.MAX_TIMEOUT * 10), jobs.MAX_TIMEOUT)
+
+    def test_cancel(self):
+        job = jobs.enqueue('text_generation', 'hello')
+
+        self.assertTrue(jobs.cancel(job))
+        self.assertEqual(job.status, 'cancelled')
+        self.assertFalse(jobs.cancel(job))
+
+    def test_finished_job_cannot_be_cancelled(self):
+        job = jobs.enqueue('text_generation', 'hello')
+        AIRequest.objects.filter(pk=job.pk).update(status='completed')
+
+        self.assertFalse(jobs.cancel(job))
+        self.assertEqual(job.status, 'completed')
+
+    def test_reap_expired_fails_stale_jobs(self):
+        stale = jobs.enqueue('text_generation', 'stale', timeout=10)
+        fresh = jobs.enqueue('text_generation', 'fresh', timeout=10)
+        AIRequest.objects.filter(pk=stale.pk).update(
+            status='processing', started_at=timezone.now() - timedelta(seconds=11)
+        )
+        AIRequest.objects.filter(pk=fresh.pk).update(status='processing', started_at=timezone.now())
+
+        self.assertEqual(jobs.reap_expired(), 1)
+
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stale.status, 'failed')
+        self.assertIn('timeout of 10s', stale.error_message)
+        self.assertEqual(fresh.status, 'processing')
+
+
+def sleep_in_process(job_pk):
+    time.sleep(30)
+
+
+def exit_in_process(job_pk):
+    raise SystemExit(3)
+
+
+class JobRunTests(JobServicesMixin, TransactionTestCase):
+
+    def run_claimed(self, timeout):
+        jobs.enqueue('text_generation', 'hello', timeout=timeout)
+        started = time.monotonic()
+        job = jobs.run_job(jobs.claim_next(), poll_interval=0.05)
+        return job, time.monotonic() - started
+
+    def test_thread_past_its_deadline_is_failed(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        runners = dict(jobs.JOB_TYPES, text_generation=('Text Generation', lambda job: release.wait(10)))
+
+        with mock.patch.dict(jobs.AI_JOB_CONFIG, {'isolation': 'thread'}), \
+                mock.patch.object(jobs, 'JOB_TYPES', runners):
+            job, elapsed = self.run_claimed(timeout=0.2)
+
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('exceeded its timeout', job.error_message)
+        self.assertLess(elapsed, 5)
+
+    def test_process_past_its_deadline_is_stopped(self):
+        workers = []
+        start = jobs._start
+
+        def recording_start(job):
+            workers.append(start(job))
+            return workers[-1]
+
+        with mock.patch.dict(jobs.AI_JOB_CONFIG, {'isolation': 'process', 'start_method': 'fork'}), \
+                mock.patch.object(jobs, '_run_in_process', sleep_in_process), \
+                mock.patch.object(jobs, '_start', recording_start):
+            job, elapsed = self.run_claimed(timeout=0.2)
+
+        worker, = workers
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(worker.exitcode, -15)
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('exceeded its timeout', job.error_message)
+        self.assertLess(elapsed, 5)
+
+    def test_process_exit_code_fails_the_job(self):
+        with mock.patch.dict(jobs.AI_JOB_CONFIG, {'isolation': 'process', 'start_method': 'fork'}), \
+                mock.patch.object(jobs, '_run_in_process', exit_in_process):
+            job, _ = self.run_claimed(timeout=10)
+
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('exited with code 3', job.error_message)
+
+
+class JobViewTests(JobServicesMixin, TestCase):
+
+    def test_status_of_a_job(self):
+        job = jobs.enqueue('text_generation', 'hello')
+
+        response = self.client.get(reverse('ai_services:request_status_api', args=[job.token]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['request_id'], str(job.token))
+        self.assertEqual(response.json()['status'], 'pending')
+
+    def test_unknown_token_is_not_found(self):
+        token = uuid.uuid4()
+
+        self.assertEqual(self.client.get(reverse('ai_services:request_status_api', args=[token])).status_code, 404)
+        self.assertEqual(self.client.post(reverse('ai_services:request_cancel_api', args=[token])).status_code, 404)
+
+    def test_requests_that_are_not_jobs_are_not_found(self):
+        request = AIRequest.objects.create(service=self.service, input_data='hello')
+
+        self.assertEqual(self.client.get(reverse('ai_services:request_status_api', args=[request.token])).status_code, 404)
+        self.assertEqual(self.client.post(reverse('ai_services:request_cancel_api', args=[request.token])).status_code, 404)
+        request.refresh_from_db()
+        self.assertEqual(request.status, 'pending')
+
+    def test_cancel_then_cancel_again(self):
+        job = jobs.enqueue('text_generation', 'hello')
+        url = reverse('ai_services:request_cancel_api', args=[job.token])
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'cancelled')
+
+        self.assertEqual(self.client.post(url).status_code, 409)
+
+
+class StreamedTrendTests(WriteThroughUsageMixin, TestCase):
+    """Streamed uploads fit the same trends as the in-memory analysis of the same rows."""
+
+    def setUp(self):
+        super().setUp()
+        AIService.objects.create(name='Data Analysis', service_type='data_analysis', description='')
+        rows = [(f'2024-01-{day:02d}', day * 2.0 + (day % 3), 10 - day % 4) for day in range(1, 29)]
+        # Out of time order, with a missing value and a missing timestamp
+        rows = rows[14:] + rows[:14]
+        rows[3] = (rows[3][0], '', rows[3][2])
+        rows[5] = ('', rows[5][1], rows[5][2])
+        self.csv = 'day,sales,stock\n' + '\n'.join(','.join(str(value) for value in row) for row in rows)
+
+    def analyze_file(self, parameters=None, user=None):
+        upload = SimpleUploadedFile('sales.csv', self.csv.encode(), content_type='text/csv')
+        return DataAnalysisService().analyze_file(
+            upload, 'trend', user=user, chunksize=5, parameters=parameters
+        )['results']
+
+    def in_memory(self, df, parameters=None):
+        return DataAnalysisService()._trend_analysis(df, parameters)
+
+    def assertSameTrends(self, streamed, expected):
+        self.assertEqual(streamed.keys() & expected.keys(), expected.keys())
+        for col, trend in expected['trends'].items():
+            for key, value in trend.items():
+                with self.subTest(col=col, key=key):
+                    if isinstance(value, float):
+                        self.assertAlmostEqual(streamed['trends'][col][key], value)
+                    else:
+                        self.assertEqual(streamed['trends'][col][key], value)
+        for key in ('x_unit', 'time_column', 'periods', 'start', 'end'):
+            self.assertEqual(streamed.get(key), expected.get(key))
+
+    def test_fits_per_day_against_the_detected_time_column(self):
+        streamed = self.analyze_file()
+
+        self.assertEqual(streamed['x_unit'], 'day')
+        self.assertEqual(streamed['time_column'], 'day')
+        self.assertSameTrends(streamed, self.in_memory(pd.read_csv(io.StringIO(self.csv))))
+
+    def test_without_a_time_column_fits_against_position(self):
+        self.csv = '\n'.join(line.split(',', 1)[1] for line in self.csv.splitlines())
+
+        streamed = self.analyze_file()
+
+        self.assertEqual(streamed['x_unit'], 'row')
+        self.assertSameTrends(streamed, self.in_memory(pd.read_csv(io.StringIO(self.csv))))
+
+    def test_analysis_belongs_to_the_uploader(self):
+        user = User.objects.create_user('analyst')
+
+        self.analyze_file(user=user)
+
+        self.assertEqual(DataAnalysis.objects.get().user, user)
+
+    def test_resampling_is_refused(self):
+        with self.assertRaises(ValueError):
+            self.analyze_file({'freq': 'W'})
+
+
+class AnalysisMemoTests(ArtifactDirMixin, WriteThroughUsageMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        AIService.objects.create(name='Data Analysis', service_type='data_analysis', description='')
+        self.data = [{'x': i, 'y': i * 2 + i % 5, 'z': i * 7 % 11} for i in range(60)]
+
+    def analyze(self, analysis_type='descriptive', parameters=None, **kwargs):
+        return DataAnalysisService().analyze_data(self.data, analysis_type, parameters=parameters, **kwargs)
+
+    def test_inline_data_and_equal_dataset_share_a_key(self):
+        dataset, _ = datasets.store(data=self.data)
+
+        first = self.analyze('correlation')
+        second = DataAnalysisService().analyze_dataset(dataset, 'correlation')
+
+        self.assertFalse(first['cached'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['analysis_id'], first['analysis_id'])
+        key = DataAnalysisService.cache_key(dataset.content_hash, 'correlation')
+        self.assertEqual(DataAnalysisService.cache_key(datasets.data_hash(self.data), 'correlation'), key)
+        self.assertEqual(DataAnalysis.objects.get().cache_key, key)
+
+    def test_repeat_is_served_from_the_memo(self):
+        first = self.analyze(parameters={'mode': 'exact'})
+
+        second = self.analyze(parameters={'mode': 'exact'})
+
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['analysis_id'], first['analysis_id'])
+        self.assertEqual(second['results'], DataAnalysis.objects.get().results)
+
+    def test_other_parameters_are_another_analysis(self):
+        self.analyze(parameters={'mode': 'exact'})
+
+        self.assertFalse(self.analyze(parameters={'mode': 'sketch'})['cached'])
+        self.assertEqual(DataAnalysis.objects.count(), 2)
+
+    def test_use_cache_false_recomputes(self):
+        self.analyze()
+
+        result = self.analyze(use_cache=False)
+
+        self.assertFalse(result['cached'])
+        self.assertEqual(DataAnalysis.objects.count(), 2)
+
+    def test_training_and_spilling_bypass_the_memo(self):
+        for analysis_type, parameters in [
+            ('prediction', {'target': 'y'}),
+            ('clustering', {'model_name': 'segments'}),
+            ('correlation', {'spill': True}),
+        ]:
+            with self.subTest(analysis_type=analysis_type):
+                first = self.analyze(analysis_type, parameters)
+                second = self.analyze(analysis_type, parameters)
+
+                self.assertFalse(second['cached'])
+                self.assertNotEqual(second['analysis_id'], first['analysis_id'])
+
+    def test_file_uploads_are_never_cached(self):
+        upload = csv_upload(50)
+
+        result = DataAnalysisService().analyze_file(upload, 'descriptive')
+
+        self.assertIs(result['cached'], False)
+
+
+class UsageAggregatorTests(TestCase):
+
+    def setUp(self):
+        self.service = AIService.objects.create(name='Data Analysis', service_type='data_analysis', description='')
+        self.aggregator = UsageAggregator(flush_interval=60, max_pending=100)
+        # Flushes happen in the test only
+        patcher = mock.patch.object(self.aggregator, '_ensure_thread')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.today = date(2026, 10, 18)
+
+    def record(self, **counts):
+        self.aggregator.record(self.service.pk, None, self.today, **counts)
+
+    def test_anonymous_flushes_share_one_row(self):
+        self.record(successful=1, processing_time=0.5)
+        self.aggregator.flush()
+        self.record(successful=2, processing_time=1.0)
+        self.record(failed=1, processing_time=0.25)
+        self.aggregator.flush()
+
+        usage = AIUsage.objects.get()
+        self.assertIsNone(usage.user)
+        self.assertEqual(usage.requests_count, 4)
+        self.assertEqual(usage.successful_requests, 3)
+        self.assertEqual(usage.failed_requests, 1)
+        self.assertAlmostEqual(usage.total_processing_time, 1.75)
+
+    def test_second_anonymous_row_is_refused(self):
+        AIUsage.objects.create(service=self.service, date=self.today)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AIUsage.objects.create(service=self.service, date=self.today)
+
+    def test_failed_flush_keeps_its_deltas(self):
+        self.record(successful=1, processing_time=0.5)
+
+        with mock.patch.object(self.aggregator, '_apply', side_effect=DatabaseError('database is locked')), \
+                self.assertLogs('ai_services.usage', 'ERROR'):
+            self.assertEqual(self.aggregator.flush(), 0)
+        self.assertFalse(AIUsage.objects.exists())
+
+        self.record(successful=1, processing_time=0.5)
+        self.assertEqual(self.aggregator.flush(), 1)
+
+        usage = AIUsage.objects.get()
+        self.assertEqual(usage.successful_requests, 2)
+        self.assertAlmostEqual(usage.total_processing_time, 1.0)
+
+    def test_record_flushes_once_the_interval_has_passed(self):
+        self.record(successful=1)
+        self.assertFalse(AIUsage.objects.exists())
+
+        self.aggregator._last_flush -= self.aggregator.flush_interval
+        self.record(successful=1)
+
+        self.assertEqual(AIUsage.objects.get().successful_requests, 2)
+
+
+class MergeAnonymousUsageMigrationTests(TransactionTestCase):
+    before = [('ai_services', '0010_dataset_token')]
+    after = [('ai_services', '0011_aiusage_unique_anonymous')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_duplicates_are_merged_into_the_oldest_row(self):
+        apps = self.migrate(self.before)
+        service = apps.get_model('ai_services', 'AIService').objects.create(
+            name='Data Analysis', service_type='data_analysis', description=''
+        )
+        usage = apps.get_model('ai_services', 'AIUsage').objects
+        today = date(2026, 10, 18)
+        oldest = usage.create(service=service, date=today, requests_count=1, successful_requests=1,
+                              total_processing_time=0.5)
+        usage.create(service=service, date=today, requests_count=2, failed_requests=2, total_processing_time=1.5)
+        usage.create(service=service, date=today - timedelta(days=1), requests_count=7)
+
+        self.migrate(self.after)
+
+        merged = AIUsage.objects.get(date=today)
+        self.assertEqual(merged.pk, oldest.pk)
+        self.assertEqual(merged.requests_count, 3)
+        self.assertEqual(merged.successful_requests, 1)
+        self.assertEqual(merged.failed_requests, 2)
+        self.assertAlmostEqual(merged.total_processing_time, 2.0)
+        self.assertEqual(AIUsage.objects.count(), 2)
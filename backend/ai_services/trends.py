@@ -0,0 +1,227 @@
+"""
+Vectorized linear trends for every numeric column at once.
+
+Slopes come from the closed-form least-squares solution
+slope = Sxy / Sxx, evaluated for all columns together with NaN masks
+instead of one np.polyfit call per column. When the data has a datetime
+column, rows are ordered (and optionally resampled) on it and x is
+measured in days, so slopes are rates per day rather than per row.
+Rolling-window slopes use cumulative sums, so every window of every
+column is computed without a Python loop.
+"""
+import re
+
+from django.conf import settings
+
+from .lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+AI_ANALYSIS_CONFIG = getattr(settings, 'AI_ANALYSIS_CONFIG', {})
+
+NANOSECONDS_PER_DAY = 86400 * 10 ** 9
+AGGREGATIONS = ('mean', 'sum', 'min', 'max', 'median', 'first', 'last')
+# Dates with a four-digit year and numeric fields: 2024-01-31, 31/01/2024,
+# 2024.01.31, optionally followed by a time and UTC offset. Month names,
+# ordinals and words like "today" are left alone.
+DATE_PATTERN = re.compile(
+    r'\s*(?:\d{4}[-/.]\d{1,2}[-/.]\d{1,2}|\d{1,2}[-/.]\d{1,2}[-/.]\d{4})'
+    r'(?:[T ]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?\s*(?:Z|[+-]\d{2}:?\d{2})?)?\s*'
+)
+
+
+def detect_time_column(df, name=None):
+    """
+    Return (column name, parsed datetime Series) or (None, None).
+
+    An explicit name wins. Otherwise the first datetime column is used,
+    then the first text column whose values all parse as dates.
+    """
+    if name is not None:
+        if name not in df.columns:
+            raise ValueError(f"Time column '{name}' not found")
+        return name, _to_datetime(df[name])
+
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            return col, _to_datetime(df[col])
+
+    for col in df.columns:
+        parsed = parse_dates(df[col])
+        if parsed is not None:
+            return col, parsed
+
+    return None, None
+
+
+def parse_dates(series):
+    """
+    Parse a text Series as datetimes if all of it is written as dates.
+
+    Returns the parsed Series (unparseable values become NaT) or None.
+    Every value must match DATE_PATTERN, and every parsed year must lie
+    within AI_ANALYSIS_CONFIG['date_year_range'].
+    """
+    if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+        return None
+    values = series.dropna()
+    sample = values.head(AI_ANALYSIS_CONFIG.get('time_detection_sample', 100))
+    if sample.empty or not _looks_like_dates(sample) or not _to_datetime(sample).notna().all():
+        return None
+    if len(values) > len(sample) and not _looks_like_dates(values):
+        return None
+    parsed = _to_datetime(series)
+    first_year, last_year = AI_ANALYSIS_CONFIG.get('date_year_range', (1900, 2200))
+    years = parsed.dt.year.dropna()
+    if len(years) and (years.min() < first_year or years.max() > last_year):
+        return None
+    return parsed
+
+
+def _looks_like_dates(values):
+    return all(isinstance(value, str) and DATE_PATTERN.fullmatch(value) for value in values)
+
+
+def _to_datetime(series):
+    parsed = pd.to_datetime(series, errors='coerce', utc=True, format='mixed')
+    return parsed.dt.tz_localize(None)
+
+
+def prepare(df, time_column=None, freq=None, agg='mean'):
+    """
+    Numeric values and x positions for trend fitting.
+
+    Returns a dict with 'columns', 'values' (rows x columns), 'x', the
+    'time_column' used (or None), 'times' (datetime64 per row, or None)
+    and 'x_unit'. Without a time column x is the position among each
+    column's non-missing values, as in the per-column fit it replaces,
+    so 'x' is then a rows x columns matrix.
+    """
+    time_column, times = detect_time_column(df, time_column)
+    numeric_df = df.select_dtypes(include=[np.number])
+
+    if time_column is None:
+        if freq:
+            raise ValueError("Resampling needs a datetime column")
+        values = numeric_df.to_numpy(dtype=float)
+        valid = np.isfinite(values)
+        return {
+            'columns': list(numeric_df.columns),
+            'values': values,
+            'x': np.cumsum(valid, axis=0) - 1.0,
+            'time_column': None,
+            'times': None,
+            'x_unit': 'row',
+        }
+
+    if agg not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation '{agg}'; use one of {', '.join(AGGREGATIONS)}")
+
+    numeric_df = numeric_df.drop(columns=[time_column], errors='ignore')
+    frame = numeric_df.set_axis(pd.DatetimeIndex(times), axis=0)
+    frame = frame[frame.index.notna()]
+    if freq:
+        frame = frame.resample(freq).agg(agg)
+    elif not frame.index.is_unique:
+        # Repeated timestamps collapse to one observation each
+        frame = frame.groupby(level=0).agg(agg)
+    else:
+        frame = frame.sort_index()
+
+    index = frame.index.to_numpy(dtype='datetime64[ns]')
+    elapsed = (index - index[0]).astype('int64') if len(index) else np.empty(0)
+    return {
+        'columns': list(frame.columns),
+        'values': frame.to_numpy(dtype=float),
+        'x': elapsed / NANOSECONDS_PER_DAY,
+        'time_column': time_column,
+        'times': index,
+        'x_unit': 'day',
+    }
+
+
+def fit(values, x):
+    """
+    Least-squares line for every column of values against x.
+
+    x is a vector shared by all columns or a matrix the shape of values.
+    Missing values are skipped per column. Returns a dict of arrays:
+    n, slope, intercept, r_squared and mean, NaN where a column has
+    fewer than two points or no spread in x.
+    """
+    values = np.asarray(values, dtype=float)
+    x = np.asarray(x, dtype=float)
+    if x.ndim == 1:
+        x = x[:, None]
+    valid = np.isfinite(values) & np.isfinite(x)
+
+    n = valid.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = np.where(valid, x, 0.0).sum(axis=0) / n
+        mean_y = np.where(valid, values, 0.0).sum(axis=0) / n
+        dx = np.where(valid, x - mean_x, 0.0)
+        dy = np.where(valid, values - mean_y, 0.0)
+        sxx = (dx ** 2).sum(axis=0)
+        sxy = (dx * dy).sum(axis=0)
+        syy = (dy ** 2).sum(axis=0)
+
+        slope = np.where((n > 1) & (sxx > 0), sxy / sxx, np.nan)
+        r_squared = np.where(syy > 0, sxy ** 2 / (sxx * syy), np.where(np.isfinite(slope), 1.0, np.nan))
+
+    return {
+        'n': n,
+        'slope': slope,
+        'intercept': mean_y - slope * mean_x,
+        'r_squared': r_squared,
+        'mean': mean_y,
+    }
+
+
+def rolling_slopes(values, x, window):
+    """
+    Slope of the least-squares line over each trailing window of rows.
+
+    Returns a rows x columns array; rows before the first full window,
+    and windows with fewer than two points, are NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    x = np.asarray(x, dtype=float)
+    if x.ndim == 1:
+        x = np.broadcast_to(x[:, None], values.shape)
+    window = int(window)
+    if window < 2:
+        raise ValueError("Rolling window must be at least 2")
+
+    valid = np.isfinite(values) & np.isfinite(x)
+    # Centering keeps the running sums well conditioned
+    x = np.where(valid, x - np.nanmean(np.where(valid, x, np.nan), axis=0), 0.0)
+    y = np.where(valid, values - np.nanmean(np.where(valid, values, np.nan), axis=0), 0.0)
+    x = np.nan_to_num(x)
+    y = np.nan_to_num(y)
+
+    def window_sums(a):
+        total = np.cumsum(a, axis=0)
+        out = np.full_like(total, np.nan, dtype=float)
+        if len(a) >= window:
+            out[window - 1:] = total[window - 1:]
+            out[window:] -= total[:-window]
+        return out
+
+    n = window_sums(valid.astype(float))
+    sx = window_sums(x)
+    sy = window_sums(y)
+    sxx = window_sums(x * x)
+    sxy = window_sums(x * y)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cxx = sxx - sx ** 2 / n
+        slope = (sxy - sx * sy / n) / cxx
+    # Cancellation leaves tiny non-zero spreads for windows with constant x
+    spread = np.maximum(sxx, 1.0) * 1e-12
+    return np.where((n > 1) & (cxx > spread), slope, np.nan)
+
+
+def direction(slope):
+    return 'increasing' if slope > 0 else 'decreasing' if slope < 0 else 'stable'
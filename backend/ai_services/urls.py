@@ -11,6 +11,7 @@ urlpatterns = [
 
     # API endpoint for models
     path('v1/models/', views.models_api, name='models_api'),
+    path('api/models/cache-stats/', views.model_cache_stats_api, name='model_cache_stats_api'),
 
     # Demo pages
     path('sentiment-demo/', views.sentiment_demo, name='sentiment_demo'),
@@ -19,9 +20,18 @@ urlpatterns = [
 
     # API endpoints
     path('api/sentiment/', views.sentiment_analysis_api, name='sentiment_api'),
+    path('api/sentiment/batch/', views.sentiment_batch_api, name='sentiment_batch_api'),
+    path('api/sentiment/cache-stats/', views.sentiment_cache_stats_api, name='sentiment_cache_stats_api'),
     path('api/text-generation/', views.text_generation_api, name='text_generation_api'),
+    path('api/text-generation/stream/', views.text_generation_stream_api, name='text_generation_stream_api'),
+    path('api/text-generation/cache-stats/', views.text_generation_cache_stats_api, name='text_generation_cache_stats_api'),
     path('api/data-analysis/', views.data_analysis_api, name='data_analysis_api'),
+    path('api/data-analysis/<int:pk>/matrix/', views.analysis_matrix_api, name='analysis_matrix_api'),
+    path('api/datasets/', views.dataset_upload_api, name='dataset_upload_api'),
+    path('api/datasets/<uuid:token>/', views.dataset_detail_api, name='dataset_detail_api'),
     path('api/services/', views.ai_services_list_api, name='services_list_api'),
+    path('api/requests/<uuid:token>/', views.AIRequestStatusView.as_view(), name='request_status_api'),
+    path('api/requests/<uuid:token>/cancel/', views.AIRequestCancelView.as_view(), name='request_cancel_api'),
     path('api/usage-stats/', views.ai_usage_stats_api, name='usage_stats_api'),
     path('api/sentiment/history/', views.sentiment_history_api, name='sentiment_history_api'),
     path('api/text-generation/history/', views.text_generation_history_api, name='text_generation_history_api'),
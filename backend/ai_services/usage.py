@@ -0,0 +1,129 @@
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+from .models import AIUsage
+
+
+logger = logging.getLogger(__name__)
+
+AI_USAGE_CONFIG = getattr(settings, 'AI_USAGE_CONFIG', {})
+
+COUNTER_FIELDS = ('requests_count', 'successful_requests', 'failed_requests', 'total_processing_time')
+
+
+class UsageAggregator:
+    """
+    Buffer AIUsage increments in memory and write them in batches.
+
+    Deltas are summed per (service, user, date) and flushed as atomic
+    F() updates every flush_interval seconds, once max_pending records
+    are buffered, and at interpreter exit. A flush_interval of 0 writes
+    through on every record.
+
+    The background thread is not relied on for the bound: a record made
+    flush_interval seconds or more after the last flush writes the
+    buffer itself. A process killed without running its exit handlers
+    therefore loses at most max_pending records, buffered within the
+    last flush_interval seconds or since its last record.
+    """
+
+    def __init__(self, flush_interval=5.0, max_pending=100):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._deltas = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def record(self, service_id, user_id, date, successful=0, failed=0, processing_time=0.0):
+        """Buffer usage counts for one or more requests."""
+        with self._lock:
+            delta = self._deltas[(service_id, user_id, date)]
+            delta['requests_count'] += successful + failed
+            delta['successful_requests'] += successful
+            delta['failed_requests'] += failed
+            delta['total_processing_time'] += processing_time
+            self._pending += 1
+            flush_now = (
+                not self.flush_interval
+                or self._pending >= self.max_pending
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+
+        if flush_now:
+            self.flush()
+        else:
+            self._ensure_thread()
+
+    def flush(self):
+        """Write all buffered deltas to the database."""
+        with self._flush_lock:
+            with self._lock:
+                deltas, self._deltas = self._deltas, defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+                self._pending = 0
+                self._last_flush = time.monotonic()
+
+            failed = {}
+            for key, delta in deltas.items():
+                try:
+                    self._apply(key, delta)
+                except Exception:
+                    logger.exception("Failed to flush AI usage for %s", key)
+                    failed[key] = delta
+
+            if failed:
+                # Keep the counts so the next flush retries them
+                with self._lock:
+                    for key, delta in failed.items():
+                        for field, value in delta.items():
+                            self._deltas[key][field] += value
+                    self._pending += len(failed)
+            return len(deltas) - len(failed)
+
+    def _apply(self, key, delta):
+        service_id, user_id, date = key
+        rows = AIUsage.objects.filter(service_id=service_id, user_id=user_id, date=date)
+        increments = {field: F(field) + value for field, value in delta.items()}
+
+        if rows.update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                AIUsage.objects.create(service_id=service_id, user_id=user_id, date=date, **delta)
+        except IntegrityError:
+            # Another process created the row first; the constraints on
+            # AIUsage guarantee one row, with or without a user
+            rows.update(**increments)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='ai-usage-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            finally:
+                connection.close()
+
+
+usage_aggregator = UsageAggregator(
+    flush_interval=AI_USAGE_CONFIG.get('flush_interval', 5.0),
+    max_pending=AI_USAGE_CONFIG.get('max_pending', 100),
+)
+atexit.register(usage_aggregator.flush)
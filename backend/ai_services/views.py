@@ -2,7 +2,12 @@ from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, DetailView
-from django.http import JsonResponse
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.views.decorators.http import require_GET, require_POST
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from rest_framework.decorators import api_view, permission_classes
@@ -11,9 +16,16 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.views import APIView
 import json
+import os
+import uuid
 
-from .models import AIService, AIRequest, SentimentAnalysis, TextGeneration, DataAnalysis
+from .models import AIService, AIRequest, SentimentAnalysis, TextGeneration, DataAnalysis, Dataset
 from .services import SentimentAnalysisService, TextGenerationService, DataAnalysisService, AIServiceManager
+from . import jobs
+from . import datasets
+from . import registry
+from . import artifacts
+from .streaming import STREAMING_ANALYSIS_TYPES
 
 
 class AIServicesView(LoginRequiredMixin, ListView):
@@ -62,6 +74,50 @@ def sentiment_analysis_api(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def sentiment_batch_api(request):
+    """API endpoint for batch sentiment analysis."""
+    try:
+        texts = request.data.get('texts')
+        
+        if not isinstance(texts, list) or not texts:
+            return Response({
+                'error': 'A non-empty list of texts is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(texts) > SentimentAnalysisService.max_batch_size:
+            return Response({
+                'error': f'At most {SentimentAnalysisService.max_batch_size} texts per batch'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        cleaned = [str(text).strip() if text is not None else '' for text in texts]
+        empty = [index for index, text in enumerate(cleaned) if not text]
+        if empty:
+            return Response({
+                'error': 'Text is required',
+                'invalid_indices': empty
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        service = SentimentAnalysisService()
+        user = request.user if request.user.is_authenticated else None
+        result = service.analyze_batch(cleaned, user)
+        
+        return Response(result, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def sentiment_cache_stats_api(request):
+    """API endpoint for sentiment result cache statistics."""
+    return Response(SentimentAnalysisService.cache_stats(), status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def text_generation_api(request):
@@ -71,18 +127,28 @@ def text_generation_api(request):
         prompt = data.get('prompt', '').strip()
         max_tokens = data.get('max_tokens', 100)
         temperature = data.get('temperature', 0.7)
+        use_cache = data.get('use_cache')
         
         if not prompt:
             return Response({
                 'error': 'Prompt is required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        if data.get('async'):
+            return _enqueue(
+                request,
+                'text_generation',
+                prompt,
+                {'max_tokens': max_tokens, 'temperature': temperature, 'use_cache': use_cache}
+            )
+        
         service = TextGenerationService()
         result = service.generate_text(
             prompt=prompt,
             user=request.user,
             max_tokens=max_tokens,
-            temperature=temperature
+            temperature=temperature,
+            use_cache=use_cache
         )
         
         return Response(result, status=status.HTTP_200_OK)
@@ -93,6 +159,50 @@ def text_generation_api(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def text_generation_cache_stats_api(request):
+    """API endpoint for prompt cache statistics."""
+    return Response(TextGenerationService.cache_stats(), status=status.HTTP_200_OK)
+
+
+def _sse_events(events):
+    """Format (event, data) pairs as server-sent events."""
+    for event, data in events:
+        yield f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+@csrf_exempt
+@require_POST
+def text_generation_stream_api(request):
+    """API endpoint streaming generated text as server-sent events."""
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON body'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    prompt = str(data.get('prompt', '')).strip()
+    if not prompt:
+        return JsonResponse({'error': 'Prompt is required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        service = TextGenerationService()
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    events = service.stream_text(
+        prompt=prompt,
+        user=request.user if request.user.is_authenticated else None,
+        max_tokens=data.get('max_tokens', 100),
+        temperature=data.get('temperature', 0.7),
+        use_cache=data.get('use_cache')
+    )
+    response = StreamingHttpResponse(_sse_events(events), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # disable proxy buffering (nginx)
+    return response
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def data_analysis_api(request):
@@ -101,27 +211,300 @@ def data_analysis_api(request):
         data = request.data
         input_data = data.get('data')
         analysis_type = data.get('analysis_type', 'descriptive')
+        parameters = data.get('parameters') or {}
+        # Identical analyses of identical data are served from stored results
+        use_cache = data.get('use_cache', True) not in (False, 'false', '0')
+        upload = request.FILES.get('file')
+        
+        if parameters.get('spill') and not request.user.is_authenticated:
+            # Spilled matrices are files on the server, kept for their owner to download
+            return Response({
+                'error': 'Sign in to spill the correlation matrix to a file'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        if upload is not None:
+            too_large = _reject_large_upload(upload)
+            if too_large is not None:
+                return too_large
+            
+            # Large CSV/NDJSON files are read in chunks rather than parsed as JSON
+            if analysis_type not in STREAMING_ANALYSIS_TYPES:
+                return Response({
+                    'error': f"Uploads support these analysis types: {', '.join(STREAMING_ANALYSIS_TYPES)}"
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            service = DataAnalysisService()
+            result = service.analyze_file(
+                upload,
+                analysis_type=analysis_type,
+                user=request.user if request.user.is_authenticated else None,
+                file_format=data.get('format'),
+                parameters=parameters
+            )
+            return Response(result, status=status.HTTP_200_OK)
+        
+        dataset_id = data.get('dataset_id')
+        if dataset_id is not None:
+            # Stored datasets are referenced by their token instead of re-uploaded
+            dataset = _find_dataset(request, dataset_id)
+            if dataset is None:
+                return Response({
+                    'error': 'Dataset not found'
+                }, status=status.HTTP_404_NOT_FOUND)
+            
+            if data.get('async'):
+                return _enqueue(
+                    request,
+                    'data_analysis',
+                    json.dumps({'dataset_id': dataset.pk, 'content_hash': dataset.content_hash}),
+                    {
+                        'analysis_type': analysis_type,
+                        'parameters': parameters,
+                        'use_cache': use_cache,
+                        'dataset_id': dataset.pk
+                    }
+                )
+            
+            service = DataAnalysisService()
+            result = service.analyze_dataset(
+                dataset,
+                analysis_type=analysis_type,
+                user=request.user if request.user.is_authenticated else None,
+                parameters=parameters,
+                use_cache=use_cache
+            )
+            return Response(_with_matrix_url(result), status=status.HTTP_200_OK)
         
         if not input_data:
             return Response({
                 'error': 'Data is required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        if data.get('async'):
+            return _enqueue(
+                request,
+                'data_analysis',
+                json.dumps(input_data),
+                {'analysis_type': analysis_type, 'parameters': parameters, 'use_cache': use_cache}
+            )
+        
         service = DataAnalysisService()
         result = service.analyze_data(
             data=input_data,
             analysis_type=analysis_type,
-            user=request.user
+            user=request.user if request.user.is_authenticated else None,
+            parameters=parameters,
+            use_cache=use_cache
         )
         
-        return Response(result, status=status.HTTP_200_OK)
+        return Response(_with_matrix_url(result), status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _with_matrix_url(result):
+    """Add the download URL of a spilled correlation matrix to an analysis result."""
+    if isinstance(result, dict) and (result.get('results') or {}).get('matrix_file'):
+        result['matrix_url'] = reverse('ai_services:analysis_matrix_api', args=[result['analysis_id']])
+    return result
+
+
+@require_GET
+def analysis_matrix_api(request, pk):
+    """Download the spilled correlation matrix of one of the user's analyses as a .npy file."""
+    analysis = None
+    if request.user.is_authenticated:
+        analysis = DataAnalysis.objects.filter(
+            pk=pk, user=request.user, matrix_expires_at__gt=timezone.now()
+        ).exclude(matrix_file='').first()
+    path = artifacts.matrix_path(analysis.matrix_file) if analysis is not None else None
+    if path is None or not os.path.exists(path):
+        return JsonResponse({
+            'error': 'Matrix file not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return FileResponse(
+        open(path, 'rb'), as_attachment=True, filename=analysis.matrix_file, content_type='application/octet-stream'
+    )
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def dataset_upload_api(request):
+    """API endpoint to store a dataset (JSON data or a CSV/NDJSON file) for repeated analysis."""
+    try:
+        data = request.data
+        upload = request.FILES.get('file')
+        
+        if upload is None and not data.get('data'):
+            return Response({
+                'error': 'Data or a file is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
+        if upload is not None:
+            too_large = _reject_large_upload(upload)
+            if too_large is not None:
+                return too_large
+        
+        dataset, created = datasets.store(
+            data=data.get('data'),
+            fileobj=upload,
+            name=data.get('name', ''),
+            user=request.user if request.user.is_authenticated else None,
+            file_format=data.get('format')
+        )
+        return Response(
+            _serialize_dataset(dataset),
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+        
+    except datasets.DatasetTooLarge as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def dataset_detail_api(request, token):
+    """API endpoint describing a stored dataset and its analyses."""
+    dataset = _find_dataset(request, token)
+    if dataset is None:
+        return Response({
+            'error': 'Dataset not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    result = _serialize_dataset(dataset)
+    result['analyses'] = [{
+        'analysis_id': analysis.id,
+        'analysis_type': analysis.analysis_type,
+        'created_at': analysis.created_at,
+    } for analysis in dataset.analyses.order_by('-created_at')[:20]]
+    return Response(result, status=status.HTTP_200_OK)
+
+
+def _find_dataset(request, token):
+    """The dataset with this token, if the request may use it."""
+    try:
+        token = uuid.UUID(str(token))
+    except ValueError:
+        return None
+    # Anonymous uploads are usable by whoever holds the token; others only by their owner
+    datasets_for = Dataset.objects.filter(user__isnull=True)
+    if request.user.is_authenticated:
+        datasets_for = Dataset.objects.filter(Q(user__isnull=True) | Q(user=request.user))
+    return datasets_for.filter(token=token).first()
+
+
+def _reject_large_upload(upload):
+    """A 413 response for an upload over the size limit, checked before any of it is read."""
+    max_bytes = datasets.max_upload_bytes()
+    if upload.size is not None and upload.size > max_bytes:
+        return Response({
+            'error': f'Uploads are limited to {max_bytes / 2 ** 20:.0f} MB'
+        }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    return None
+
+
+def _serialize_dataset(dataset):
+    return {
+        'dataset_id': dataset.token,
+        'content_hash': dataset.content_hash,
+        'name': dataset.name,
+        'format': dataset.source_format,
+        'rows': dataset.row_count,
+        'columns': dataset.columns,
+        'size_bytes': dataset.size_bytes,
+        'created_at': dataset.created_at,
+        'last_used_at': dataset.last_used_at,
+    }
+
+
+def _enqueue(request, job_type, input_data, params):
+    """Queue a request for the AI worker and answer with its polling details."""
+    try:
+        timeout = jobs.clean_timeout(request.data.get('timeout'))
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    job = jobs.enqueue(
+        job_type,
+        input_data,
+        user=request.user if request.user.is_authenticated else None,
+        params=params,
+        timeout=timeout
+    )
+    return Response(_serialize_job(job), status=status.HTTP_202_ACCEPTED)
+
+
+def _serialize_job(job):
+    """Serialize a queued AIRequest for the polling API."""
+    result = None
+    if job.status == 'completed' and job.output_data:
+        result = _with_matrix_url(json.loads(job.output_data))
+    
+    return {
+        'request_id': job.token,
+        'job_type': job.job_type,
+        'status': job.status,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'completed_at': job.completed_at,
+        'processing_time': job.processing_time,
+        'timeout': job.timeout,
+        'status_url': reverse('ai_services:request_status_api', args=[job.token]),
+        'cancel_url': reverse('ai_services:request_cancel_api', args=[job.token]),
+        'result': result,
+        'error': job.error_message or None,
+    }
+
+
+class AIRequestStatusView(DetailView):
+    """JSON polling endpoint for queued AI requests, looked up by the token returned at submit time."""
+    model = AIRequest
+    http_method_names = ['get']
+    slug_field = 'token'
+    slug_url_kwarg = 'token'
+    
+    def get_queryset(self):
+        # Only queued jobs; anonymous ones are reachable by whoever holds the
+        # token, others only by their owner
+        queryset = AIRequest.objects.select_related('service').exclude(job_type='')
+        if self.request.user.is_authenticated:
+            return queryset.filter(Q(user__isnull=True) | Q(user=self.request.user))
+        return queryset.filter(user__isnull=True)
+    
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(_serialize_job(self.get_object()))
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AIRequestCancelView(AIRequestStatusView):
+    """Cancel a pending or running AI request."""
+    http_method_names = ['post']
+    
+    def post(self, request, *args, **kwargs):
+        job = self.get_object()
+        if not jobs.cancel(job):
+            return JsonResponse({
+                'error': f'Request already {job.status}'
+            }, status=status.HTTP_409_CONFLICT)
+        return JsonResponse(_serialize_job(job))
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def ai_services_list_api(request):
@@ -250,6 +633,13 @@ def models_api(request):
     return Response(data, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def model_cache_stats_api(request):
+    """API endpoint for loaded model cache statistics."""
+    return Response(registry.cache_stats(), status=status.HTTP_200_OK)
+
+
 # Demo views for frontend
 def sentiment_demo(request):
     """Demo page for sentiment analysis."""
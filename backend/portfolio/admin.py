@@ -1,6 +1,8 @@
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Profile, Skill, Project, Experience, Education, Contact, BlogPost, ResearchProject
+from . import page_cache
+from .models import Profile, Skill, Project, Experience, Education, Contact, BlogPost, ResearchProject, GitHubRepo, GitHubSyncState, FeedPost, FeedState
 
 
 @admin.register(Profile)
@@ -77,11 +79,43 @@ class BlogPostAdmin(admin.ModelAdmin):
     actions = ['publish_posts', 'unpublish_posts']
     
     def publish_posts(self, request, queryset):
+        # The blog feed is ordered by published_at
+        queryset.filter(published_at__isnull=True).update(published_at=timezone.now())
         queryset.update(published=True)
+        page_cache.touch(BlogPost)
     publish_posts.short_description = "Publish selected blog posts"
     
     def unpublish_posts(self, request, queryset):
         queryset.update(published=False)
+        page_cache.touch(BlogPost)
     unpublish_posts.short_description = "Unpublish selected blog posts" 
 
-admin.site.register(ResearchProject) 
\ No newline at end of file
+admin.site.register(ResearchProject)
+
+
+@admin.register(GitHubRepo)
+class GitHubRepoAdmin(admin.ModelAdmin):
+    list_display = ['name', 'owner', 'language', 'stars', 'fork', 'archived', 'updated_at', 'synced_at']
+    list_filter = ['owner', 'language', 'fork', 'archived']
+    search_fields = ['name', 'description']
+    readonly_fields = ['synced_at']
+
+
+@admin.register(GitHubSyncState)
+class GitHubSyncStateAdmin(admin.ModelAdmin):
+    list_display = ['username', 'last_status', 'last_checked_at', 'last_changed_at', 'rate_limit_remaining', 'rate_limit_reset']
+    readonly_fields = ['last_checked_at', 'last_changed_at', 'refresh_started_at']
+
+
+@admin.register(FeedPost)
+class FeedPostAdmin(admin.ModelAdmin):
+    list_display = ['title', 'author', 'feed_url', 'published_at', 'fetched_at']
+    list_filter = ['feed_url', 'published_at']
+    search_fields = ['title', 'summary']
+    readonly_fields = ['fetched_at']
+
+
+@admin.register(FeedState)
+class FeedStateAdmin(admin.ModelAdmin):
+    list_display = ['url', 'last_status', 'last_checked_at', 'last_changed_at']
+    readonly_fields = ['last_checked_at', 'last_changed_at', 'refresh_started_at']
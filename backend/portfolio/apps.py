@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class PortfolioConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'portfolio'
+
+    def ready(self):
+        # Connected in every process, so edits made from the shell or a
+        # management command invalidate cached pages too
+        from . import page_cache
+        page_cache.connect_signals()
@@ -0,0 +1,146 @@
+"""
+Stored copy of the Medium feed shown on the blog page.
+
+The blog page reads FeedPost rows and never fetches the feed itself.
+posts() serves whatever is stored and, once the copy is older than
+MEDIUM_FEED['ttl'], starts one background poll through
+refresh.StaleWhileRevalidate, leased on the FeedState row.
+
+poll() sends the feed's stored ETag and Last-Modified back as
+If-None-Match and If-Modified-Since, so an unchanged feed costs a 304
+and no parsing. A changed feed is parsed with feedparser and only plain
+text is kept: tags are stripped from titles and summaries, entities are
+decoded, and entries without an http(s) link are dropped, so templates
+never render markup from the feed. Posts are upserted by entry id;
+posts that have dropped off the feed are kept up to max_posts per feed.
+"""
+import html
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+import feedparser
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+from . import page_cache, refresh
+from .models import FeedPost, FeedState
+
+logger = logging.getLogger(__name__)
+
+
+MEDIUM_FEED = getattr(settings, 'MEDIUM_FEED', {})
+
+POST_FIELDS = ['feed_url', 'title', 'link', 'summary', 'author', 'published_at', 'updated_at', 'fetched_at']
+
+
+def default_url():
+    return MEDIUM_FEED.get('url', 'https://medium.com/feed/@aviyank')
+
+
+def _text(value, length=None):
+    """Plain text of a feed field: tags stripped, entities decoded, whitespace collapsed."""
+    text = ' '.join(html.unescape(strip_tags(value or '')).split())
+    return Truncator(text).chars(length) if length else text
+
+
+def _time(parsed):
+    # feedparser normalizes dates to UTC struct_time
+    return datetime(*parsed[:6], tzinfo=dt_timezone.utc) if parsed else None
+
+
+def _post(feed_url, entry, now):
+    link = entry.get('link') or ''
+    if not link.startswith(('http://', 'https://')):
+        return None
+    summary = entry.get('summary') or ''
+    if not summary and entry.get('content'):
+        summary = entry.content[0].get('value', '')
+    updated_at = _time(entry.get('updated_parsed'))
+    return FeedPost(
+        feed_url=feed_url,
+        guid=(entry.get('id') or link)[:500],
+        title=_text(entry.get('title'), 300) or link,
+        link=link[:500],
+        summary=_text(summary, MEDIUM_FEED.get('summary_length', 300)),
+        author=_text(entry.get('author'), 200) or 'Medium',
+        published_at=_time(entry.get('published_parsed')) or updated_at or now,
+        updated_at=updated_at,
+    )
+
+
+def poll(url=None, force=False, session=None):
+    """
+    Fetch the feed at url and store its posts.
+
+    Returns the FeedState, whose last_status is 'updated', 'not_modified'
+    or 'failed'. force skips the conditional headers.
+    """
+    url = url or default_url()
+    session = session or requests
+    state, _ = FeedState.objects.get_or_create(url=url)
+    now = timezone.now()
+
+    headers = {'User-Agent': 'portfolio-feed-poller'}
+    if not force:
+        if state.etag:
+            headers['If-None-Match'] = state.etag
+        if state.last_modified:
+            headers['If-Modified-Since'] = state.last_modified
+    status = 'not_modified'
+    error = ''
+    try:
+        response = session.get(url, headers=headers, timeout=MEDIUM_FEED.get('timeout', 10))
+        if response.status_code != 304:
+            response.raise_for_status()
+            feed = feedparser.parse(response.content)
+            if feed.bozo and not feed.entries:
+                raise ValueError(f"Unreadable feed: {feed.get('bozo_exception')}")
+            # Keyed by guid: one upsert may not touch the same row twice
+            posts = {post.guid: post for post in (_post(url, entry, now) for entry in feed.entries) if post is not None}
+            with transaction.atomic():
+                FeedPost.objects.bulk_create(
+                    list(posts.values()), update_conflicts=True, unique_fields=['guid'], update_fields=POST_FIELDS
+                )
+                keep = FeedPost.objects.filter(feed_url=url).values_list('pk', flat=True)[:MEDIUM_FEED.get('max_posts', 50)]
+                FeedPost.objects.filter(feed_url=url).exclude(pk__in=list(keep)).delete()
+            state.etag = response.headers.get('ETag', '')[:200]
+            state.last_modified = response.headers.get('Last-Modified', '')[:100]
+            state.last_changed_at = now
+            status = 'updated'
+            # Stored with bulk_create, which sends no signals
+            page_cache.touch(FeedPost)
+    except (requests.RequestException, ValueError) as e:
+        logger.warning("Polling feed %s failed: %s", url, e)
+        status = 'failed'
+        error = str(e)
+
+    state.last_status = status
+    state.last_error = error
+    state.last_checked_at = now
+    # refresh_started_at belongs to the caller holding the lease
+    state.save(update_fields=['etag', 'last_modified', 'last_checked_at', 'last_changed_at', 'last_status', 'last_error'])
+    return state
+
+
+_refresher = refresh.StaleWhileRevalidate(FeedState, 'url', poll, MEDIUM_FEED, 1800, 'feed-poll')
+
+
+def is_stale(state, now=None):
+    return _refresher.is_stale(state, now)
+
+
+def refresh_if_stale(url=None):
+    """Start a background poll when the stored copy is stale and nobody is polling it; returns the thread."""
+    return _refresher.refresh_if_stale(url or default_url())
+
+
+def posts(url=None, limit=None):
+    """Stored posts of the feed at url, newest first; never fetches the feed."""
+    url = url or default_url()
+    _refresher.revalidate(url)
+    queryset = FeedPost.objects.filter(feed_url=url)
+    return queryset[:limit] if limit else queryset
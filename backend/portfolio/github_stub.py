@@ -0,0 +1,157 @@
+"""
+Offline stand-in for the GitHub REST API's repository listing.
+
+GitHubStub serves GET /users/<owner>/repos on a local port the way
+api.github.com does for what github_sync relies on: per_page/page
+pagination with Link headers, an ETag per page with 304 responses to a
+matching If-None-Match (which, as on GitHub, do not use up the rate
+limit), X-RateLimit headers and a 403 once the budget is spent. Point
+GITHUB_SYNC['api_url'] (GITHUB_API_URL) at stub.url to run the sync
+without network access; the stub records every request it answers.
+"""
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+
+def make_repos(count, owner='Aviyank', start=1):
+    """count deterministic repository payloads in GitHub's format."""
+    created = datetime(2022, 1, 1, tzinfo=timezone.utc)
+    repos = []
+    for i in range(start, start + count):
+        updated = created + timedelta(days=7 * i)
+        repos.append({
+            'id': 1000 + i,
+            'name': f"project-{i:03d}",
+            'full_name': f"{owner}/project-{i:03d}",
+            'owner': {'login': owner},
+            'description': f"Demo project {i}",
+            'html_url': f"https://github.com/{owner}/project-{i:03d}",
+            'language': ['Python', 'JavaScript', 'Jupyter Notebook', None][i % 4],
+            'stargazers_count': i % 17,
+            'forks_count': i % 5,
+            'fork': i % 9 == 0,
+            'archived': False,
+            'created_at': (created + timedelta(days=i)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'updated_at': updated.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'pushed_at': updated.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        })
+    return repos
+
+
+class GitHubStub:
+    """A local GitHub API server, run in a background thread."""
+
+    def __init__(self, repos=None, owner='Aviyank', rate_limit=60, host='127.0.0.1', port=0):
+        self.owner = owner
+        self.repos = list(repos if repos is not None else make_repos(5, owner))
+        self.rate_limit = rate_limit
+        self.remaining = rate_limit
+        self.reset_at = int(time.time()) + 3600
+        # (path, status) of every request answered
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='github-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _page(self, query):
+        try:
+            per_page = min(max(int(query.get('per_page', ['30'])[0]), 1), 100)
+            page = max(int(query.get('page', ['1'])[0]), 1)
+        except ValueError:
+            per_page, page = 30, 1
+        repos = sorted(self.repos, key=lambda repo: repo['full_name'].lower())
+        last = max((len(repos) + per_page - 1) // per_page, 1)
+        return repos[(page - 1) * per_page:page * per_page], page, last, per_page
+
+    def _respond(self, handler):
+        parsed = urlparse(handler.path)
+        parts = parsed.path.strip('/').split('/')
+        if len(parts) != 3 or parts[0] != 'users' or parts[2] != 'repos' or parts[1].lower() != self.owner.lower():
+            return 404, {}, {'message': 'Not Found'}
+
+        with self._lock:
+            query = parse_qs(parsed.query)
+            repos, page, last, per_page = self._page(query)
+            body = json.dumps(repos).encode()
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            headers = {
+                'X-RateLimit-Limit': str(self.rate_limit),
+                'X-RateLimit-Reset': str(self.reset_at),
+            }
+            if handler.headers.get('If-None-Match') == etag:
+                headers['X-RateLimit-Remaining'] = str(self.remaining)
+                headers['ETag'] = etag
+                return 304, headers, None
+            if self.remaining <= 0:
+                headers['X-RateLimit-Remaining'] = '0'
+                return 403, headers, {'message': 'API rate limit exceeded'}
+            self.remaining -= 1
+            headers['X-RateLimit-Remaining'] = str(self.remaining)
+            headers['ETag'] = etag
+
+        links = []
+        base = f"{self.url}{parsed.path}"
+        if page < last:
+            links.append(f'<{base}?{urlencode({"per_page": per_page, "page": page + 1})}>; rel="next"')
+            links.append(f'<{base}?{urlencode({"per_page": per_page, "page": last})}>; rel="last"')
+        if page > 1:
+            links.append(f'<{base}?{urlencode({"per_page": per_page, "page": 1})}>; rel="first"')
+        if links:
+            headers['Link'] = ', '.join(links)
+        return 200, headers, body
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, headers, body = stub._respond(self)
+                if isinstance(body, dict):
+                    body = json.dumps(body).encode()
+                with stub._lock:
+                    stub.requests.append((self.path, status))
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if body is not None:
+                    self.send_header('Content-Type', 'application/json; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if body is not None:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,226 @@
+"""
+Local copy of a GitHub account's public repositories.
+
+The projects page reads repositories from the GitHubRepo table and never
+waits on GitHub. repos() serves whatever is stored and, once the copy is
+older than GITHUB_SYNC['ttl'], starts one background refresh through
+refresh.StaleWhileRevalidate, leased on the GitHubSyncState row.
+
+sync() walks every page of the repository list through its Link headers
+and sends each page's stored ETag as If-None-Match, so an unchanged page
+costs a 304, which GitHub does not count against the rate limit. The
+X-RateLimit headers of every response are recorded, and a refresh is
+skipped (or stops between pages) once the remaining budget is down to
+rate_limit_reserve requests before the reset time. Repositories missing
+from a complete walk are deleted; a partial walk only updates.
+"""
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import page_cache, refresh
+from .models import GitHubRepo, GitHubSyncState
+
+logger = logging.getLogger(__name__)
+
+
+GITHUB_SYNC = getattr(settings, 'GITHUB_SYNC', {})
+
+REPO_FIELDS = [
+    'owner', 'name', 'description', 'html_url', 'language', 'stars', 'forks', 'fork', 'archived',
+    'created_at', 'updated_at', 'pushed_at', 'synced_at',
+]
+
+
+def default_username():
+    return GITHUB_SYNC.get('username', 'Aviyank')
+
+
+def repos_url(username):
+    api_url = GITHUB_SYNC.get('api_url', 'https://api.github.com').rstrip('/')
+    return f"{api_url}/users/{username}/repos?per_page={GITHUB_SYNC.get('per_page', 100)}"
+
+
+def _headers(etag=None):
+    headers = {'Accept': 'application/vnd.github+json'}
+    if GITHUB_SYNC.get('token'):
+        headers['Authorization'] = f"Bearer {GITHUB_SYNC['token']}"
+    if etag:
+        headers['If-None-Match'] = etag
+    return headers
+
+
+def _record_rate_limit(state, response):
+    headers = response.headers
+    if 'X-RateLimit-Remaining' not in headers:
+        return
+    try:
+        state.rate_limit = int(headers.get('X-RateLimit-Limit', state.rate_limit or 0))
+        state.rate_limit_remaining = int(headers['X-RateLimit-Remaining'])
+        if 'X-RateLimit-Reset' in headers:
+            state.rate_limit_reset = datetime.fromtimestamp(int(headers['X-RateLimit-Reset']), tz=dt_timezone.utc)
+    except ValueError:
+        pass
+
+
+def _out_of_budget(state, now):
+    """True while the recorded budget is down to the reserve and has not been reset yet."""
+    reserve = GITHUB_SYNC.get('rate_limit_reserve', 5)
+    return (
+        state.rate_limit_remaining is not None
+        and state.rate_limit_remaining <= reserve
+        and state.rate_limit_reset is not None
+        and state.rate_limit_reset > now
+    )
+
+
+def _timestamp(value):
+    return parse_datetime(value) if value else None
+
+
+def _store(username, payload):
+    """Upsert one page of repositories; returns their GitHub ids."""
+    repos = [
+        GitHubRepo(
+            github_id=repo['id'],
+            owner=username,
+            name=repo['name'],
+            description=repo.get('description') or '',
+            html_url=repo['html_url'],
+            language=repo.get('language') or '',
+            stars=repo.get('stargazers_count') or 0,
+            forks=repo.get('forks_count') or 0,
+            fork=bool(repo.get('fork')),
+            archived=bool(repo.get('archived')),
+            created_at=_timestamp(repo.get('created_at')),
+            updated_at=_timestamp(repo.get('updated_at')),
+            pushed_at=_timestamp(repo.get('pushed_at')),
+        )
+        for repo in payload
+    ]
+    GitHubRepo.objects.bulk_create(
+        repos, update_conflicts=True, unique_fields=['github_id'], update_fields=REPO_FIELDS
+    )
+    return [repo.github_id for repo in repos]
+
+
+def sync(username=None, force=False, session=None):
+    """
+    Refresh the stored repositories of username from the GitHub API.
+
+    Returns the GitHubSyncState, whose last_status is 'updated',
+    'not_modified', 'rate_limited' or 'failed'. force ignores the rate
+    limit reserve (GitHub's own limit still applies).
+    """
+    username = username or default_username()
+    session = session or requests
+    state, _ = GitHubSyncState.objects.get_or_create(username=username)
+    now = timezone.now()
+    max_pages = GITHUB_SYNC.get('max_pages', 10)
+    stored = {page['url']: page for page in state.pages}
+
+    pages = []
+    changed = False
+    complete = False
+    status = 'not_modified'
+    error = ''
+    url = repos_url(username)
+    try:
+        if not force and _out_of_budget(state, now):
+            status = 'rate_limited'
+            url = None
+        while url and len(pages) < max_pages:
+            previous = stored.get(url)
+            response = session.get(
+                url, headers=_headers(previous and previous.get('etag')),
+                timeout=GITHUB_SYNC.get('timeout', 10)
+            )
+            _record_rate_limit(state, response)
+            if response.status_code == 304 and not previous:
+                # A cache on the way revalidated a page we hold no copy of
+                response = session.get(
+                    url, headers=dict(_headers(), **{'Cache-Control': 'no-cache'}),
+                    timeout=GITHUB_SYNC.get('timeout', 10)
+                )
+                _record_rate_limit(state, response)
+            if response.status_code == 304 and previous:
+                page = previous
+            elif response.status_code in (403, 429) and state.rate_limit_remaining == 0:
+                status = 'rate_limited'
+                break
+            elif response.status_code == 304:
+                raise ValueError(f"{url} answered 304 Not Modified with no stored copy to reuse")
+            else:
+                response.raise_for_status()
+                with transaction.atomic():
+                    ids = _store(username, response.json())
+                page = {
+                    'url': url,
+                    'etag': response.headers.get('ETag', ''),
+                    'next': response.links.get('next', {}).get('url'),
+                    'ids': ids,
+                }
+                changed = True
+            pages.append(page)
+            url = page['next']
+            if not url:
+                complete = True
+            elif not force and _out_of_budget(state, timezone.now()):
+                status = 'rate_limited'
+                break
+    except (requests.RequestException, ValueError) as e:
+        logger.warning("GitHub sync for %s failed: %s", username, e)
+        status = 'failed'
+        error = str(e)
+
+    if complete:
+        # A complete walk is authoritative: deleted and renamed-away repositories go
+        ids = [github_id for page in pages for github_id in page['ids']]
+        if changed:
+            GitHubRepo.objects.filter(owner=username).exclude(github_id__in=ids).delete()
+        state.pages = pages
+    elif pages:
+        # Keep the validators of pages this walk did not reach
+        reached = {page['url'] for page in pages}
+        state.pages = pages + [page for page in state.pages if page['url'] not in reached]
+
+    if changed:
+        state.last_changed_at = now
+        # Stored with bulk_create, which sends no signals
+        page_cache.touch(GitHubRepo)
+        if status == 'not_modified':
+            status = 'updated'
+    state.last_status = status
+    state.last_error = error
+    state.last_checked_at = now
+    # refresh_started_at belongs to the caller holding the lease
+    state.save(update_fields=[
+        'pages', 'last_checked_at', 'last_changed_at', 'last_status', 'last_error',
+        'rate_limit', 'rate_limit_remaining', 'rate_limit_reset',
+    ])
+    return state
+
+
+_refresher = refresh.StaleWhileRevalidate(GitHubSyncState, 'username', sync, GITHUB_SYNC, 900, 'github-sync')
+
+
+def is_stale(state, now=None):
+    return _refresher.is_stale(state, now)
+
+
+def refresh_if_stale(username=None):
+    """Start a background sync when the stored copy is stale and nobody is refreshing it; returns the thread."""
+    return _refresher.refresh_if_stale(username or default_username())
+
+
+def repos(username=None, limit=None):
+    """Stored repositories of username, most recently updated first; never calls GitHub."""
+    username = username or default_username()
+    _refresher.revalidate(username)
+    queryset = GitHubRepo.objects.filter(owner=username)
+    return queryset[:limit] if limit else queryset
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from portfolio.github_stub import GitHubStub, make_repos
+
+
+class Command(BaseCommand):
+    help = 'Serve an offline GitHub API stub for developing the GitHub sync without network access.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--username', default='Aviyank')
+        parser.add_argument('--repos', type=int, default=12, help='Number of demo repositories')
+        parser.add_argument('--rate-limit', type=int, default=60)
+
+    def handle(self, *args, **options):
+        stub = GitHubStub(
+            make_repos(options['repos'], options['username']), owner=options['username'],
+            rate_limit=options['rate_limit'], port=options['port']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"GitHub stub for {options['username']} at {stub.url}; set GITHUB_API_URL={stub.url}"
+        ))
+        try:
+            stub.serve_forever()
+        except KeyboardInterrupt:
+            pass
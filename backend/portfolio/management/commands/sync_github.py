@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from portfolio import github_sync
+from portfolio.models import GitHubRepo
+
+
+class Command(BaseCommand):
+    help = 'Refresh the local copy of GitHub repositories shown on the projects page.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='GitHub account (default: GITHUB_USERNAME)')
+        parser.add_argument('--force', action='store_true', help='Ignore the rate limit reserve')
+
+    def handle(self, *args, **options):
+        state = github_sync.sync(options['username'], force=options['force'])
+        summary = (
+            f"{state.username}: {state.last_status}, "
+            f"{GitHubRepo.objects.filter(owner=state.username).count()} repositories stored, "
+            f"rate limit {state.rate_limit_remaining}/{state.rate_limit}"
+        )
+        if state.last_status == 'failed':
+            self.stdout.write(self.style.ERROR(f"{summary}: {state.last_error}"))
+        elif state.last_status == 'rate_limited':
+            self.stdout.write(self.style.WARNING(f"{summary}; resets at {state.rate_limit_reset}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from portfolio import feeds
+from portfolio.models import FeedPost
+
+
+class Command(BaseCommand):
+    help = 'Poll the Medium feed and store its posts for the blog page.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Feed URL (default: MEDIUM_FEED_URL)')
+        parser.add_argument('--force', action='store_true', help='Fetch even if the feed has not changed')
+
+    def handle(self, *args, **options):
+        state = feeds.poll(options['url'], force=options['force'])
+        summary = f"{state.url}: {state.last_status}, {FeedPost.objects.filter(feed_url=state.url).count()} posts stored"
+        if state.last_status == 'failed':
+            self.stdout.write(self.style.ERROR(f"{summary}: {state.last_error}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0003_profile_cricheroes_url_profile_instagram_url_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GitHubSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=100, unique=True)),
+                ('pages', models.JSONField(default=list)),
+                ('last_checked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_changed_at', models.DateTimeField(blank=True, null=True)),
+                ('refresh_started_at', models.DateTimeField(blank=True, null=True)),
+                ('last_status', models.CharField(blank=True, choices=[('updated', 'Updated'), ('not_modified', 'Not Modified'), ('rate_limited', 'Rate Limited'), ('failed', 'Failed')], max_length=20)),
+                ('last_error', models.TextField(blank=True)),
+                ('rate_limit', models.IntegerField(blank=True, null=True)),
+                ('rate_limit_remaining', models.IntegerField(blank=True, null=True)),
+                ('rate_limit_reset', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GitHubRepo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('github_id', models.BigIntegerField(unique=True)),
+                ('owner', models.CharField(max_length=100)),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('html_url', models.URLField()),
+                ('language', models.CharField(blank=True, max_length=100)),
+                ('stars', models.IntegerField(default=0)),
+                ('forks', models.IntegerField(default=0)),
+                ('fork', models.BooleanField(default=False)),
+                ('archived', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+                ('pushed_at', models.DateTimeField(blank=True, null=True)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-updated_at'],
+                'indexes': [models.Index(fields=['owner', 'updated_at'], name='portfolio_g_owner_5b7a7c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0004_github_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(unique=True)),
+                ('etag', models.CharField(blank=True, max_length=200)),
+                ('last_modified', models.CharField(blank=True, max_length=100)),
+                ('last_checked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_changed_at', models.DateTimeField(blank=True, null=True)),
+                ('refresh_started_at', models.DateTimeField(blank=True, null=True)),
+                ('last_status', models.CharField(blank=True, choices=[('updated', 'Updated'), ('not_modified', 'Not Modified'), ('failed', 'Failed')], max_length=20)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FeedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed_url', models.URLField()),
+                ('guid', models.CharField(max_length=500, unique=True)),
+                ('title', models.CharField(max_length=300)),
+                ('link', models.URLField(max_length=500)),
+                ('summary', models.TextField(blank=True)),
+                ('author', models.CharField(blank=True, max_length=200)),
+                ('published_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+                ('fetched_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-published_at'],
+                'indexes': [models.Index(fields=['feed_url', 'published_at'], name='portfolio_f_feed_ur_9189fe_idx')],
+            },
+        ),
+    ]
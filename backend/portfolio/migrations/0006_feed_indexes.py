@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:08
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_published_at(apps, schema_editor):
+    # Posts published through queryset.update() never got a publication date
+    BlogPost = apps.get_model('portfolio', 'BlogPost')
+    BlogPost.objects.filter(published=True, published_at__isnull=True).update(published_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0005_feed_posts'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_published_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['published', 'published_at', 'id'], name='portfolio_b_publish_b8c30c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['updated_at', 'id'], name='portfolio_p_updated_67d7cd_idx'),
+        ),
+    ]
@@ -73,6 +73,9 @@ class Project(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at', 'id']),
+        ]
 
     def __str__(self):
         return self.title
@@ -148,6 +151,9 @@ class BlogPost(models.Model):
 
     class Meta:
         ordering = ['-published_at', '-created_at']
+        indexes = [
+            models.Index(fields=['published', 'published_at', 'id']),
+        ]
 
     def __str__(self):
         return self.title
@@ -173,4 +179,94 @@ class ResearchProject(models.Model):
         ordering = ['-date', '-created_at']
 
     def __str__(self):
-        return self.title 
\ No newline at end of file
+        return self.title 
+
+class GitHubRepo(models.Model):
+    """Local copy of a public GitHub repository, kept current by github_sync."""
+    github_id = models.BigIntegerField(unique=True)
+    owner = models.CharField(max_length=100)
+    name = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    html_url = models.URLField()
+    language = models.CharField(max_length=100, blank=True)
+    stars = models.IntegerField(default=0)
+    forks = models.IntegerField(default=0)
+    fork = models.BooleanField(default=False)
+    archived = models.BooleanField(default=False)
+    # Timestamps reported by GitHub
+    created_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(blank=True, null=True)
+    pushed_at = models.DateTimeField(blank=True, null=True)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['owner', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.owner}/{self.name}"
+
+
+class GitHubSyncState(models.Model):
+    """Conditional request and rate limit bookkeeping for syncing one GitHub account."""
+    username = models.CharField(max_length=100, unique=True)
+    pages = models.JSONField(default=list)  # [{'url', 'etag', 'next', 'ids'}] per fetched page
+    last_checked_at = models.DateTimeField(blank=True, null=True)
+    last_changed_at = models.DateTimeField(blank=True, null=True)
+    refresh_started_at = models.DateTimeField(blank=True, null=True)  # lease held by a running refresh
+    last_status = models.CharField(max_length=20, blank=True, choices=[
+        ('updated', 'Updated'),
+        ('not_modified', 'Not Modified'),
+        ('rate_limited', 'Rate Limited'),
+        ('failed', 'Failed'),
+    ])
+    last_error = models.TextField(blank=True)
+    rate_limit = models.IntegerField(blank=True, null=True)
+    rate_limit_remaining = models.IntegerField(blank=True, null=True)
+    rate_limit_reset = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"GitHub sync for {self.username} ({self.last_status or 'never run'})"
+
+
+class FeedPost(models.Model):
+    """Post ingested from an external feed (Medium), stored as plain text fields."""
+    feed_url = models.URLField()
+    guid = models.CharField(max_length=500, unique=True)
+    title = models.CharField(max_length=300)
+    link = models.URLField(max_length=500)
+    summary = models.TextField(blank=True)  # tags stripped and entities decoded
+    author = models.CharField(max_length=200, blank=True)
+    published_at = models.DateTimeField()
+    updated_at = models.DateTimeField(blank=True, null=True)
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-published_at']
+        indexes = [
+            models.Index(fields=['feed_url', 'published_at']),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class FeedState(models.Model):
+    """HTTP validators and poll bookkeeping for one external feed."""
+    url = models.URLField(unique=True)
+    etag = models.CharField(max_length=200, blank=True)
+    last_modified = models.CharField(max_length=100, blank=True)  # Last-Modified header, sent back verbatim
+    last_checked_at = models.DateTimeField(blank=True, null=True)
+    last_changed_at = models.DateTimeField(blank=True, null=True)
+    refresh_started_at = models.DateTimeField(blank=True, null=True)  # lease held by a running poll
+    last_status = models.CharField(max_length=20, blank=True, choices=[
+        ('updated', 'Updated'),
+        ('not_modified', 'Not Modified'),
+        ('failed', 'Failed'),
+    ])
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Feed {self.url} ({self.last_status or 'never polled'})"
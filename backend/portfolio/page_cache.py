@@ -0,0 +1,129 @@
+"""
+Full-page cache for anonymous visitors.
+
+cached_page(*models) caches the rendered 200 responses of a view for
+anonymous GET and HEAD requests, keyed by host, path and query string.
+Each model has a generation counter in the cache, and a page's key
+includes the generations of the models it declares it reads. Saving or
+deleting a row, or changing a many-to-many relation, of a watched model
+bumps that model's generation, so exactly the pages built from it miss
+on their next request and everything else stays cached. Old entries are
+never looked up again and expire after PAGE_CACHE['timeout'].
+
+Counters live in Django's default cache; with several worker processes
+it must be a shared backend (Redis, Memcached, database) for an edit in
+one process to invalidate pages cached by the others.
+
+Rows written without signals (bulk_create and QuerySet.update) must call
+touch() themselves, as the GitHub and Medium syncs do.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from .models import BlogPost, Education, Experience, Profile, Project, ResearchProject, Skill
+
+
+PAGE_CACHE = getattr(settings, 'PAGE_CACHE', {})
+
+KEY_PREFIX = 'portfolio:page'
+# Models whose signals invalidate pages
+WATCHED_MODELS = (Project, Skill, BlogPost, Profile, Experience, Education, ResearchProject)
+
+
+def _generation_key(model):
+    return f"{KEY_PREFIX}:generation:{model._meta.label_lower}"
+
+
+def generations(models):
+    """Current generation of each model, in order."""
+    keys = [_generation_key(model) for model in models]
+    values = cache.get_many(keys)
+    return [values.get(key, 0) for key in keys]
+
+
+def touch(*models):
+    """Invalidate every cached page built from any of models."""
+    for model in models:
+        key = _generation_key(model)
+        # Generations never expire, so pages cannot fall back to an old one
+        if not cache.add(key, 1, timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Evicted between add and incr
+                cache.set(key, 1, timeout=None)
+
+
+def is_cacheable(request):
+    """Anonymous GET/HEAD requests that carry no session or pending messages."""
+    if not PAGE_CACHE.get('enabled', True) or request.method not in ('GET', 'HEAD'):
+        return False
+    if settings.SESSION_COOKIE_NAME in request.COOKIES or 'messages' in request.COOKIES:
+        return False
+    return not request.user.is_authenticated
+
+
+def page_key(request, models):
+    location = hashlib.sha256(f"{request.get_host()}{request.get_full_path()}".encode()).hexdigest()
+    return f"{KEY_PREFIX}:{location}:{'.'.join(str(g) for g in generations(models))}"
+
+
+def _storable(response):
+    # Responses that set cookies (a new session, consumed messages) belong to one visitor
+    return response.status_code == 200 and not response.cookies and not response.has_header('Cache-Control')
+
+
+def cached_page(*models, timeout=None):
+    """
+    Decorator caching a view's page for anonymous visitors until one of
+    models changes or timeout seconds (PAGE_CACHE['timeout']) pass.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable(request):
+                return view(request, *args, **kwargs)
+            key = page_key(request, models)
+            response = cache.get(key)
+            if response is not None:
+                return response
+
+            response = view(request, *args, **kwargs)
+            ttl = timeout if timeout is not None else PAGE_CACHE.get('timeout', 600)
+
+            def store(rendered):
+                if _storable(rendered):
+                    cache.set(key, rendered, ttl)
+
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.add_post_render_callback(store)
+            else:
+                store(response)
+            return response
+        return wrapper
+    return decorator
+
+
+def _changed(sender, **kwargs):
+    touch(sender)
+
+
+def _relation_changed(sender, instance, action, model, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        # Both ends of the relation render it
+        touch(type(instance), model)
+
+
+def connect_signals():
+    for model in WATCHED_MODELS:
+        post_save.connect(_changed, sender=model, dispatch_uid=f'portfolio.page_cache.saved.{model.__name__}')
+        post_delete.connect(_changed, sender=model, dispatch_uid=f'portfolio.page_cache.deleted.{model.__name__}')
+        for field in model._meta.many_to_many:
+            m2m_changed.connect(
+                _relation_changed, sender=field.remote_field.through,
+                dispatch_uid=f'portfolio.page_cache.relation.{model.__name__}.{field.name}'
+            )
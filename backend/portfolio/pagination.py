@@ -0,0 +1,139 @@
+"""
+Keyset pagination of several sorted sources merged into one feed.
+
+The projects and blog pages mix local rows with stored GitHub
+repositories or Medium posts, newest first. Each Source is a queryset
+ordered by a datetime field; a page asks every source for at most
+per_page + 1 rows past the cursor, using an index-friendly
+"older than (value, source, pk)" filter instead of an OFFSET, and
+heapq.merge combines the sorted results. Page N therefore costs the same
+as page 1: k small queries and a merge of k * (per_page + 1) rows,
+however many rows come before it.
+
+Feed order is the sort value, then the source name, then the primary
+key, all descending, so ties are broken the same way on every page. The
+cursor is the key of the last (or first) row shown, encoded for a URL.
+"""
+import base64
+import binascii
+import heapq
+import json
+from itertools import islice
+from operator import itemgetter
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class Source:
+    """One feed source: a queryset sorted on the datetime field, and how to turn its rows into items."""
+
+    def __init__(self, name, queryset, field, to_item):
+        self.name = name
+        # Rows without a sort value cannot be placed in the feed
+        self.queryset = queryset.filter(**{f'{field}__isnull': False})
+        self.field = field
+        self.to_item = to_item
+
+    def _beyond(self, cursor, older):
+        """Filter for rows strictly past cursor in feed order: older rows, or newer ones."""
+        value, name, pk = cursor
+        op = 'lt' if older else 'gt'
+        condition = Q(**{f'{self.field}__{op}': value})
+        # Ties on the sort value are ordered by source name, then pk
+        if (self.name < name) if older else (self.name > name):
+            condition |= Q(**{self.field: value})
+        elif self.name == name:
+            condition |= Q(**{self.field: value, f'pk__{op}': pk})
+        return condition
+
+    def fetch(self, cursor, limit, older=True):
+        """Up to limit (key, row) pairs past cursor, in the direction of travel."""
+        queryset = self.queryset
+        if cursor is not None:
+            queryset = queryset.filter(self._beyond(cursor, older))
+        if older:
+            queryset = queryset.order_by(f'-{self.field}', '-pk')
+        else:
+            queryset = queryset.order_by(self.field, 'pk')
+        return [((getattr(row, self.field), self.name, row.pk), row) for row in queryset[:limit]]
+
+
+class FeedPage:
+    """One page of a merged feed, with cursors to the neighbouring pages."""
+
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(key):
+    value, name, pk = key
+    raw = json.dumps([value.isoformat(), name, pk], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """The key encoded in cursor, or None when it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, name, pk = json.loads(raw)
+        value = parse_datetime(value)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        return None
+    if value is None or not isinstance(name, str) or not isinstance(pk, int):
+        return None
+    return value, name, pk
+
+
+def paginate(sources, per_page, after=None, before=None):
+    """
+    The page of the merged feed that follows the after cursor, or precedes
+    the before cursor; the first page without either. Malformed cursors
+    are treated as missing.
+    """
+    by_name = {source.name: source for source in sources}
+    cursor = decode_cursor(before)
+    older = cursor is None
+    if older:
+        cursor = decode_cursor(after)
+
+    fetched = [source.fetch(cursor, per_page + 1, older) for source in sources]
+    merged = list(islice(heapq.merge(*fetched, key=itemgetter(0), reverse=older), per_page + 1))
+    more = len(merged) > per_page
+    entries = merged[:per_page]
+
+    if older:
+        next_key = entries[-1][0] if more else None
+        previous_key = entries[0][0] if cursor is not None and entries else None
+    else:
+        if not more:
+            # Walked back to the start; the first page is always full
+            return paginate(sources, per_page)
+        entries.reverse()
+        next_key = entries[-1][0]
+        previous_key = entries[0][0]
+
+    items = [by_name[key[1]].to_item(row) for key, row in entries]
+    return FeedPage(
+        items,
+        next_cursor=encode_cursor(next_key) if next_key else None,
+        previous_cursor=encode_cursor(previous_key) if previous_key else None,
+    )
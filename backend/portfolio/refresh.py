@@ -0,0 +1,88 @@
+"""
+Stale-while-revalidate refreshes of locally stored remote data.
+
+Pages read the GitHub repositories and Medium posts from the database
+and never wait on the remote service. Once the stored copy is older than
+its ttl, the next read starts one background refresh and keeps serving
+the old copy meanwhile.
+
+Each source has a state row (GitHubSyncState, FeedState) with
+last_checked_at, set by the refresh, and refresh_started_at, the lease.
+A refresh starts only after a conditional update claims the lease, so
+concurrent requests and processes start one refresh between them; a
+lease older than the source's 'lease' seconds belongs to a refresh that
+died and may be taken over. The thread clears the lease when it ends,
+unless someone else has taken it over meanwhile.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class StaleWhileRevalidate:
+    """
+    Background refreshes of the copies tracked by state_model rows.
+
+    refresh(key) updates the copy and the state row identified by
+    key_field=key. config is the source's settings dict, read on every
+    call for 'ttl', 'lease' and 'background'.
+    """
+
+    def __init__(self, state_model, key_field, refresh, config, default_ttl, name):
+        self.state_model = state_model
+        self.key_field = key_field
+        self.refresh = refresh
+        self.config = config
+        self.default_ttl = default_ttl
+        self.name = name
+
+    def is_stale(self, state, now=None):
+        now = now or timezone.now()
+        ttl = self.config.get('ttl', self.default_ttl)
+        return state.last_checked_at is None or state.last_checked_at < now - timedelta(seconds=ttl)
+
+    def refresh_if_stale(self, key):
+        """Start a background refresh when the copy is stale and nobody is refreshing it; returns the thread."""
+        now = timezone.now()
+        state = self.state_model.objects.filter(**{self.key_field: key}).first()
+        if state is None:
+            state, _ = self.state_model.objects.get_or_create(**{self.key_field: key})
+        if not self.is_stale(state, now):
+            return None
+
+        expired = now - timedelta(seconds=self.config.get('lease', 300))
+        claimed = self.state_model.objects.filter(pk=state.pk).filter(
+            Q(refresh_started_at__isnull=True) | Q(refresh_started_at__lt=expired)
+        ).update(refresh_started_at=now)
+        if not claimed:
+            return None
+
+        def target():
+            try:
+                self.refresh(key)
+            except Exception:
+                logger.exception("%s of %s failed", self.name, key)
+            finally:
+                self.state_model.objects.filter(pk=state.pk, refresh_started_at=now).update(refresh_started_at=None)
+                connection.close()
+
+        thread = threading.Thread(target=target, name=f"{self.name}-{key}", daemon=True)
+        thread.start()
+        return thread
+
+    def revalidate(self, key):
+        """refresh_if_stale for page views, when background refreshes are enabled; never raises."""
+        if not self.config.get('background', True):
+            return None
+        try:
+            return self.refresh_if_stale(key)
+        except Exception:
+            # A failed refresh must not take the page down with it
+            logger.exception("Could not start %s of %s", self.name, key)
+            return None
@@ -56,6 +56,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'portfolio.site_data.site_data',
             ],
         },
     },
@@ -132,6 +133,139 @@ AI_MODEL_CONFIG = {
     'default_model': 'gpt-3.5-turbo',
     'max_tokens': 1000,
     'temperature': 0.7,
+    # 'openai', or 'fake' for the offline stand-in in ai_services/fake_openai.py
+    'backend': config('OPENAI_BACKEND', default='openai'),
+}
+AI_ANALYSIS_CONFIG = {
+    # Clustering switches to MiniBatchKMeans above this many rows
+    'minibatch_threshold': 10000,
+    'minibatch_size': 4096,
+    'max_clusters': 8,
+    'clustering_sample_size': 5000,  # rows used to score candidate k
+    'max_result_labels': 10000,  # larger inputs return cluster sizes, not per-row labels
+    'n_jobs': -1,
+    # Correlation: column block size, matrix size returned inline, strong pair cap
+    'correlation_block_size': 512,
+    'max_result_matrix_columns': 100,
+    'max_correlation_pairs': 1000,
+    'max_kendall_columns': 200,
+    # Descriptive analysis: sketch above this many rows, KLL size, HyperLogLog precision
+    'sketch_threshold_rows': 100000,
+    'quantile_sketch_k': 200,
+    'hll_precision': 12,
+    # Process pool for clustering and correlation; 0 workers runs everything inline.
+    # Inputs under compute_inline_bytes of array data run inline, arrays over
+    # compute_shared_bytes travel through shared memory.
+    'compute_workers': config('AI_COMPUTE_WORKERS', default=2, cast=int),
+    'compute_timeout': 120,  # seconds per task
+    'compute_memory_limit_mb': 2048,  # per worker address space
+    'compute_inline_bytes': 4 * 1024 * 1024,
+    'compute_shared_bytes': 1024 * 1024,
+    'compute_start_method': 'spawn',
+    # Ingestion: per-request DataFrame ceiling after dtype optimization, and
+    # whether larger input is rejected or uniformly sampled ('reject'/'sample')
+    'max_frame_mb': 512,
+    'oversize_policy': 'reject',
+    'ingest_batch_rows': 50000,
+    'max_category_ratio': 0.5,  # strings become categoricals at or below this unique ratio
+    'date_year_range': (1900, 2200),  # text columns are only read as dates within these years
+    # Prediction: rows per partial_fit call, passes over in-memory data, SGD regularization
+    'prediction_chunk_rows': 10000,
+    'prediction_epochs': 5,
+    'prediction_alpha': 1e-4,
+    # Anomaly detection: flag score, EWMA weight, rows before flagging starts,
+    # anomalies kept per result, isolation forest training sample and flagged share
+    'anomaly_threshold': 3.0,
+    'anomaly_ewma_alpha': 0.05,
+    'anomaly_min_periods': 30,
+    'anomaly_max_flagged': 1000,
+    'anomaly_sample_size': 10000,
+    'anomaly_contamination': 0.01,
+    # Registered models kept loaded per process, bounded by count and by file size
+    'model_cache_size': 64,
+    'model_cache_mb': 256,
+    # Stored datasets kept loaded in memory per process
+    'dataset_cache_size': 8,
+    'max_upload_mb': 1024,  # uploaded files over this size are refused before they are read
+    'dataset_orphan_grace': 3600,  # seconds before a pickle without a Dataset row may be deleted
+    # Spilled matrices, stored datasets and other analysis artifacts
+    'artifact_dir': os.path.join(BASE_DIR, 'ai_artifacts'),
+    'matrix_file_ttl': 86400,  # seconds a spilled correlation matrix can be downloaded
+}
+AI_JOB_CONFIG = {
+    'default_timeout': config('AI_JOB_TIMEOUT', default=300, cast=float),
+    # Upper bound on the timeout a request may ask for
+    'max_timeout': config('AI_JOB_MAX_TIMEOUT', default=1800, cast=float),
+    'poll_interval': 1.0,
+    # Each job runs in its own process, killed on timeout or cancellation
+    # ('process'); 'thread' runs it in the worker, where it cannot be stopped
+    'isolation': 'process',
+    'start_method': 'fork',
+}
+AI_USAGE_CONFIG = {
+    # AIUsage increments are buffered and written every flush_interval seconds
+    # or after max_pending records; 0 writes through on every request
+    'flush_interval': config('AI_USAGE_FLUSH_INTERVAL', default=5.0, cast=float),
+    'max_pending': 100,
+}
+AI_CACHE_CONFIG = {
+    'sentiment_cache_size': config('SENTIMENT_CACHE_SIZE', default=1024, cast=int),
+    'prompt_cache_size': config('PROMPT_CACHE_SIZE', default=256, cast=int),
+    'prompt_cache_ttl': config('PROMPT_CACHE_TTL', default=86400, cast=int),  # in seconds
+}
+
+# GitHub repositories shown on the projects page
+GITHUB_SYNC = {
+    'username': config('GITHUB_USERNAME', default='Aviyank'),
+    'api_url': config('GITHUB_API_URL', default='https://api.github.com'),
+    # Optional; raises the rate limit from 60 to 5000 requests an hour
+    'token': config('GITHUB_TOKEN', default=''),
+    # The local copy is served as is and refreshed in the background once older than ttl
+    'ttl': config('GITHUB_SYNC_TTL', default=900, cast=int),  # in seconds
+    'background': config('GITHUB_SYNC_BACKGROUND', default=True, cast=bool),
+    'timeout': 10,
+    'per_page': 100,
+    'max_pages': 10,
+    # Requests left unused so other clients sharing the budget are not starved
+    'rate_limit_reserve': 5,
+    # A refresh that has not finished after this long may be taken over
+    'lease': 300,  # in seconds
+}
+
+# Medium posts shown on the blog page
+MEDIUM_FEED = {
+    'url': config('MEDIUM_FEED_URL', default='https://medium.com/feed/@aviyank'),
+    # The stored posts are served as is and the feed is polled in the background once older than ttl
+    'ttl': config('MEDIUM_FEED_TTL', default=1800, cast=int),  # in seconds
+    'background': config('MEDIUM_FEED_BACKGROUND', default=True, cast=bool),
+    'timeout': 10,
+    'summary_length': 300,  # characters of plain text kept per post
+    'max_posts': 50,
+    'lease': 300,  # in seconds
+}
+
+# Cache shared by all worker processes; page cache invalidation needs a
+# shared backend (e.g. django.core.cache.backends.redis.RedisCache) when
+# the site runs more than one process
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='portfolio'),
+    }
+}
+
+# Rendered pages for anonymous visitors, invalidated when the content they show changes
+PAGE_CACHE = {
+    'enabled': config('PAGE_CACHE_ENABLED', default=True, cast=bool),
+    # Also bounds how long GitHub and Medium content can wait for its
+    # background refresh, which only a rendered page starts
+    'timeout': config('PAGE_CACHE_TIMEOUT', default=600, cast=int),  # in seconds
+}
+
+# Profile, skills, experiences and education, cached in process and in CACHES
+SITE_DATA_CACHE = {
+    # Entries are replaced on every edit; this only bounds how long unused ones stay in CACHES
+    'timeout': 86400,  # in seconds
 }
 
 # Logging
@@ -0,0 +1,102 @@
+"""
+Read-through cache of the small datasets shown across the site.
+
+The profile, skills (also grouped by category), experiences and
+education rarely change but are read on most pages, including the ones
+the page cache cannot serve: logged-in visitors and the admin. get()
+looks a dataset up in three places:
+
+- L1, a dict in this process, whose entries are tagged with the
+  generations they were built from;
+- L2, Django's default cache, under a key that includes those
+  generations, shared by all processes;
+- the database, filling both levels.
+
+The generations are the per-model counters of page_cache, which signals
+bump on every save, delete and many-to-many change, so an edit makes the
+next read of every dataset built from that model miss both levels; old
+L2 entries are never looked up again and expire. A read costs one cache
+lookup for the generations and, while nothing changes, no query.
+
+The site_data context processor exposes the datasets lazily, so a
+template that does not use them costs nothing.
+"""
+import threading
+from itertools import groupby
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from . import page_cache
+from .models import Education, Experience, Profile, Skill
+
+
+SITE_DATA_CACHE = getattr(settings, 'SITE_DATA_CACHE', {})
+
+KEY_PREFIX = 'portfolio:data'
+
+
+def _profile():
+    return Profile.objects.select_related('user').first()
+
+
+def _skills():
+    return tuple(Skill.objects.all())
+
+
+def _grouped_skills():
+    # Skills are ordered by category, so each category is one run
+    return {category: list(items) for category, items in groupby(_skills(), key=attrgetter('category'))}
+
+
+def _experiences():
+    return tuple(Experience.objects.prefetch_related('technologies_used'))
+
+
+def _education():
+    return tuple(Education.objects.all())
+
+
+# name: (loader, models the dataset is built from)
+DATASETS = {
+    'profile': (_profile, (Profile,)),
+    'skills': (_skills, (Skill,)),
+    'grouped_skills': (_grouped_skills, (Skill,)),
+    'experiences': (_experiences, (Experience, Skill)),
+    'education': (_education, (Education,)),
+}
+
+_local = {}
+_lock = threading.Lock()
+_missing = object()
+
+
+def get(name):
+    """The named dataset; shared between requests, so treat it as read-only."""
+    loader, models = DATASETS[name]
+    generation = tuple(page_cache.generations(models))
+    entry = _local.get(name)
+    if entry is not None and entry[0] == generation:
+        return entry[1]
+
+    key = f"{KEY_PREFIX}:{name}:{'.'.join(str(g) for g in generation)}"
+    value = cache.get(key, _missing)
+    if value is _missing:
+        value = loader()
+        cache.set(key, value, SITE_DATA_CACHE.get('timeout', 86400))
+    with _lock:
+        _local[name] = (generation, value)
+    return value
+
+
+def clear():
+    """Drop this process's L1 entries."""
+    with _lock:
+        _local.clear()
+
+
+def site_data(request):
+    """Context processor exposing every dataset under its name, loaded on first use."""
+    return {name: SimpleLazyObject(lambda name=name: get(name)) for name in DATASETS}
@@ -0,0 +1,301 @@
+from datetime import timedelta
+from unittest import mock
+
+import requests
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from . import feeds, github_sync
+from .github_stub import GitHubStub, make_repos
+from .models import FeedPost, FeedState, GitHubRepo, GitHubSyncState
+
+
+FEED_URL = 'https://medium.example/feed/@aviyank'
+
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>Aviyank on Medium</title>
+<item>
+  <guid>post-1</guid>
+  <title>Scaling &lt;b&gt;Django&lt;/b&gt; &amp;amp; friends</title>
+  <link>https://medium.example/p/1</link>
+  <description>&lt;p&gt;Intro &lt;script&gt;alert(1)&lt;/script&gt;text&lt;/p&gt;</description>
+  <author>Aviyank</author>
+  <pubDate>Mon, 02 Sep 2024 10:00:00 GMT</pubDate>
+</item>
+<item>
+  <guid>post-2</guid>
+  <title>Second post</title>
+  <link>https://medium.example/p/2</link>
+  <description>Plain</description>
+  <pubDate>Tue, 03 Sep 2024 10:00:00 GMT</pubDate>
+</item>
+<item>
+  <guid>post-3</guid>
+  <title>Third post</title>
+  <link>https://medium.example/p/3</link>
+  <pubDate>Wed, 04 Sep 2024 10:00:00 GMT</pubDate>
+</item>
+<item>
+  <guid>post-4</guid>
+  <title>Not a web link</title>
+  <link>javascript:alert(1)</link>
+  <pubDate>Thu, 05 Sep 2024 10:00:00 GMT</pubDate>
+</item>
+</channel></rss>
+"""
+
+
+class FeedServer:
+    """Stands in for requests: serves FEED with validators and honours conditional requests."""
+
+    etag = '"feed-v1"'
+    last_modified = 'Wed, 04 Sep 2024 10:00:00 GMT'
+
+    def __init__(self, body=FEED):
+        self.body = body
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        headers = headers or {}
+        self.requests.append(headers)
+        response = requests.Response()
+        response.url = url
+        if headers.get('If-None-Match') == self.etag or headers.get('If-Modified-Since') == self.last_modified:
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            response._content = self.body.encode()
+            response.headers.update({'ETag': self.etag, 'Last-Modified': self.last_modified})
+        return response
+
+
+class RevalidatingSession(requests.Session):
+    """A client-side HTTP cache that revalidates with the ETags it has seen, unless told not to."""
+
+    def __init__(self):
+        super().__init__()
+        self.etags = {}
+
+    def get(self, url, headers=None, **kwargs):
+        headers = dict(headers or {})
+        if headers.get('Cache-Control') != 'no-cache' and url in self.etags:
+            headers.setdefault('If-None-Match', self.etags[url])
+        response = super().get(url, headers=headers, **kwargs)
+        if 'ETag' in response.headers:
+            self.etags[url] = response.headers['ETag']
+        return response
+
+
+class GitHubStubMixin:
+    """Runs GitHubStub for each test, with github_sync pointed at it two repositories a page."""
+
+    repo_count = 5
+    rate_limit = 60
+    settings = {}
+
+    def setUp(self):
+        super().setUp()
+        self.stub = GitHubStub(make_repos(self.repo_count), rate_limit=self.rate_limit).start()
+        self.addCleanup(self.stub.stop)
+        patcher = mock.patch.dict(github_sync.GITHUB_SYNC, {
+            'username': 'Aviyank',
+            'api_url': self.stub.url,
+            'per_page': 2,
+            'background': False,
+            'rate_limit_reserve': 0,
+            **self.settings,
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def statuses(self):
+        return [status for _, status in self.stub.requests]
+
+
+class GitHubSyncTests(GitHubStubMixin, TestCase):
+
+    def test_walks_every_page(self):
+        state = github_sync.sync()
+
+        self.assertEqual(state.last_status, 'updated')
+        self.assertEqual(self.statuses(), [200, 200, 200])
+        self.assertEqual(len(state.pages), 3)
+        self.assertIsNone(state.pages[-1]['next'])
+        self.assertEqual(GitHubRepo.objects.filter(owner='Aviyank').count(), 5)
+        self.assertEqual(state.rate_limit_remaining, 57)
+
+    def test_unchanged_pages_cost_304s(self):
+        github_sync.sync()
+        self.stub.requests.clear()
+
+        state = github_sync.sync()
+
+        self.assertEqual(state.last_status, 'not_modified')
+        self.assertEqual(self.statuses(), [304, 304, 304])
+        self.assertEqual(self.stub.remaining, 57)
+        self.assertEqual(GitHubRepo.objects.count(), 5)
+
+    def test_changed_page_is_stored(self):
+        github_sync.sync()
+        self.stub.repos[0]['stargazers_count'] = 99
+        self.stub.requests.clear()
+
+        state = github_sync.sync()
+
+        self.assertEqual(state.last_status, 'updated')
+        self.assertEqual(self.statuses(), [200, 304, 304])
+        self.assertEqual(GitHubRepo.objects.get(github_id=self.stub.repos[0]['id']).stars, 99)
+
+    def test_304_without_stored_page_is_fetched_again(self):
+        session = RevalidatingSession()
+        github_sync.sync(session=session)
+        # The validators are gone, but the client-side cache still sends its ETags
+        GitHubSyncState.objects.update(pages=[])
+        GitHubRepo.objects.all().delete()
+        self.stub.requests.clear()
+
+        state = github_sync.sync(session=session)
+
+        self.assertEqual(state.last_status, 'updated')
+        self.assertEqual(self.statuses(), [304, 200, 304, 200, 304, 200])
+        self.assertEqual(GitHubRepo.objects.count(), 5)
+
+    def test_complete_walk_deletes_missing_repositories(self):
+        github_sync.sync()
+        removed = self.stub.repos.pop()
+
+        state = github_sync.sync()
+
+        self.assertEqual(state.last_status, 'updated')
+        self.assertFalse(GitHubRepo.objects.filter(github_id=removed['id']).exists())
+        self.assertEqual(GitHubRepo.objects.count(), 4)
+
+
+class GitHubRateLimitTests(GitHubStubMixin, TestCase):
+    rate_limit = 3
+    settings = {'rate_limit_reserve': 1}
+
+    def test_stops_at_the_reserve(self):
+        state = github_sync.sync()
+
+        # The second response leaves 1 request, the reserve
+        self.assertEqual(state.last_status, 'rate_limited')
+        self.assertEqual(self.statuses(), [200, 200])
+        self.assertEqual(state.rate_limit_remaining, 1)
+        self.assertEqual(GitHubRepo.objects.count(), 4)
+
+        self.stub.requests.clear()
+        state = github_sync.sync()
+
+        self.assertEqual(state.last_status, 'rate_limited')
+        self.assertEqual(self.stub.requests, [])
+
+    def test_partial_walk_keeps_repositories(self):
+        GitHubRepo.objects.create(github_id=1, owner='Aviyank', name='unlisted', html_url='https://github.com/x/y')
+
+        github_sync.sync()
+
+        self.assertTrue(GitHubRepo.objects.filter(github_id=1).exists())
+
+    def test_force_ignores_the_reserve(self):
+        state = github_sync.sync(force=True)
+
+        self.assertEqual(state.last_status, 'updated')
+        self.assertEqual(self.statuses(), [200, 200, 200])
+        self.assertEqual(GitHubRepo.objects.count(), 5)
+
+
+class GitHubRefreshLeaseTests(GitHubStubMixin, TransactionTestCase):
+
+    def test_held_lease_blocks_refresh(self):
+        GitHubSyncState.objects.create(username='Aviyank', refresh_started_at=timezone.now())
+
+        self.assertIsNone(github_sync.refresh_if_stale())
+        self.assertEqual(self.stub.requests, [])
+
+    def test_expired_lease_is_taken_over_and_released(self):
+        GitHubSyncState.objects.create(
+            username='Aviyank', refresh_started_at=timezone.now() - timedelta(seconds=301)
+        )
+
+        thread = github_sync.refresh_if_stale()
+        self.assertIsNotNone(thread)
+        thread.join(10)
+
+        state = GitHubSyncState.objects.get(username='Aviyank')
+        self.assertIsNone(state.refresh_started_at)
+        self.assertEqual(state.last_status, 'updated')
+        self.assertEqual(GitHubRepo.objects.count(), 5)
+
+    def test_fresh_copy_is_not_refreshed(self):
+        GitHubSyncState.objects.create(username='Aviyank', last_checked_at=timezone.now())
+
+        self.assertIsNone(github_sync.refresh_if_stale())
+        self.assertEqual(self.stub.requests, [])
+
+
+class FeedPollTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(feeds.MEDIUM_FEED, {'url': FEED_URL, 'background': False, 'max_posts': 50})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.server = FeedServer()
+
+    def test_validators_round_trip(self):
+        state = feeds.poll(session=self.server)
+
+        self.assertEqual(state.last_status, 'updated')
+        self.assertNotIn('If-None-Match', self.server.requests[0])
+        self.assertEqual(state.etag, FeedServer.etag)
+        self.assertEqual(state.last_modified, FeedServer.last_modified)
+
+        state = feeds.poll(session=self.server)
+
+        self.assertEqual(state.last_status, 'not_modified')
+        self.assertEqual(self.server.requests[1]['If-None-Match'], FeedServer.etag)
+        self.assertEqual(self.server.requests[1]['If-Modified-Since'], FeedServer.last_modified)
+        self.assertEqual(FeedPost.objects.count(), 3)
+
+    def test_force_skips_validators(self):
+        feeds.poll(session=self.server)
+
+        state = feeds.poll(force=True, session=self.server)
+
+        self.assertEqual(state.last_status, 'updated')
+        self.assertNotIn('If-None-Match', self.server.requests[1])
+
+    def test_markup_is_stripped(self):
+        feeds.poll(session=self.server)
+
+        post = FeedPost.objects.get(guid='post-1')
+        self.assertEqual(post.title, 'Scaling Django & friends')
+        self.assertNotIn('<', post.summary)
+        self.assertTrue(post.summary.startswith('Intro'))
+        self.assertEqual(post.author, 'Aviyank')
+
+    def test_non_http_links_are_dropped(self):
+        feeds.poll(session=self.server)
+
+        self.assertFalse(FeedPost.objects.filter(guid='post-4').exists())
+        self.assertFalse(FeedPost.objects.exclude(link__startswith='https://').exists())
+
+    def test_keeps_max_posts_newest(self):
+        with mock.patch.dict(feeds.MEDIUM_FEED, {'max_posts': 2}):
+            feeds.poll(session=self.server)
+
+        self.assertEqual(list(FeedPost.objects.values_list('guid', flat=True)), ['post-3', 'post-2'])
+
+    def test_failure_keeps_posts(self):
+        feeds.poll(session=self.server)
+        self.server.body = 'not a feed'
+
+        state = feeds.poll(force=True, session=self.server)
+
+        self.assertEqual(state.last_status, 'failed')
+        self.assertEqual(FeedPost.objects.count(), 3)
+
+    def test_held_lease_blocks_poll(self):
+        FeedState.objects.create(url=FEED_URL, refresh_started_at=timezone.now())
+
+        self.assertIsNone(feeds.refresh_if_stale())
@@ -7,31 +7,27 @@ from django.contrib import messages
 from django.http import JsonResponse
 from django.core.paginator import Paginator
 from django.db.models import Q
+from django.utils.decorators import method_decorator
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from itertools import groupby
-from operator import attrgetter
-import feedparser
-from datetime import datetime
-import requests
 
-from .models import Profile, Skill, Project, Experience, Education, Contact, BlogPost, ResearchProject
+from .models import (
+    Profile, Skill, Project, Experience, Education, Contact, BlogPost, ResearchProject, GitHubRepo, FeedPost
+)
 from .forms import ContactForm, ProjectForm, BlogPostForm
+from . import feeds, github_sync
+from .page_cache import cached_page
+from .pagination import Source, paginate
 
 
+@cached_page(Profile, Project, ResearchProject, Skill)
 def home(request):
     """Home page view."""
-    profile = Profile.objects.first()
+    # profile, skills and grouped_skills come from the site_data context processor
     featured_projects = Project.objects.filter(featured=True)[:3]
     recent_projects = Project.objects.filter(status='completed')[:6]
     research_projects = ResearchProject.objects.all()[:3]
-    skills = Skill.objects.all()
-    # Group skills by category
-    skills = sorted(skills, key=attrgetter('category'))
-    grouped_skills = {}
-    for category, items in groupby(skills, key=attrgetter('category')):
-        grouped_skills[category] = list(items)
     import os
     avatars_dir = os.path.join('backend', 'media', 'avatars')
     try:
@@ -39,39 +35,97 @@ def home(request):
     except Exception:
         media_avatars = []
     context = {
-        'profile': profile,
         'featured_projects': featured_projects,
         'recent_projects': recent_projects,
         'research_projects': research_projects,
-        'skills': skills,
-        'grouped_skills': grouped_skills,
         'media_avatars': media_avatars,
     }
     return render(request, 'portfolio/home.html', context)
 
 
+@cached_page(Profile, Experience, Education, Skill)
 def about(request):
     """About page view."""
-    profile = Profile.objects.first()
-    experiences = Experience.objects.all()
-    education = Education.objects.all()
-    skills = Skill.objects.all()
-    
-    context = {
-        'profile': profile,
-        'experiences': experiences,
-        'education': education,
-        'skills': skills,
+    # profile, experiences, education and skills come from the site_data context processor
+    return render(request, 'portfolio/about.html')
+
+
+def project_item(project):
+    return {
+        'title': project.title,
+        'description': project.short_description or project.description,
+        'url': project.live_url or project.github_url or '',
+        'language': ', '.join([s.name for s in project.technologies.all()]),
+        'stars': '',
+        'source': 'local',
+        'object': project,
+        'created_at': project.created_at,
+        'updated_at': project.updated_at,
+    }
+
+
+def github_item(repo):
+    return {
+        'title': repo.name,
+        'description': repo.description,
+        'url': repo.html_url,
+        'language': repo.language,
+        'stars': repo.stars,
+        'source': 'github',
+        'created_at': repo.created_at,
+        'updated_at': repo.updated_at,
     }
-    return render(request, 'portfolio/about.html', context)
 
 
+def blog_post_item(post):
+    return {
+        'title': post.title,
+        'link': post.get_absolute_url() if hasattr(post, 'get_absolute_url') else '',
+        'summary': post.excerpt or post.content[:200],
+        'published': post.published_at,
+        'published_parsed': post.published_at,
+        'author': post.author.get_full_name() if hasattr(post.author, 'get_full_name') else str(post.author),
+        'source': 'local',
+        'object': post,
+    }
+
+
+def feed_post_item(post):
+    return {
+        'title': post.title,
+        'link': post.link,
+        'summary': post.summary,
+        'published': post.published_at,
+        'published_parsed': post.published_at,
+        'author': post.author,
+        'source': 'medium',
+    }
+
+
+def feed_page_urls(request, feed_page):
+    """Links to the first, newer and older pages of feed_page, keeping the other query parameters."""
+    query = request.GET.copy()
+    for key in ('after', 'before', 'page'):
+        query.pop(key, None)
+    urls = {'first_page_url': f"?{query.urlencode()}"}
+    for name, key, cursor in [
+        ('next_page_url', 'after', feed_page.next_cursor),
+        ('previous_page_url', 'before', feed_page.previous_cursor),
+    ]:
+        if cursor:
+            page_query = query.copy()
+            page_query[key] = cursor
+            urls[name] = f"?{page_query.urlencode()}"
+    return urls
+
+
+@method_decorator(cached_page(Project, Skill, ResearchProject, GitHubRepo), name='dispatch')
 class ProjectListView(ListView):
     """Project list view."""
     model = Project
     template_name = 'portfolio/projects.html'
     context_object_name = 'projects'
-    paginate_by = 9
+    page_size = 9
     
     def get_queryset(self):
         queryset = Project.objects.all()
@@ -94,60 +148,46 @@ class ProjectListView(ListView):
         
         return queryset
 
-    def get_github_projects(self, limit=6):
-        url = 'https://api.github.com/users/Aviyank/repos'
-        try:
-            response = requests.get(url, timeout=5)
-            response.raise_for_status()
-            repos = response.json()
-        except Exception:
-            repos = []
-        projects = []
-        for repo in repos[:limit]:
-            projects.append({
-                'title': repo['name'],
-                'description': repo['description'] or '',
-                'url': repo['html_url'],
-                'language': repo.get('language', ''),
-                'stars': repo.get('stargazers_count', 0),
-                'source': 'github',
-                'created_at': repo.get('created_at', ''),
-                'updated_at': repo.get('updated_at', ''),
-            })
-        return projects
+    def get_github_repos(self):
+        # Served from the local copy; a stale copy is refreshed in the background
+        repos = github_sync.repos()
+        search = self.request.GET.get('search')
+        if search:
+            repos = repos.filter(
+                Q(name__icontains=search) |
+                Q(description__icontains=search) |
+                Q(language__icontains=search)
+            )
+        return repos
+
+    def get_sources(self):
+        sources = [
+            Source('local', self.get_queryset().prefetch_related('technologies'), 'updated_at', project_item),
+        ]
+        # Technology categories and statuses only describe local projects
+        if not (self.request.GET.get('category') or self.request.GET.get('status')):
+            sources.append(Source('github', self.get_github_repos(), 'updated_at', github_item))
+        return sources
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Local projects
-        local_projects = list(self.get_queryset())
-        local_projects_dicts = [{
-            'title': p.title,
-            'description': p.short_description or p.description,
-            'url': p.live_url or p.github_url or '',
-            'language': ', '.join([s.name for s in p.technologies.all()]),
-            'stars': '',
-            'source': 'local',
-            'object': p,
-            'created_at': p.created_at,
-            'updated_at': p.updated_at,
-        } for p in local_projects]
-        # GitHub projects
-        github_projects = self.get_github_projects()
-        # Merge and sort (by updated date if available)
-        def get_sort_key(proj):
-            return proj.get('updated_at') or proj.get('created_at')
-        all_projects = local_projects_dicts + github_projects
-        all_projects_sorted = sorted(all_projects, key=get_sort_key, reverse=True)
-        context['all_projects'] = all_projects_sorted
+        # Local and GitHub projects, newest first, one page at a time
+        feed_page = paginate(
+            self.get_sources(), self.page_size,
+            after=self.request.GET.get('after'), before=self.request.GET.get('before')
+        )
+        context['all_projects'] = feed_page.items
+        context['feed_page'] = feed_page
+        context.update(feed_page_urls(self.request, feed_page))
         # Add research projects
         context['research_projects'] = ResearchProject.objects.all()
         context['search'] = self.request.GET.get('search', '')
         context['category'] = self.request.GET.get('category', '')
         context['status'] = self.request.GET.get('status', '')
-        context['skills'] = Skill.objects.all()
         return context
 
 
+@method_decorator(cached_page(Project, Skill), name='dispatch')
 class ProjectDetailView(DetailView):
     """Project detail view."""
     model = Project
@@ -162,58 +202,40 @@ class ProjectDetailView(DetailView):
         return context
 
 
+@method_decorator(cached_page(BlogPost, Skill, FeedPost), name='dispatch')
 class BlogPostListView(ListView):
     """Blog post list view."""
     model = BlogPost
     template_name = 'portfolio/blog.html'
     context_object_name = 'posts'
-    paginate_by = 6
+    page_size = 6
     
     def get_queryset(self):
         return BlogPost.objects.filter(published=True)
 
-    def get_medium_posts(self, limit=6):
-        feed_url = 'https://medium.com/feed/@aviyank'
-        feed = feedparser.parse(feed_url)
-        posts = []
-        for entry in feed.entries[:limit]:
-            posts.append({
-                'title': entry.title,
-                'link': entry.link,
-                'summary': entry.summary,
-                'published': entry.published,
-                'published_parsed': datetime(*entry.published_parsed[:6]),
-                'author': entry.get('author', 'Medium'),
-                'source': 'medium',
-            })
-        return posts
+    def get_sources(self):
+        return [
+            Source('local', self.get_queryset().select_related('author'), 'published_at', blog_post_item),
+            # Served from the stored feed; a stale feed is polled in the background
+            Source('medium', feeds.posts(), 'published_at', feed_post_item),
+        ]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Local posts
-        local_posts = list(self.get_queryset())
-        # Medium posts
-        medium_posts = self.get_medium_posts()
-        # Convert local posts to dicts for uniformity
-        local_posts_dicts = [{
-            'title': post.title,
-            'link': post.get_absolute_url() if hasattr(post, 'get_absolute_url') else '',
-            'summary': post.excerpt or post.content[:200],
-            'published': post.published_at or post.created_at,
-            'published_parsed': post.published_at or post.created_at,
-            'author': post.author.get_full_name() if hasattr(post.author, 'get_full_name') else str(post.author),
-            'source': 'local',
-            'object': post,
-        } for post in local_posts]
-        # Merge and sort
-        all_posts = local_posts_dicts + medium_posts
-        all_posts_sorted = sorted(all_posts, key=lambda x: x['published_parsed'], reverse=True)
-        context['all_posts'] = all_posts_sorted
-        context['recent_posts'] = local_posts[:5]
+        # Local and Medium posts, newest first, one page at a time
+        feed_page = paginate(
+            self.get_sources(), self.page_size,
+            after=self.request.GET.get('after'), before=self.request.GET.get('before')
+        )
+        context['all_posts'] = feed_page.items
+        context['feed_page'] = feed_page
+        context.update(feed_page_urls(self.request, feed_page))
+        context['recent_posts'] = self.get_queryset()[:5]
         context['tags'] = Skill.objects.filter(blogpost__published=True).distinct()
         return context
 
 
+@method_decorator(cached_page(BlogPost, Skill), name='dispatch')
 class BlogPostDetailView(DetailView):
     """Blog post detail view."""
     model = BlogPost
@@ -149,7 +149,7 @@ function displaySentimentResult(data) {
     resultDiv.style.display = 'block';
 }
 
-// Handle Text Generation
+// Handle Text Generation (streamed as server-sent events)
 async function handleTextGeneration(event) {
     event.preventDefault();
     
@@ -170,7 +170,7 @@ async function handleTextGeneration(event) {
     if (resultDiv) resultDiv.style.display = 'none';
     
     try {
-        const response = await fetch('/api/text-generation/', {
+        const response = await fetch('/ai_services/api/text-generation/stream/', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -183,13 +183,25 @@ async function handleTextGeneration(event) {
             })
         });
         
-        const data = await response.json();
-        
-        if (response.ok) {
-            displayTextGenerationResult(data);
-        } else {
+        if (!response.ok) {
+            const data = await response.json();
             showAlert(data.error || 'An error occurred during text generation.', 'danger');
+            return;
         }
+        
+        let generatedText = '';
+        await readServerSentEvents(response, (eventName, data) => {
+            if (eventName === 'token') {
+                // Hide the spinner as soon as the first token arrives
+                if (loadingDiv) loadingDiv.style.display = 'none';
+                generatedText += data.text;
+                displayTextGenerationResult({generated_text: generatedText});
+            } else if (eventName === 'done') {
+                displayTextGenerationResult(data);
+            } else if (eventName === 'error') {
+                showAlert(data.error || 'An error occurred during text generation.', 'danger');
+            }
+        });
     } catch (error) {
         showAlert('Network error. Please try again.', 'danger');
     } finally {
@@ -197,23 +209,44 @@ async function handleTextGeneration(event) {
     }
 }
 
+// Parse a text/event-stream response body, calling onEvent(name, data) per event
+async function readServerSentEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let eventName = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) eventName = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            onEvent(eventName, data ? JSON.parse(data) : null);
+        }
+    }
+}
+
 // Display Text Generation Result
 function displayTextGenerationResult(data) {
     const resultDiv = document.getElementById('text-generation-result');
     if (!resultDiv) return;
     
-    resultDiv.innerHTML = `
-        <div class="ai-result">
-            <h5>Generated Text</h5>
+    // While streaming only the text is known so far
+    const modelHtml = data.model_used ? `
             <div class="mb-3">
                 <strong>Model:</strong> ${data.model_used}
-            </div>
-            <div class="mb-3">
-                <strong>Generated Text:</strong>
-                <div class="mt-2 p-3 bg-light rounded">
-                    ${data.generated_text.replace(/\n/g, '<br>')}
-                </div>
-            </div>
+            </div>` : '';
+    const parametersHtml = data.parameters ? `
             <div class="row">
                 <div class="col-md-6">
                     <strong>Parameters:</strong>
@@ -222,7 +255,17 @@ function displayTextGenerationResult(data) {
                         <li>Temperature: ${data.parameters.temperature}</li>
                     </ul>
                 </div>
-            </div>
+            </div>` : '';
+    
+    resultDiv.innerHTML = `
+        <div class="ai-result">
+            <h5>Generated Text</h5>${modelHtml}
+            <div class="mb-3">
+                <strong>Generated Text:</strong>
+                <div class="mt-2 p-3 bg-light rounded">
+                    ${data.generated_text.replace(/\n/g, '<br>')}
+                </div>
+            </div>${parametersHtml}
         </div>
     `;
     
@@ -311,10 +354,55 @@ function displayDataAnalysisResult(data) {
                 <strong>Results Summary:</strong>
                 <pre class="bg-light p-3 rounded"><code>${JSON.stringify(data.results, null, 2)}</code></pre>
             </div>
+            <div id="data-analysis-charts"></div>
         </div>
     `;
     
     resultDiv.style.display = 'block';
+    
+    // Charts need Plotly on the page; the specs are rebuilt client-side
+    const chartsDiv = document.getElementById('data-analysis-charts');
+    if (window.Plotly && chartsDiv && data.visualizations) {
+        data.visualizations.forEach(chart => {
+            const figure = chartToPlotly(chart);
+            if (!figure) return;
+            const chartDiv = document.createElement('div');
+            chartDiv.className = 'mb-3';
+            chartsDiv.appendChild(chartDiv);
+            Plotly.newPlot(chartDiv, figure.data, figure.layout, {responsive: true});
+        });
+    }
+}
+
+// Rebuild a Plotly figure from a compact server-side chart spec
+function chartToPlotly(chart) {
+    const spec = chart.data;
+    const layout = {title: chart.title};
+    
+    if (chart.type === 'histogram') {
+        const edges = spec.bin_edges;
+        const centers = spec.counts.map((_, i) => (edges[i] + edges[i + 1]) / 2);
+        const widths = spec.counts.map((_, i) => edges[i + 1] - edges[i]);
+        return {data: [{type: 'bar', x: centers, y: spec.counts, width: widths}], layout: {...layout, bargap: 0}};
+    }
+    if (chart.type === 'line') {
+        const xaxis = spec.x_label ? {title: spec.x_label} : {};
+        return {data: [{type: 'scatter', mode: 'lines', x: spec.x, y: spec.y}], layout: {...layout, xaxis}};
+    }
+    if (chart.type === 'heatmap') {
+        return {
+            data: [{type: 'heatmap', z: spec.z, x: spec.labels, y: spec.labels, colorscale: 'RdBu', zmin: -1, zmax: 1}],
+            layout
+        };
+    }
+    if (chart.type === 'scatter') {
+        const marker = spec.groups ? {color: spec.groups} : {};
+        return {
+            data: [{type: 'scatter', mode: 'markers', x: spec.x, y: spec.y, marker}],
+            layout: {...layout, xaxis: {title: spec.x_label}, yaxis: {title: spec.y_label}}
+        };
+    }
+    return null;
 }
 
 // Smooth scrolling for anchor links